@@ -0,0 +1,69 @@
+"""Gravação em lote e consultas do histórico SQLite (`core.historico`).
+
+Grava N laudos sintéticos (com diagnóstico e recomendação de adubação) em
+lotes de 10 mil, distribuídos em talhões e safras, e mede a consulta
+"talhões com P Muito baixo na safra" e o histórico de um talhão.
+
+Uso: python benchmarks/bench_historico.py [laudos] [arquivo]
+"""
+from __future__ import annotations
+
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.historico import Historico, RegistroLaudo  # noqa: E402
+
+LOTE = 10_000
+SAFRAS = ("2021/22", "2022/23", "2023/24", "2024/25")
+
+
+def _ms(funcao, repeticoes: int = 20) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1e3
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    caminho = sys.argv[2] if len(sys.argv) > 2 else os.path.join(tempfile.mkdtemp(), "historico.sqlite3")
+    rnd = random.Random(0)
+    with Historico(caminho) as historico:
+        talhoes = []
+        for f in range(200):
+            fazenda = historico.fazenda(f"Fazenda {f}", "Passo Fundo/RS")
+            talhoes.extend(historico.talhao(fazenda, f"T{t}", rnd.uniform(5, 80)) for t in range(25))
+        adubacao = {"totais": {"P2O5_total": 90.0, "K2O_total": 80.0}}
+        inicio = time.perf_counter()
+        for base in range(0, n, LOTE):
+            historico.registrar_lote(
+                RegistroLaudo(
+                    talhao_id=talhoes[(base + i) % len(talhoes)],
+                    safra=SAFRAS[((base + i) // len(talhoes)) % len(SAFRAS)],
+                    laudo={
+                        "P_mg_dm3": rnd.uniform(2, 30), "K_mg_dm3": rnd.uniform(30, 250),
+                        "argila_percent": rnd.uniform(15, 65), "CTC_pH7": rnd.uniform(6, 20),
+                        "Ca_cmolc_dm3": rnd.uniform(1, 8), "Mg_cmolc_dm3": rnd.uniform(0.3, 2.5),
+                    },
+                    recomendacoes={"adubacao": adubacao},
+                )
+                for i in range(min(LOTE, n - base))
+            )
+        decorrido = time.perf_counter() - inicio
+        print(f"{n} laudos em {decorrido:.1f} s ({n / decorrido:,.0f} laudos/s); {os.path.getsize(caminho) / 2**20:.0f} MiB")
+        achados = historico.talhoes_com_classe("P", "Muito baixo", "2024/25")
+        print(
+            f"talhões com P Muito baixo em 2024/25: {len(achados)} "
+            f"em {_ms(lambda: historico.talhoes_com_classe('P', 'Muito baixo', '2024/25')):.2f} ms"
+        )
+        print(f"histórico de um talhão (todas as safras): {_ms(lambda: historico.laudos_do_talhao(talhoes[7])):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
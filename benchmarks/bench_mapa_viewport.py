@@ -0,0 +1,83 @@
+"""Custo por quadro do desenho dos talhões de uma fazenda inteira.
+
+Compara a projeção de todos os polígonos a cada quadro (como `_redraw`
+fazia) com `CamadaTalhoes.visiveis` (recorte pela R-tree e nível de
+detalhe), em zooms de visão geral e de talhão, e o teste de clique
+(`CamadaTalhoes.localizar`) em pontos aleatórios da janela.
+
+Uso: python benchmarks/bench_mapa_viewport.py [talhoes] [vertices]
+"""
+from __future__ import annotations
+
+import math
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.mapa_talhoes import CamadaTalhoes, lonlat_to_pixel  # noqa: E402
+
+CANVAS_W, CANVAS_H = 680, 320
+
+
+def _fazenda(n: int, vertices: int, rnd: random.Random):
+    lado = math.ceil(math.sqrt(n))
+    polys = []
+    for i in range(n):
+        cx = -52.0 + (i % lado) * 0.012
+        cy = -28.0 + (i // lado) * 0.012
+        raio = rnd.uniform(0.003, 0.005)
+        anel = [
+            (cx + raio * math.cos(2 * math.pi * k / vertices) * rnd.uniform(0.8, 1.0),
+             cy + raio * math.sin(2 * math.pi * k / vertices) * rnd.uniform(0.8, 1.0))
+            for k in range(vertices)
+        ]
+        polys.append({"outer": [anel], "inner": []})
+    return polys
+
+
+def _todos(polys, z, cpx, cpy):
+    return [
+        [[(px - cpx + CANVAS_W / 2, py - cpy + CANVAS_H / 2) for px, py in (lonlat_to_pixel(lon, lat, z) for lon, lat in anel)]
+         for anel in poly["outer"]]
+        for poly in polys
+    ]
+
+
+def _ms(funcao, repeticoes: int = 20) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1e3
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    vertices = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    polys = _fazenda(n, vertices, random.Random(0))
+    inicio = time.perf_counter()
+    camada = CamadaTalhoes(polys)
+    print(f"{n} talhões x {vertices} vértices; montagem {(time.perf_counter() - inicio) * 1e3:.0f} ms")
+    lon_c = sum(p["outer"][0][0][0] for p in polys) / n
+    lat_c = sum(p["outer"][0][0][1] for p in polys) / n
+    for z in (10, 12, 14, 16):
+        cpx, cpy = lonlat_to_pixel(lon_c, lat_c, z)
+        poligonos, pontos = camada.visiveis(z, cpx, cpy, CANVAS_W, CANVAS_H)
+        print(
+            f"z={z:<3} todos {_ms(lambda: _todos(polys, z, cpx, cpy)):7.2f} ms   "
+            f"recorte+LOD {_ms(lambda: camada.visiveis(z, cpx, cpy, CANVAS_W, CANVAS_H)):6.2f} ms   "
+            f"({len(poligonos)} polígonos, {len(pontos)} pontos)"
+        )
+    rnd = random.Random(1)
+    z = 14
+    cpx, cpy = lonlat_to_pixel(lon_c, lat_c, z)
+    cliques = [(rnd.uniform(0, CANVAS_W), rnd.uniform(0, CANVAS_H)) for _ in range(2000)]
+    inicio = time.perf_counter()
+    acertos = sum(camada.localizar(x, y, z, cpx, cpy, CANVAS_W, CANVAS_H) >= 0 for x, y in cliques)
+    print(f"clique z={z}: {(time.perf_counter() - inicio) / len(cliques) * 1e6:.1f} us ({acertos}/{len(cliques)} em talhões)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Memória por amostra dos resultados de adubação e diagnóstico.
+
+Compara os registros compactos emitidos pelos motores com a visão em
+``dict`` (``as_dict()``), que era o formato devolvido antes, mantendo
+todos os resultados vivos como num processamento em lote.
+
+Uso: python benchmarks/bench_registros_memoria.py [amostras]
+"""
+from __future__ import annotations
+
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.adubacao_dados import EntradaSoja, recomendar_adubacao_soja  # noqa: E402
+from core.diagnostico import diagnosticar_soja_registro  # noqa: E402
+
+CLASSES = ("muito baixo", "baixo", "medio", "alto", "muito alto")
+
+
+def _entradas_adubacao(n: int) -> list[EntradaSoja]:
+    rnd = random.Random(0)
+    return [
+        EntradaSoja(
+            p_class=rnd.choice(CLASSES),
+            k_class=rnd.choice(CLASSES),
+            produtividade=rnd.uniform(2.0, 6.0),
+            cultivo=rnd.choice((1, 2)),
+            argila_pct=rnd.uniform(10.0, 70.0),
+            ctc=rnd.uniform(3.0, 25.0),
+            teor_s_mg_dm3=rnd.uniform(2.0, 15.0),
+            ph_agua=rnd.uniform(4.5, 7.0),
+        )
+        for _ in range(n)
+    ]
+
+
+def _entradas_diagnostico(n: int) -> list[dict]:
+    rnd = random.Random(1)
+    chaves = ("argila_percent", "CTC_pH7", "MO_percent", "P_mg_dm3", "K_mg_dm3", "Ca_cmolc_dm3",
+              "Mg_cmolc_dm3", "S_mg_dm3", "Cu_mg_dm3", "Zn_mg_dm3", "B_mg_dm3", "Mn_mg_dm3")
+    amostras = []
+    for _ in range(n):
+        dados = {chave: rnd.uniform(0.1, 60.0) for chave in chaves}
+        dados["pH_H2O"] = rnd.uniform(4.5, 7.0)
+        amostras.append(dados)
+    return amostras
+
+
+def _medir(funcao, entradas) -> tuple[float, float]:
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultados = [funcao(entrada) for entrada in entradas]
+    decorrido = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del resultados
+    n = len(entradas)
+    return pico / n, decorrido / n * 1e6
+
+
+def main() -> None:
+    amostras = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    adubacao = _entradas_adubacao(amostras)
+    diagnostico = _entradas_diagnostico(amostras)
+    casos = (
+        ("adubacao", adubacao, recomendar_adubacao_soja),
+        ("diagnostico", diagnostico, diagnosticar_soja_registro),
+    )
+    print(f"{'motor':<12} {'formato':<9} {'bytes/amostra':>14} {'us/amostra':>11}")
+    for nome, entradas, funcao in casos:
+        for formato, alvo in (("registro", funcao), ("dict", lambda e, f=funcao: f(e).as_dict())):
+            bytes_amostra, us_amostra = _medir(alvo, entradas)
+            print(f"{nome:<12} {formato:<9} {bytes_amostra:>14.0f} {us_amostra:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
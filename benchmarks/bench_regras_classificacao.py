@@ -0,0 +1,65 @@
+"""Custo da classificação do laudo com a tabela única de regras.
+
+Compara as faixas compiladas de `core.regras_classificacao` com a avaliação
+de condições em texto via ``eval`` (como `core.calculo` fazia) e mede o
+diagnóstico completo com e sem o cache guardado no contexto.
+
+Uso: python benchmarks/bench_regras_classificacao.py [laudos]
+"""
+from __future__ import annotations
+
+import random
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.diagnostico import diagnostico_do_laudo, diagnosticar_soja_registro  # noqa: E402
+from core.regras_classificacao import REGRAS_K, VERSAO_REGRAS  # noqa: E402
+
+CONDICOES_K_EVAL = {
+    'Muito baixo': 'valor <= 30',
+    'Baixo': '30 < valor <= 60',
+    'Medio': '60 < valor <= 90',
+    'Alto': '90 < valor <= 180',
+    'Muito alto': 'valor > 180',
+}
+
+CHAVES = ("pH_H2O", "argila_percent", "CTC_pH7", "MO_percent", "P_mg_dm3", "K_mg_dm3", "Ca_cmolc_dm3",
+          "Mg_cmolc_dm3", "S_mg_dm3", "Cu_mg_dm3", "Zn_mg_dm3", "B_mg_dm3", "Mn_mg_dm3")
+
+
+def _eval(valor: float, limites: dict[str, str]) -> str:
+    for faixa, condicao in limites.items():
+        if eval(condicao):
+            return faixa
+    return "Desconhecido"
+
+
+def _us(funcao, itens) -> float:
+    inicio = time.perf_counter()
+    for item in itens:
+        funcao(item)
+    return (time.perf_counter() - inicio) / len(itens) * 1e6
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    rnd = random.Random(0)
+    valores = [rnd.uniform(0.0, 300.0) for _ in range(n)]
+    laudos = [{chave: rnd.uniform(0.1, 60.0) for chave in CHAVES} for _ in range(n)]
+    regra_k = REGRAS_K["Media"]
+    ctx = SimpleNamespace()
+
+    print(f"regras {VERSAO_REGRAS}")
+    print(f"{'K via eval':<28} {_us(lambda v: _eval(v, CONDICOES_K_EVAL), valores):8.2f} us")
+    print(f"{'K via regra compilada':<28} {_us(regra_k.classificar, valores):8.2f} us")
+    print(f"{'laudo completo':<28} {_us(diagnosticar_soja_registro, laudos):8.2f} us")
+    diagnostico_do_laudo(ctx, laudos[0])
+    print(f"{'laudo repetido (cache ctx)':<28} {_us(lambda l: diagnostico_do_laudo(ctx, l), [laudos[0]] * n):8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Latência de atualização das linhas da aba de resultados.
+
+Compara o preenchimento com pool de linhas (`_preencher_linhas`) com a
+abordagem anterior (destruir tudo e recriar) para 5, 20 e 100 produtos.
+
+Uso: python benchmarks/bench_resultados_linhas.py [repeticoes]
+Requer display (Tk) e customtkinter instalados.
+"""
+from __future__ import annotations
+
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import customtkinter as ctk  # noqa: E402
+
+from core import aba_resultados  # noqa: E402
+
+TAMANHOS = (5, 20, 100)
+
+
+def _itens(n: int, rodada: int) -> list[tuple[str, str]]:
+    return [(f"Produto {i:03d}", f"{(i + 1) * (rodada + 1):.2f} kg/ha") for i in range(n)]
+
+
+def _medir(root, container, fonte_label, fonte_valor, n: int, repeticoes: int, recriar: bool) -> list[float]:
+    aba_resultados._limpar_conteudo(container)
+    aba_resultados._preencher_linhas(container, _itens(n, 0), fonte_label, fonte_valor)
+    root.update_idletasks()
+    tempos = []
+    for rodada in range(1, repeticoes + 1):
+        inicio = time.perf_counter()
+        if recriar:
+            aba_resultados._limpar_conteudo(container)
+        aba_resultados._preencher_linhas(container, _itens(n, rodada), fonte_label, fonte_valor)
+        root.update_idletasks()
+        tempos.append((time.perf_counter() - inicio) * 1000.0)
+    return tempos
+
+
+def main() -> None:
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    root = ctk.CTk()
+    root.withdraw()
+    container = ctk.CTkFrame(root)
+    container.pack()
+    fonte_label = ctk.CTkFont(size=14, weight="bold")
+    fonte_valor = ctk.CTkFont(size=13)
+
+    print(f"{'linhas':>6} {'recriar p50 (ms)':>17} {'pool p50 (ms)':>14} {'ganho':>7}")
+    for n in TAMANHOS:
+        recriar = _medir(root, container, fonte_label, fonte_valor, n, repeticoes, recriar=True)
+        pool = _medir(root, container, fonte_label, fonte_valor, n, repeticoes, recriar=False)
+        p50_recriar = statistics.median(recriar)
+        p50_pool = statistics.median(pool)
+        ganho = p50_recriar / p50_pool if p50_pool else float("inf")
+        print(f"{n:>6} {p50_recriar:>17.2f} {p50_pool:>14.2f} {ganho:>6.1f}x")
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
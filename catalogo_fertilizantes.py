@@ -0,0 +1,273 @@
+"""Catálogo indexado de fertilizantes (embutidos e carregados de CSV/JSON)."""
+from __future__ import annotations
+
+import csv
+import heapq
+import json
+import os
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+ENV_VAR = "FERTISOJA_CATALOGO"
+
+CATEGORIAS: Tuple[str, ...] = ('fosfatado', 'potassico', 'formulado', 'suplemento')
+
+# Colunas do arquivo (teores em %) -> atributo do Fertilizante (fração).
+_COLUNAS_TEOR: Tuple[Tuple[str, str], ...] = (
+    ('n', 'n'),
+    ('p2o5', 'p2o5'),
+    ('k2o', 'k2o'),
+    ('s', 's'),
+    ('mo', 'mo'),
+)
+
+
+@dataclass(frozen=True)
+class Fertilizante:
+    codigo: str
+    nome: str
+    p2o5: float = 0.0
+    k2o: float = 0.0
+    s: float = 0.0
+    mo: float = 0.0
+    n: float = 0.0
+
+
+@lru_cache(maxsize=1024)
+def normalizar_nome(texto: str | None) -> str:
+    if not texto:
+        return ""
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode().lower().strip()
+
+
+def composicao(p2o5: float, k2o: float, s: float) -> Optional[Tuple[float, float, float]]:
+    """Participação de P2O5, K2O e S no total desses nutrientes."""
+    total = p2o5 + k2o + s
+    if total <= 0:
+        return None
+    return (p2o5 / total, k2o / total, s / total)
+
+
+class IndiceGrades:
+    """Árvore k-d sobre a composição (P, K, S) dos produtos.
+
+    A árvore é montada uma vez e guardada em listas paralelas (ponto, produto,
+    filho esquerdo, filho direito); a busca dos ``k`` vizinhos mais próximos
+    poda subárvores pela distância ao plano de corte.
+    """
+
+    def __init__(self, produtos: Iterable[Fertilizante]) -> None:
+        itens = []
+        for fert in produtos:
+            ponto = composicao(fert.p2o5, fert.k2o, fert.s)
+            if ponto is not None:
+                itens.append((ponto, fert))
+        self._pontos: List[Tuple[float, float, float]] = []
+        self._produtos: List[Fertilizante] = []
+        self._esq: List[int] = []
+        self._dir: List[int] = []
+        self._raiz = self._montar(itens, 0)
+
+    def __len__(self) -> int:
+        return len(self._pontos)
+
+    def _montar(self, itens, profundidade: int) -> int:
+        if not itens:
+            return -1
+        eixo = profundidade % 3
+        itens.sort(key=lambda item: item[0][eixo])
+        meio = len(itens) // 2
+        no = len(self._pontos)
+        self._pontos.append(itens[meio][0])
+        self._produtos.append(itens[meio][1])
+        self._esq.append(-1)
+        self._dir.append(-1)
+        self._esq[no] = self._montar(itens[:meio], profundidade + 1)
+        self._dir[no] = self._montar(itens[meio + 1:], profundidade + 1)
+        return no
+
+    def vizinhos(self, ponto: Tuple[float, float, float], k: int) -> List[Fertilizante]:
+        """Os ``k`` produtos de composição mais próxima, do mais perto ao mais longe."""
+        if k <= 0 or self._raiz < 0:
+            return []
+        melhores: List[Tuple[float, int]] = []  # heap máximo via distância negativa
+        pilha = [(self._raiz, 0)]
+        while pilha:
+            no, profundidade = pilha.pop()
+            if no < 0:
+                continue
+            atual = self._pontos[no]
+            distancia = sum((a - b) ** 2 for a, b in zip(atual, ponto))
+            if len(melhores) < k:
+                heapq.heappush(melhores, (-distancia, no))
+            elif distancia < -melhores[0][0]:
+                heapq.heapreplace(melhores, (-distancia, no))
+            eixo = profundidade % 3
+            delta = ponto[eixo] - atual[eixo]
+            perto, longe = (self._esq[no], self._dir[no]) if delta < 0 else (self._dir[no], self._esq[no])
+            if len(melhores) < k or delta * delta < -melhores[0][0]:
+                pilha.append((longe, profundidade + 1))
+            pilha.append((perto, profundidade + 1))
+        return [self._produtos[no] for _, no in sorted(melhores, key=lambda item: -item[0])]
+
+
+class CatalogoFertilizantes:
+    """Produtos indexados por código, nome, categoria e composição.
+
+    Os índices são montados em :meth:`adicionar`; as consultas são buscas em
+    dicionário (ou no :class:`IndiceGrades`, na composição).
+    """
+
+    def __init__(self, itens: Iterable[Tuple[Fertilizante, str]] = ()) -> None:
+        self._por_codigo: Dict[str, Fertilizante] = {}
+        self._categoria: Dict[str, str] = {}
+        self._por_nome: Dict[Tuple[str, str], Fertilizante] = {}
+        self._por_normalizado: Dict[Tuple[str, str], Fertilizante] = {}
+        self._por_categoria: Dict[str, List[Fertilizante]] = {categoria: [] for categoria in CATEGORIAS}
+        self._indices_grade: Dict[str, IndiceGrades] = {}
+        for fert, categoria in itens:
+            self.adicionar(fert, categoria)
+
+    def __len__(self) -> int:
+        return len(self._por_codigo)
+
+    def __contains__(self, codigo: object) -> bool:
+        return codigo in self._por_codigo
+
+    def adicionar(self, fert: Fertilizante, categoria: str) -> None:
+        """Inclui (ou substitui, pelo código) um produto no catálogo."""
+        categoria = normalizar_nome(categoria)
+        if categoria not in self._por_categoria:
+            raise ValueError(f"Categoria desconhecida: {categoria!r}")
+        if fert.codigo in self._por_codigo:
+            self._remover(fert.codigo)
+        self._indices_grade.clear()
+        self._por_codigo[fert.codigo] = fert
+        self._categoria[fert.codigo] = categoria
+        self._por_categoria[categoria].append(fert)
+        for chave in ('', categoria):
+            self._por_nome.setdefault((chave, fert.nome), fert)
+            self._por_normalizado.setdefault((chave, normalizar_nome(fert.nome)), fert)
+
+    def _remover(self, codigo: str) -> None:
+        antigo = self._por_codigo.pop(codigo)
+        categoria = self._categoria.pop(codigo)
+        self._por_categoria[categoria].remove(antigo)
+        for indice in (self._por_nome, self._por_normalizado):
+            for chave in [chave for chave, valor in indice.items() if valor is antigo]:
+                del indice[chave]
+
+    def por_codigo(self, codigo: str | None, categoria: str | None = None) -> Fertilizante | None:
+        fert = self._por_codigo.get(codigo or '')
+        if fert is None or (categoria and self._categoria[fert.codigo] != categoria):
+            return None
+        return fert
+
+    def por_nome(self, nome: str | None, categoria: str | None = None) -> Fertilizante | None:
+        if not nome:
+            return None
+        chave = categoria or ''
+        return self._por_nome.get((chave, nome)) or self._por_normalizado.get((chave, normalizar_nome(nome)))
+
+    def categoria(self, codigo: str) -> str | None:
+        return self._categoria.get(codigo)
+
+    def da_categoria(self, categoria: str) -> Tuple[Fertilizante, ...]:
+        return tuple(self._por_categoria.get(categoria, ()))
+
+    def nomes(self, categoria: str) -> Tuple[str, ...]:
+        return tuple(fert.nome for fert in self._por_categoria.get(categoria, ()))
+
+    def produtos(self) -> Tuple[Fertilizante, ...]:
+        return tuple(self._por_codigo.values())
+
+    def indice_grades(self, categoria: str = 'formulado') -> IndiceGrades:
+        """Índice espacial da categoria, montado na primeira consulta."""
+        indice = self._indices_grade.get(categoria)
+        if indice is None:
+            indice = IndiceGrades(self._por_categoria.get(categoria, ()))
+            self._indices_grade[categoria] = indice
+        return indice
+
+    def carregar(self, caminho: str | os.PathLike) -> int:
+        """Carrega produtos de um arquivo ``.csv`` ou ``.json``; retorna quantos."""
+        itens = ler_arquivo(caminho)
+        for fert, categoria in itens:
+            self.adicionar(fert, categoria)
+        return len(itens)
+
+
+def _numero(valor) -> float:
+    if valor is None:
+        return 0.0
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    texto = str(valor).strip().replace('%', '')
+    if not texto:
+        return 0.0
+    if ',' in texto and '.' in texto:
+        texto = texto.replace('.', '')
+    return float(texto.replace(',', '.'))
+
+
+def _item_de_registro(registro: Mapping[str, object], linha: int) -> Tuple[Fertilizante, str]:
+    campos = {normalizar_nome(str(chave)): valor for chave, valor in registro.items() if chave is not None}
+    codigo = str(campos.get('codigo') or '').strip()
+    nome = str(campos.get('nome') or '').strip()
+    categoria = normalizar_nome(str(campos.get('categoria') or 'formulado'))
+    if not codigo or not nome:
+        raise ValueError(f"Registro {linha}: 'codigo' e 'nome' são obrigatórios.")
+    try:
+        teores = {atributo: max(_numero(campos.get(coluna)), 0.0) / 100.0 for coluna, atributo in _COLUNAS_TEOR}
+    except ValueError as exc:
+        raise ValueError(f"Registro {linha}: teor inválido ({exc}).") from exc
+    return Fertilizante(codigo, nome, **teores), categoria
+
+
+def ler_arquivo(caminho: str | os.PathLike) -> List[Tuple[Fertilizante, str]]:
+    """Lê produtos de CSV (``,`` ou ``;``) ou JSON; teores em porcentagem.
+
+    Colunas/chaves: ``codigo``, ``nome``, ``categoria`` (fosfatado, potassico,
+    formulado ou suplemento; padrão formulado), ``N``, ``P2O5``, ``K2O``,
+    ``S`` e ``Mo``.
+    """
+    caminho = Path(caminho)
+    sufixo = caminho.suffix.lower()
+    if sufixo == '.json':
+        with caminho.open(encoding='utf-8-sig') as arquivo:
+            dados = json.load(arquivo)
+        if isinstance(dados, dict):
+            dados = dados.get('produtos', [])
+        return [_item_de_registro(registro, indice) for indice, registro in enumerate(dados, start=1)]
+    if sufixo == '.csv':
+        with caminho.open(encoding='utf-8-sig', newline='') as arquivo:
+            cabecalho = arquivo.readline()
+            arquivo.seek(0)
+            delimitador = ';' if cabecalho.count(';') > cabecalho.count(',') else ','
+            leitor = csv.DictReader(arquivo, delimiter=delimitador)
+            return [_item_de_registro(registro, indice) for indice, registro in enumerate(leitor, start=2)]
+    raise ValueError(f"Formato de catálogo não suportado: {caminho.name}")
+
+
+def caminho_catalogo_usuario() -> Path | None:
+    """Arquivo indicado em ``FERTISOJA_CATALOGO``, se existir."""
+    destino = os.environ.get(ENV_VAR)
+    if destino and Path(destino).is_file():
+        return Path(destino)
+    return None
+
+
+__all__ = [
+    'CATEGORIAS',
+    'CatalogoFertilizantes',
+    'ENV_VAR',
+    'Fertilizante',
+    'IndiceGrades',
+    'caminho_catalogo_usuario',
+    'composicao',
+    'ler_arquivo',
+    'normalizar_nome',
+]
@@ -23,10 +23,13 @@ from .design_constants import (
 from .adubacao_dados import EntradaSoja, recomendar_adubacao_soja
 
 
+TITULO = "🌻 Recomendações de Adubação"
+
+
 def add_tab(tabhost: TabHost, ctx: AppContext):
     heading_font = getattr(ctx, "heading_font", ctk.CTkFont(size=FONT_SIZE_HEADING, weight="bold"))
 
-    aba = tabhost.add_tab("🌻 Recomendações de Adubação")
+    aba = tabhost.add_tab(TITULO)
     outer = ctk.CTkScrollableFrame(aba, fg_color="transparent")
     outer.pack(fill="both", expand=True, padx=PADX_STANDARD, pady=PADY_STANDARD)
     outer.grid_columnconfigure(0, weight=1)
@@ -192,14 +195,11 @@ def atualizar(ctx: AppContext):
         mostrar_correcao()
 
     diag = getattr(ctx, "_diag_cache", None)
-    if not diag:
+    if diag is None:
         return
 
-    macros = diag.get("macronutrientes", {})
-    p_info = macros.get("P") or {}
-    k_info = macros.get("K") or {}
-    p_class = p_info.get("classe")
-    k_class = k_info.get("classe")
+    p_class = diag.classe_p
+    k_class = diag.classe_k
 
     if not p_class or not k_class:
         if status_var is not None:
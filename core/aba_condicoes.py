@@ -4,7 +4,7 @@ import re
 import customtkinter as ctk
 
 from .context import AppContext, TabHost
-from . import diagnostico
+from . import calculo, diagnostico
 from .ui import (
     add_value_row,
     coletar_diagnostico_entradas,
@@ -23,6 +23,9 @@ from .design_constants import (
 )
 
 
+TITULO = "🧭 Condições do Solo"
+
+
 def _criar_alerta_widgets(container: ctk.CTkFrame, alertas: list[str], wrap: int = 520) -> None:
     """Renderiza alertas técnicos em cartões compactos."""
     for widget in container.winfo_children():
@@ -66,7 +69,7 @@ def _criar_alerta_widgets(container: ctk.CTkFrame, alertas: list[str], wrap: int
 def add_tab(tabhost: TabHost, ctx: AppContext):
     heading_font = getattr(ctx, "heading_font", ctk.CTkFont(size=FONT_SIZE_HEADING, weight="bold"))
 
-    aba = tabhost.add_tab("🧭 Condições do Solo")
+    aba = tabhost.add_tab(TITULO)
     outer = ctk.CTkScrollableFrame(aba, fg_color="transparent")
     outer.pack(fill="both", expand=True, padx=PADX_STANDARD, pady=PADY_STANDARD)
     outer.grid_columnconfigure(0, weight=1)
@@ -82,6 +85,7 @@ def add_tab(tabhost: TabHost, ctx: AppContext):
     sec_micro = make_section(outer, "🔬 Micronutrientes", heading_font)
     for nome in ["Zinco (Zn)", "Cobre (Cu)", "Boro (B)", "Manganês (Mn)"]:
         add_value_row(sec_micro, nome, ctx.labels_classificacao)
+    calculo.aplicar_classificacoes()
 
     resumo_section = make_section(outer, "🩺 Resumo do Diagnóstico", heading_font)
     resumo_section.grid_columnconfigure(0, weight=0)
@@ -122,28 +126,24 @@ def add_tab(tabhost: TabHost, ctx: AppContext):
 
 
 def atualizar(ctx: AppContext) -> None:
+    entradas = ctx.get_entradas()
+    dados_diag = coletar_diagnostico_entradas(entradas)
+    # Reaproveita o diagnóstico do cálculo principal quando o laudo não mudou;
+    # fica em ctx para as outras abas, mesmo antes desta ser construída.
+    diag = diagnostico.diagnostico_do_laudo(ctx, dados_diag)
+
     controles = getattr(ctx, "condicoes_controls", None)
     if not controles:
         return
 
-    entradas = ctx.get_entradas()
-    dados_diag = coletar_diagnostico_entradas(entradas)
-    diag = diagnostico.diagnosticar_soja(dados_diag)
-    ctx._diag_cache = diag  # reutilizado por outras abas
-
     summary = controles["summary"]
-    macros = diag["macronutrientes"]
-    alertas = diag["alertas"]
-
-    p_prob = macros["P"].get("prob_resposta") or "-"
-    summary["p"].set(p_prob)
 
-    k_prob = macros["K"].get("prob_resposta") or "-"
-    summary["k"].set(k_prob)
+    summary["p"].set(diag.prob_resposta_p or "-")
+    summary["k"].set(diag.prob_resposta_k or "-")
 
-    if macros["P"].get("classe") in ("Muito Baixo", "Baixo") or macros["K"].get("classe") in ("Muito Baixo", "Baixo"):
+    if diag.classe_p in ("Muito baixo", "Baixo") or diag.classe_k in ("Muito baixo", "Baixo"):
         summary["tecnica"].set("Repetir a análise na próxima safra para confirmar a correção.")
     else:
         summary["tecnica"].set("Repetir a análise na próxima safra para monitoramento.")
 
-    _criar_alerta_widgets(controles["alertas_container"], alertas)
+    _criar_alerta_widgets(controles["alertas_container"], list(diag.alertas))
@@ -24,9 +24,10 @@ from .design_constants import (
     PRIMARY_BLUE,
     PRIMARY_HOVER,
 )
-from . import aba_condicoes, aba_adubacao
 
 
+TITULO = "🌾 Dados da Análise de Solo"
+
 TEST_DEFAULTS = {
     "Produtividade esperada": "3.6",
     "Area (Ha)": "15",
@@ -91,8 +92,9 @@ def add_tab(tabhost: TabHost, ctx: AppContext):
     ctx.labels_resultado = labels_resultado
     ctx.campos = campos
     ctx.calcular = calculo.calcular
+    calculo.ligar_contexto(ctx)
 
-    aba_entrada = tabhost.add_tab("🌾 Dados da Análise de Solo")
+    aba_entrada = tabhost.add_tab(TITULO)
 
     aba_entrada.grid_columnconfigure(0, weight=1)
     aba_entrada.grid_rowconfigure(0, weight=1)
@@ -181,14 +183,8 @@ def add_tab(tabhost: TabHost, ctx: AppContext):
         status_var.set("")
         if calculo.calcular():
             status_var.set("Cálculo atualizado com sucesso.")
-            aba_condicoes.atualizar(ctx)
-            aba_adubacao.atualizar(ctx)
-            atualiza_fert = getattr(ctx, "atualizar_fertilizacao", None)
-            if callable(atualiza_fert):
-                atualiza_fert()
-            atualiza_res = getattr(ctx, "atualizar_resultados", None)
-            if callable(atualiza_res):
-                atualiza_res()
+            # condicoes -> adubacao -> fertilizacao -> resultados, uma vez cada
+            ctx.marcar_recalculo("condicoes")
             janela.after(4000, lambda: status_var.set(""))
 
     rodape = ctk.CTkFrame(aba_entrada, fg_color="transparent")
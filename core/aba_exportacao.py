@@ -3,17 +3,12 @@
 from __future__ import annotations
 
 import io
-import mimetypes
 import re
-import smtplib
-import ssl
 import shutil
 import tempfile
 import unicodedata
 import xml.etree.ElementTree as ET
-import zipfile
 from dataclasses import dataclass
-from email.message import EmailMessage
 from pathlib import Path
 from tkinter import filedialog, messagebox
 
@@ -59,6 +54,8 @@ from .ui import (
 
     create_primary_button,
 
+    coletar_diagnostico_entradas,
+
     make_section,
 
     normalize_key,
@@ -77,6 +74,8 @@ TEMPLATE_NAME = "Modelo recomenda\u00e7\u00e3o de aduba\u00e7\u00e3o e calagem.d
 
 FERTILIZER_SLOTS = 5
 
+TITULO = "🌱 Exporta\u00e7\u00e3o"
+
 REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
 PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
 HEADER_REL_ID = "rIdExportHeader"
@@ -306,6 +305,18 @@ def _send_email_with_attachment(
 
 ) -> None:
 
+    # smtplib/ssl/email só são necessários ao enviar; ficam fora do startup.
+
+    import mimetypes
+
+    import smtplib
+
+    import ssl
+
+    from email.message import EmailMessage
+
+
+
     remetente = config.get("EMAIL_FROM") or config.get("SMTP_USER")
 
     if not remetente:
@@ -1023,6 +1034,8 @@ def _gerar_documento_docx(modelo: Path, destino: Path, dados: dict[str, str], fe
         f'word/{HEADER_IMAGE_PATH}',
         'word/media/logo_thiago.png',
     }
+    import zipfile
+
     with zipfile.ZipFile(modelo, 'r') as origem:
         with zipfile.ZipFile(destino, 'w', compression=zipfile.ZIP_DEFLATED) as alvo:
             for item in origem.infolist():
@@ -1216,11 +1229,92 @@ def _executar_exportacao(ctx: AppContext, controles: dict) -> None:
 
         messagebox.showerror("Exportação", f"Erro inesperado: {exc}")
 
+
+def _executar_salvar_historico(ctx: AppContext, controles: dict) -> None:
+    """Grava o laudo atual, o diagnóstico e as recomendações no histórico SQLite."""
+
+    from .diagnostico import diagnostico_do_laudo
+
+    from .historico import Historico, RegistroLaudo
+
+    status_var = controles.get("status_var")
+
+    info = {chave: _get_entry_text(widget) for chave, widget in controles.get("entries", {}).items()}
+
+    try:
+
+        if not info.get("fazenda") or not info.get("talhao") or not info.get("safra"):
+
+            raise ExportError("Informe a fazenda, o talhão e a safra para salvar no histórico.")
+
+        entradas = ctx.get_entradas()
+
+        dados_laudo = coletar_diagnostico_entradas(entradas)
+
+        laudo = {chave: valor for chave, valor in dados_laudo.items() if valor is not None}
+
+        if not laudo:
+
+            raise ExportError("Preencha o laudo antes de salvar no histórico.")
+
+        recomendacoes = {}
+
+        calagem = getattr(ctx, "calagem_resultado", None)
+
+        if isinstance(calagem, dict):
+
+            recomendacoes["calagem"] = calagem
+
+        adubacao = (getattr(ctx, "adubacao_controls", None) or {}).get("ultimo_resultado")
+
+        if adubacao is not None:
+
+            recomendacoes["adubacao"] = adubacao.as_dict()
+
+        with Historico() as historico:
+
+            fazenda = historico.fazenda(info["fazenda"], info.get("municipio", ""), info.get("produtor", ""))
+
+            talhao = historico.talhao(fazenda, info["talhao"], parse_float(_lookup_value(entradas, "Area (Ha)")))
+
+            historico.registrar(
+                RegistroLaudo(
+                    talhao_id=talhao,
+                    safra=info["safra"],
+                    laudo=laudo,
+                    diagnostico=diagnostico_do_laudo(ctx, dados_laudo),
+                    recomendacoes=recomendacoes,
+                )
+            )
+
+            mensagem = f"Laudo salvo no histórico ({historico.caminho})."
+
+        if status_var is not None:
+
+            status_var.set(mensagem)
+
+    except ExportError as exc:
+
+        if status_var is not None:
+
+            status_var.set(str(exc))
+
+        messagebox.showerror("Histórico", str(exc))
+
+    except Exception as exc:  # pragma: no cover - fallback genérico
+
+        if status_var is not None:
+
+            status_var.set("Falha ao salvar no histórico.")
+
+        messagebox.showerror("Histórico", f"Erro inesperado: {exc}")
+
+
 def add_tab(tabhost: TabHost, ctx: AppContext) -> None:
 
     heading_font = getattr(ctx, "heading_font", ctk.CTkFont(size=FONT_SIZE_HEADING, weight="bold"))
 
-    aba = tabhost.add_tab("🌱 Exporta\u00e7\u00e3o")
+    aba = tabhost.add_tab(TITULO)
 
     outer = ctk.CTkScrollableFrame(aba, fg_color="transparent")
 
@@ -1248,7 +1342,8 @@ def add_tab(tabhost: TabHost, ctx: AppContext) -> None:
 
     field_layout = [
         [
-            ("Produtor", "produtor", 320, "Nome completo do produtor"),
+            ("Produtor", "produtor", 260, "Nome completo do produtor"),
+            ("Fazenda", "fazenda", 260, "Nome da fazenda"),
         ],
         [
             ("Munic\u00edpio", "municipio", 260, "Cidade/UF"),
@@ -1378,7 +1473,15 @@ def add_tab(tabhost: TabHost, ctx: AppContext) -> None:
         fg_color=(PANEL_LIGHT, PANEL_DARK),
     )
 
-    email_entry.grid(row=5, column=0, sticky="ew", padx=PADX_STANDARD, pady=(0, PADY_STANDARD))
+    email_entry.grid(row=5, column=0, sticky="ew", padx=PADX_STANDARD, pady=(0, PADY_SMALL))
+
+    botao_historico = create_primary_button(
+        actions_card,
+        "Salvar no Hist\u00f3rico",
+        lambda: _executar_salvar_historico(ctx, controles),
+    )
+
+    botao_historico.grid(row=6, column=0, padx=PADX_STANDARD, pady=(PADY_SMALL, PADY_STANDARD), sticky="ew")
 
     controles["status_var"] = status_var
     controles["email_entry"] = email_entry
@@ -6,21 +6,30 @@ from typing import Dict, Optional
 import customtkinter as ctk
 
 from fertilizacao import (
-    FOSFATADOS_CHOICES,
-    POTASSICOS_CHOICES,
+    CATALOGO,
     FertilizacaoResultado,
+    CODIGO_FORMULADO,
+    MODOS,
     MOLIBDATO_PADRAO,
-    calcular_formulado,
-    calcular_misto,
-    calcular_individual_usuario,
-    calcular_individual_software,
+    PRODUTOS_OTIMIZACAO,
+    SUBMODOS,
+    buscar_formulados,
+    carregar_catalogo,
     obter_fosfatado_por_nome,
+    otimizar_sacos,
     obter_potassico_por_nome,
+    resolver,
 )
 from .design_constants import *
 from .ui import make_section as build_section, place_logo_footer
 
 
+TITULO = '🌿 Escolha dos Fertilizantes'
+
+# Espera (ms) após a última alteração antes de recalcular em silêncio.
+ATRASO_RECALCULO_MS = 300
+
+
 def make_section(parent, title: str, font: ctk.CTkFont):
     body = build_section(parent, title, font, wrap=580)
     wrapper = body.master
@@ -78,6 +87,17 @@ def _formatar_alertas(alertas, faltantes):
     return 'Avisos:\n' + '\n'.join(f"- {mensagem}" for mensagem in mensagens)
 
 
+def _obter_area(ctx) -> float:
+    campo = getattr(ctx, 'campos', {}).get('Area (Ha)')
+    if campo is None:
+        return 0.0
+    try:
+        texto = str(campo.get()).strip().replace(',', '.')
+        return float(texto) if texto else 0.0
+    except Exception:
+        return 0.0
+
+
 def _obter_demanda(ctx) -> tuple[Optional[Dict[str, float]], Optional[str]]:
     controles_adub = getattr(ctx, 'adubacao_controls', None)
     if not controles_adub:
@@ -136,51 +156,32 @@ def _obter_demanda(ctx) -> tuple[Optional[Dict[str, float]], Optional[str]]:
 
 
 def _gerar_resultado(ctx, demanda: Dict[str, float], controles: Dict) -> Optional[FertilizacaoResultado]:
-    modo = _normalize(controles['modo_var'].get())
+    modo = controles['modo_var'].get()
     entradas = controles['formulado_inputs']
     n_txt = entradas['N'].get().strip()
     p_txt = entradas['P2O5'].get().strip()
     k_txt = entradas['K2O'].get().strip()
     grade = {
+        'N': _parse_float(n_txt),
         'P2O5': _parse_float(p_txt),
         'K2O': _parse_float(k_txt),
     }
     nome_formulado = f"Formulado N {n_txt or '0'} - P {p_txt or '0'} - K {k_txt or '0'}"
-
-    if modo.startswith('fertilizantes form'):
-        return calcular_formulado(demanda, grade, nome_formulado)
-
-    if modo.startswith('misto'):
-        sacos_txt = controles['misto_sacos_var'].get().strip()
-        sacos = _parse_float(sacos_txt)
-        submodo_original = controles['submodo_var'].get()
-        fosfatado_sel = controles['fosfatado_var'].get()
-        potassico_sel = controles['potassico_var'].get()
-        fosfatado = obter_fosfatado_por_nome(fosfatado_sel)
-        potassico = obter_potassico_por_nome(potassico_sel)
-        codigo_p = fosfatado.codigo if fosfatado else None
-        codigo_k = potassico.codigo if potassico else None
-        return calcular_misto(
-            demanda,
-            grade,
-            sacos,
-            nome_formulado,
-            submodo_original,
-            codigo_p,
-            codigo_k,
-        )
-
-    submodo = _normalize(controles['submodo_var'].get())
-    if submodo.startswith('escolha do usuario'):
-        fosfatado_sel = controles['fosfatado_var'].get()
-        potassico_sel = controles['potassico_var'].get()
-        fosfatado = obter_fosfatado_por_nome(fosfatado_sel)
-        potassico = obter_potassico_por_nome(potassico_sel)
-        codigo_p = fosfatado.codigo if fosfatado else None
-        codigo_k = potassico.codigo if potassico else None
-        return calcular_individual_usuario(demanda, codigo_p, codigo_k)
-
-    return calcular_individual_software(demanda)
+    precos = {codigo: _parse_float(var.get()) for codigo, var in controles.get('precos_vars', {}).items()}
+
+    fosfatado = obter_fosfatado_por_nome(controles['fosfatado_var'].get())
+    potassico = obter_potassico_por_nome(controles['potassico_var'].get())
+    return resolver(
+        modo,
+        demanda,
+        grade,
+        nome_formulado,
+        sacos_50kg=_parse_float(controles['misto_sacos_var'].get().strip()),
+        submodo=controles['submodo_var'].get(),
+        fosfatado_codigo=fosfatado.codigo if fosfatado else None,
+        potassico_codigo=potassico.codigo if potassico else None,
+        precos=precos,
+    )
 
 
 def _executar_calculo(ctx, atualizar_status: bool = True) -> Optional[FertilizacaoResultado]:
@@ -215,7 +216,10 @@ def _executar_calculo(ctx, atualizar_status: bool = True) -> Optional[Fertilizac
             atualiza_res()
         return None
 
-    resultado_var.set(_formatar_produtos(resultado.produtos))
+    texto_produtos = _formatar_produtos(resultado.produtos)
+    if resultado.custo is not None and resultado.produtos:
+        texto_produtos += f"\nCusto estimado: R$ {_format_valor(resultado.custo)}/ha"
+    resultado_var.set(texto_produtos)
     alerta_var.set(_formatar_alertas(resultado.alertas, resultado.faltantes))
     controles['ultimo_resultado'] = resultado
 
@@ -234,7 +238,7 @@ def atualizar_fertilizacao(ctx):
     _executar_calculo(ctx, atualizar_status=False)
 
 
-def add_tab(tabhost, ctx):
+def add_tab(tabhost, ctx, atraso_ms: Optional[int] = None):
     heading_font = ctk.CTkFont(size=13, weight='bold')
     body_font = ctk.CTkFont(size=11)
     subheading_font = ctk.CTkFont(size=FONT_SIZE_BODY, weight='bold')
@@ -247,7 +251,13 @@ def add_tab(tabhost, ctx):
 
     logo_image = getattr(ctx, 'logo_image', None)
 
-    aba = tabhost.add_tab('🌿 Escolha dos Fertilizantes')
+    try:
+        carregar_catalogo()
+        aviso_catalogo = ''
+    except (OSError, ValueError) as exc:
+        aviso_catalogo = f'Catálogo de fertilizantes não carregado: {exc}'
+
+    aba = tabhost.add_tab(TITULO)
     outer = ctk.CTkScrollableFrame(aba, fg_color='transparent')
     outer.pack(fill='both', expand=True, padx=PADX_STANDARD, pady=PADY_STANDARD)
 
@@ -258,7 +268,7 @@ def add_tab(tabhost, ctx):
     ctk.CTkLabel(modo_body, text='Modo de cálculo:', font=body_font).grid(row=0, column=0, sticky='w', pady=4)
     modo_box = ctk.CTkComboBox(
         modo_body,
-        values=['Fertilizantes formulados', 'Fertilizantes individuais', 'Misto'],
+        values=list(MODOS),
         variable=modo_var,
         state='readonly',
         width=220,
@@ -292,6 +302,13 @@ def add_tab(tabhost, ctx):
 
     formulado_entries = (entrada_n, entrada_p, entrada_k)
 
+    sugestao_var = ctk.StringVar(value='')
+    sugestoes_atuais: Dict[str, Dict[str, float]] = {}
+    sugerir_btn = ctk.CTkButton(formulado_frame, text='Sugerir do catálogo', width=150, command=lambda: sugerir_formulados())
+    sugerir_btn.grid(row=2, column=0, columnspan=2, sticky='w', pady=(4, PADY_SMALL), padx=(PADX_STANDARD, PADX_SMALL))
+    sugestao_box = ctk.CTkComboBox(formulado_frame, values=[], variable=sugestao_var, state='readonly', width=320)
+    sugestao_box.grid(row=2, column=2, columnspan=4, sticky='ew', pady=(4, PADY_SMALL), padx=(0, PADX_STANDARD))
+
     submodo_var = ctk.StringVar(value='Escolha do usuario')
     fosfatado_var = ctk.StringVar(value='')
     potassico_var = ctk.StringVar(value='')
@@ -332,7 +349,7 @@ def add_tab(tabhost, ctx):
     ctk.CTkLabel(misto_opcoes_frame, text='Como deseja compor?', font=body_font).grid(row=0, column=0, sticky='w', pady=4, padx=(0, PADX_SMALL))
     submodo_box_misto = ctk.CTkComboBox(
         misto_opcoes_frame,
-        values=['Escolha do usuario', 'Escolha do software'],
+        values=list(SUBMODOS),
         variable=submodo_var,
         state='readonly',
         width=220,
@@ -349,7 +366,7 @@ def add_tab(tabhost, ctx):
     ctk.CTkLabel(misto_selecoes_frame, text='Fosfatado:', font=body_font).grid(row=0, column=0, sticky='w', pady=4, padx=(0, PADX_SMALL))
     fosfatado_box_misto = ctk.CTkComboBox(
         misto_selecoes_frame,
-        values=FOSFATADOS_CHOICES,
+        values=CATALOGO.nomes('fosfatado'),
         variable=fosfatado_var,
         state='readonly',
         width=210,
@@ -359,7 +376,7 @@ def add_tab(tabhost, ctx):
     ctk.CTkLabel(misto_selecoes_frame, text='Potǭssico:', font=body_font).grid(row=0, column=2, sticky='w', pady=4, padx=(0, PADX_SMALL))
     potassico_box_misto = ctk.CTkComboBox(
         misto_selecoes_frame,
-        values=POTASSICOS_CHOICES,
+        values=CATALOGO.nomes('potassico'),
         variable=potassico_var,
         state='readonly',
         width=210,
@@ -368,6 +385,13 @@ def add_tab(tabhost, ctx):
 
     misto_entries = (misto_n, misto_p, misto_k, misto_sacos_entry)
 
+    opcao_sacos_var = ctk.StringVar(value='')
+    opcoes_sacos: Dict[str, float] = {}
+    sugerir_sacos_btn = ctk.CTkButton(misto_frame, text='Sugerir sacos', width=150, command=lambda: sugerir_sacos())
+    sugerir_sacos_btn.grid(row=6, column=0, columnspan=2, sticky='w', pady=(4, PADY_SMALL), padx=(PADX_STANDARD, PADX_SMALL))
+    opcoes_sacos_box = ctk.CTkComboBox(misto_frame, values=[], variable=opcao_sacos_var, state='readonly', width=360)
+    opcoes_sacos_box.grid(row=6, column=2, columnspan=4, sticky='ew', pady=(4, PADY_SMALL), padx=(0, PADX_STANDARD))
+
     individual_frame = ctk.CTkFrame(fertilizantes_body, **card_style)
     individual_frame.grid_columnconfigure(0, weight=1)
     ctk.CTkLabel(individual_frame, text='Fertilizantes individuais', font=subheading_font).grid(row=0, column=0, columnspan=2, sticky='w', pady=(PADY_SMALL, 6), padx=PADX_STANDARD)
@@ -375,7 +399,7 @@ def add_tab(tabhost, ctx):
     ctk.CTkLabel(individual_frame, text='Como deseja compor?', font=body_font).grid(row=1, column=0, sticky='w', pady=4, padx=PADX_STANDARD)
     submodo_box = ctk.CTkComboBox(
         individual_frame,
-        values=['Escolha do usuario', 'Escolha do software'],
+        values=list(SUBMODOS),
         variable=submodo_var,
         state='readonly',
         width=220,
@@ -392,7 +416,7 @@ def add_tab(tabhost, ctx):
     ctk.CTkLabel(selecoes_frame, text='Fosfatado:', font=body_font).grid(row=0, column=0, sticky='w', pady=4, padx=(0, PADX_SMALL))
     fosfatado_box = ctk.CTkComboBox(
         selecoes_frame,
-        values=FOSFATADOS_CHOICES,
+        values=CATALOGO.nomes('fosfatado'),
         variable=fosfatado_var,
         state='readonly',
         width=210,
@@ -403,7 +427,7 @@ def add_tab(tabhost, ctx):
     ctk.CTkLabel(selecoes_frame, text='Potássico:', font=body_font).grid(row=0, column=2, sticky='w', pady=4, padx=(0, PADX_SMALL))
     potassico_box = ctk.CTkComboBox(
         selecoes_frame,
-        values=POTASSICOS_CHOICES,
+        values=CATALOGO.nomes('potassico'),
         variable=potassico_var,
         state='readonly',
         width=210,
@@ -411,7 +435,42 @@ def add_tab(tabhost, ctx):
     potassico_box.grid(row=0, column=3, sticky='ew', pady=4, padx=(0, 0))
     potassico_box.set('')
 
-    status_var = ctk.StringVar(value='Ajuste as opções para definir os fertilizantes.')
+    otimizacao_frame = ctk.CTkFrame(fertilizantes_body, **card_style)
+    for coluna in range(6):
+        otimizacao_frame.grid_columnconfigure(coluna, weight=coluna % 2)
+    ctk.CTkLabel(otimizacao_frame, text='Menor custo (preço por tonelada)', font=subheading_font).grid(row=0, column=0, columnspan=6, sticky='w', pady=(PADY_SMALL, 6), padx=PADX_STANDARD)
+
+    ctk.CTkLabel(otimizacao_frame, text='N (%)', font=body_font).grid(row=1, column=0, sticky='w', pady=4, padx=(PADX_STANDARD, PADX_SMALL))
+    otim_n = ctk.CTkEntry(otimizacao_frame, width=80, textvariable=formulado_vars['N'])
+    otim_n.grid(row=1, column=1, sticky='ew', pady=4, padx=(0, PADX_SMALL))
+
+    ctk.CTkLabel(otimizacao_frame, text='P2O5 (%)', font=body_font).grid(row=1, column=2, sticky='w', pady=4, padx=(PADX_SMALL, PADX_SMALL))
+    otim_p = ctk.CTkEntry(otimizacao_frame, width=80, textvariable=formulado_vars['P2O5'])
+    otim_p.grid(row=1, column=3, sticky='ew', pady=4, padx=(0, PADX_SMALL))
+
+    ctk.CTkLabel(otimizacao_frame, text='K2O (%)', font=body_font).grid(row=1, column=4, sticky='w', pady=4, padx=(PADX_SMALL, PADX_SMALL))
+    otim_k = ctk.CTkEntry(otimizacao_frame, width=80, textvariable=formulado_vars['K2O'])
+    otim_k.grid(row=1, column=5, sticky='ew', pady=4, padx=(0, PADX_STANDARD))
+
+    precos_vars = {CODIGO_FORMULADO: ctk.StringVar(value='')}
+    precos_vars.update({fert.codigo: ctk.StringVar(value='') for fert in PRODUTOS_OTIMIZACAO})
+    rotulos_precos = {CODIGO_FORMULADO: 'Formulado acima'}
+    rotulos_precos.update({fert.codigo: fert.nome for fert in PRODUTOS_OTIMIZACAO})
+    otimizacao_entries = [otim_n, otim_p, otim_k]
+    for indice, (codigo, var) in enumerate(precos_vars.items()):
+        linha, coluna = 2 + indice // 2, (indice % 2) * 3
+        ctk.CTkLabel(otimizacao_frame, text=rotulos_precos[codigo], font=body_font).grid(row=linha, column=coluna, columnspan=2, sticky='w', pady=4, padx=(PADX_STANDARD, PADX_SMALL))
+        entrada_preco = ctk.CTkEntry(otimizacao_frame, width=90, textvariable=var, placeholder_text='R$/t')
+        entrada_preco.grid(row=linha, column=coluna + 2, sticky='w', pady=4, padx=(0, PADX_STANDARD))
+        otimizacao_entries.append(entrada_preco)
+    ctk.CTkLabel(
+        otimizacao_frame,
+        text='Produtos sem preço ficam fora da escolha.',
+        font=ctk.CTkFont(size=10),
+        anchor='w',
+    ).grid(row=3 + len(precos_vars) // 2, column=0, columnspan=6, sticky='w', pady=(0, PADY_SMALL), padx=PADX_STANDARD)
+
+    status_var = ctk.StringVar(value=aviso_catalogo or 'Ajuste as opções para definir os fertilizantes.')
     resultado_var = ctk.StringVar(value='')
     alerta_var = ctk.StringVar(value='')
 
@@ -434,7 +493,7 @@ def add_tab(tabhost, ctx):
     )
     resultado_body._alerta_label.pack(fill='x')
 
-    calcular_btn = ctk.CTkButton(outer, text='Calcular fertilização', command=lambda: _executar_calculo(ctx))
+    calcular_btn = ctk.CTkButton(outer, text='Calcular fertilização', command=lambda: calcular_agora())
     calcular_btn.pack(pady=(16, 0))
 
     controles = {
@@ -454,22 +513,118 @@ def add_tab(tabhost, ctx):
         'misto_entries': misto_entries,
         'individual_frame': individual_frame,
         'selecoes_frame': selecoes_frame,
+        'otimizacao_frame': otimizacao_frame,
+        'precos_vars': precos_vars,
         'ultimo_resultado': None,
     }
 
     ctx.fertilizacao_controls = controles
-    ctx.atualizar_fertilizacao = lambda: atualizar_fertilizacao(ctx)
+    ctx.atualizar_fertilizacao = lambda: ctx.marcar_recalculo("fertilizacao")
 
-    def recalcular_silencioso(*_):
+    atraso = ATRASO_RECALCULO_MS if atraso_ms is None else max(int(atraso_ms), 0)
+    pendente = {'id': None}
+
+    def cancelar_pendente():
+        if pendente['id'] is not None:
+            try:
+                aba.after_cancel(pendente['id'])
+            except Exception:
+                pass
+            pendente['id'] = None
+
+    def executar_pendente():
+        pendente['id'] = None
         _executar_calculo(ctx, atualizar_status=False)
 
-    for entrada in (*formulado_entries, *misto_entries):
+    def recalcular_silencioso(*_):
+        # Cada alteração reinicia a espera; só a última dispara o cálculo.
+        cancelar_pendente()
+        pendente['id'] = aba.after(atraso, executar_pendente)
+
+    def calcular_agora():
+        cancelar_pendente()
+        _executar_calculo(ctx)
+
+    for entrada in (*formulado_entries, *misto_entries, *otimizacao_entries):
         entrada.bind('<FocusOut>', lambda *_: recalcular_silencioso())
         entrada.bind('<Return>', lambda *_: recalcular_silencioso())
 
+    for var in (*formulado_vars.values(), misto_sacos_var, *precos_vars.values()):
+        var.trace_add('write', recalcular_silencioso)
+
     for box in (fosfatado_box, potassico_box, fosfatado_box_misto, potassico_box_misto):
         box.configure(command=lambda *_: recalcular_silencioso())
 
+    def sugerir_formulados():
+        demanda, mensagem = _obter_demanda(ctx)
+        sugestoes = buscar_formulados(demanda) if demanda else []
+        sugestoes_atuais.clear()
+        for sugestao in sugestoes:
+            rotulo = f"{sugestao.fertilizante.nome} — {_format_valor(sugestao.kg_ha)} kg/ha"
+            sugestoes_atuais[rotulo] = sugestao.grade
+        sugestao_box.configure(values=list(sugestoes_atuais))
+        sugestao_var.set('')
+        if mensagem:
+            status_var.set(mensagem)
+        elif not sugestoes:
+            status_var.set('Nenhum formulado do catálogo atende a esta demanda.')
+        else:
+            status_var.set('Escolha uma sugestão para preencher a formulação.')
+
+    def aplicar_sugestao(rotulo):
+        grade = sugestoes_atuais.get(rotulo)
+        if grade is None:
+            return
+        for chave, var in formulado_vars.items():
+            var.set(f"{grade.get(chave, 0.0):g}")
+        calcular_agora()
+
+    sugestao_box.configure(command=aplicar_sugestao)
+
+    def sugerir_sacos():
+        demanda, mensagem = _obter_demanda(ctx)
+        if mensagem:
+            status_var.set(mensagem)
+            return
+        grade = {chave: _parse_float(var.get()) for chave, var in formulado_vars.items()}
+        fosfatado = obter_fosfatado_por_nome(fosfatado_var.get())
+        potassico = obter_potassico_por_nome(potassico_var.get())
+        area = _obter_area(ctx)
+        opcoes = otimizar_sacos(
+            demanda,
+            grade,
+            'Formulado',
+            submodo_var.get(),
+            fosfatado.codigo if fosfatado else None,
+            potassico.codigo if potassico else None,
+            area_ha=area if area > 0 else 1.0,
+            precos={codigo: _parse_float(var.get()) for codigo, var in precos_vars.items()},
+        )
+        opcoes_sacos.clear()
+        for opcao in opcoes:
+            total_sacos = sum(opcao.sacos.values())
+            excesso = opcao.excesso_total
+            partes = [f"{total_sacos} sacos ({_format_valor(opcao.kg_formulado_ha)} kg/ha)"]
+            partes.append(f"excesso {_format_valor(excesso)} kg/ha" if excesso > 0 else 'sem excesso')
+            if opcao.custo_ha is not None:
+                partes.append(f"R$ {_format_valor(opcao.custo_ha)}/ha")
+            opcoes_sacos[' — '.join(partes)] = opcao.kg_formulado_ha / 50.0
+        opcoes_sacos_box.configure(values=list(opcoes_sacos))
+        opcao_sacos_var.set('')
+        if not opcoes:
+            status_var.set('Informe uma formulação com P2O5 ou K2O para sugerir os sacos.')
+        else:
+            status_var.set('Escolha uma opção para definir a quantidade de sacos.')
+
+    def aplicar_opcao_sacos(rotulo):
+        sacos = opcoes_sacos.get(rotulo)
+        if sacos is None:
+            return
+        misto_sacos_var.set(f"{round(sacos, 4):g}")
+        calcular_agora()
+
+    opcoes_sacos_box.configure(command=aplicar_opcao_sacos)
+
     def atualizar_submodo(*_):
         sub_norm = _normalize(submodo_var.get())
         frames_complementares = (selecoes_frame, misto_selecoes_frame)
@@ -483,12 +638,14 @@ def add_tab(tabhost, ctx):
 
     def atualizar_formulario(*_):
         modo_norm = _normalize(modo_var.get())
-        for frame in (formulado_frame, misto_frame, individual_frame):
+        for frame in (formulado_frame, misto_frame, individual_frame, otimizacao_frame):
             frame.pack_forget()
         if modo_norm.startswith('fertilizantes form'):
             formulado_frame.pack(fill='x', padx=PADX_SMALL, pady=(0, PADY_SMALL))
         elif modo_norm.startswith('misto'):
             misto_frame.pack(fill='x', padx=PADX_SMALL, pady=(0, PADY_SMALL))
+        elif modo_norm.startswith('menor custo'):
+            otimizacao_frame.pack(fill='x', padx=PADX_SMALL, pady=(0, PADY_SMALL))
         else:
             individual_frame.pack(fill='x', padx=PADX_SMALL, pady=(0, PADY_SMALL))
         atualizar_submodo()
@@ -499,6 +656,7 @@ def add_tab(tabhost, ctx):
     submodo_box_misto.configure(command=atualizar_submodo)
 
     atualizar_formulario()
+    cancelar_pendente()
     atualizar_fertilizacao(ctx)
 
     if logo_image is not None:
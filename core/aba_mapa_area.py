@@ -1,14 +1,16 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import customtkinter as ctk
-import zipfile
 import math
-import xml.etree.ElementTree as ET
 import os
 import urllib.request
 from io import BytesIO
 
-from .ui import place_logo_footer
+from .contornos import _poly_area_m2, ler_contorno
+from .mapa_sobreposicao import SobreposicaoRaster
+from .mapa_talhoes import TILE_SIZE, CamadaTalhoes, lonlat_to_pixel, pixel_to_lonlat
+from .prescricao import gerar_prescricao, ler_amostras
+from .ui import parse_float, place_logo_footer
 
 try:
     from PIL import Image, ImageTk, ImageDraw
@@ -17,11 +19,14 @@ except Exception:
     PIL_OK = False
 
 CANVAS_W, CANVAS_H = 680, 320
-R_EARTH = 6_371_000.0
-TILE_SIZE = 256
 MIN_ZOOM, MAX_ZOOM = 3, 19
 OSM_URL = "https://tile.openstreetmap.org/{z}/{x}/{y}.png"
 USER_AGENT = "Fertisoja/1.0 (educational; contact: example@example.com)"
+MAX_TILES_MEMORIA = 256
+COR_TALHAO = (106, 168, 79, 120)
+COR_CONTORNO = (34, 95, 16, 255)
+COR_SELECIONADO = (241, 194, 50, 150)
+COR_CONTORNO_SELECIONADO = (191, 144, 0, 255)
 
 
 def make_section(parent, title, font):
@@ -34,112 +39,6 @@ def make_section(parent, title, font):
     return body
 
 
-def _lonlat_to_xy_m(lat0_deg, lon_deg, lat_deg):
-    lat0 = math.radians(lat0_deg)
-    x = math.radians(lon_deg) * math.cos(lat0) * R_EARTH
-    y = math.radians(lat_deg) * R_EARTH
-    return x, y
-
-
-def _ring_area_m2(coords):
-    if len(coords) < 3:
-        return 0.0
-    lat0 = sum(lat for _, lat in coords) / len(coords)
-    pts = [_lonlat_to_xy_m(lat0, lon, lat) for lon, lat in coords]
-    area2 = 0.0
-    for i in range(len(pts)):
-        x1, y1 = pts[i]
-        x2, y2 = pts[(i + 1) % len(pts)]
-        area2 += x1 * y2 - x2 * y1
-    return abs(area2) * 0.5
-
-
-def _parse_coords_text(text):
-    out = []
-    if not text:
-        return out
-    for tok in text.replace('\n', ' ').replace('	', ' ').split():
-        parts = tok.split(',')
-        if len(parts) >= 2:
-            try:
-                lon = float(parts[0])
-                lat = float(parts[1])
-                out.append((lon, lat))
-            except ValueError:
-                pass
-    if len(out) > 1 and out[0] == out[-1]:
-        out = out[:-1]
-    return out
-
-
-def _sum_kml_polygon_areas_and_collect_rings(root):
-    ns = {"kml": "http://www.opengis.net/kml/2.2"}
-    total_m2 = 0.0
-    polys = []
-
-    def _findall(el, path):
-        found = el.findall(path, ns)
-        if not found:
-            found = el.findall(path.replace("kml:", ""))
-        return found
-
-    all_polys = root.findall(".//kml:Polygon", ns) or root.findall(".//Polygon")
-    for polygon in all_polys:
-        outer_nodes = _findall(polygon, ".//kml:outerBoundaryIs/kml:LinearRing/kml:coordinates")
-        inner_nodes = _findall(polygon, ".//kml:innerBoundaryIs/kml:LinearRing/kml:coordinates")
-
-        outers, inners = [], []
-        for node in outer_nodes:
-            coords = _parse_coords_text(node.text)
-            if coords:
-                outers.append(coords)
-                total_m2 += _ring_area_m2(coords)
-        for node in inner_nodes:
-            coords = _parse_coords_text(node.text)
-            if coords:
-                inners.append(coords)
-                total_m2 -= _ring_area_m2(coords)
-
-        if outers or inners:
-            polys.append({"outer": outers, "inner": inners})
-
-    return max(0.0, total_m2), polys
-
-
-def _load_kml_from_kmz(path):
-    with zipfile.ZipFile(path, "r") as zf:
-        kml_name = None
-        for name in zf.namelist():
-            if name.lower().endswith(".kml"):
-                if name.lower().endswith("doc.kml"):
-                    kml_name = name
-                    break
-                if kml_name is None:
-                    kml_name = name
-        if not kml_name:
-            raise ValueError("KMZ não contém arquivo .kml")
-        with zf.open(kml_name) as f:
-            data = f.read()
-    return data
-
-
-def lonlat_to_pixel(lon, lat, z):
-    lat = max(min(lat, 85.05112878), -85.05112878)
-    siny = math.sin(math.radians(lat))
-    n = 2.0 ** z
-    x = (lon + 180.0) / 360.0 * n * TILE_SIZE
-    y = (0.5 - math.log((1 + siny) / (1 - siny)) / (4 * math.pi)) * n * TILE_SIZE
-    return x, y
-
-
-def pixel_to_lonlat(px, py, z):
-    n = 2.0 ** z
-    lon = px / (n * TILE_SIZE) * 360.0 - 180.0
-    y = 0.5 - (py / (n * TILE_SIZE))
-    lat = 90.0 - 360.0 * math.atan(math.exp(-y * 2 * math.pi)) / math.pi
-    return lon, lat
-
-
 def bbox_lonlat(polys):
     lons, lats = [], []
     for poly in polys:
@@ -178,9 +77,41 @@ def tile_cache_dir():
     return cache
 
 
+_tiles_memoria = {}
+_tile_indisponivel = None
+
+
 def load_tile(z, x, y):
+    """Tile (z, x, y) da memória, do cache em disco ou do servidor, nessa ordem.
+
+    Se o download falhar, devolve um tile cinza que não fica na memória:
+    o tile é pedido de novo no próximo desenho.
+    """
     if not PIL_OK:
         return None
+    tile = _tiles_memoria.pop((z, x, y), None)
+    if tile is None:
+        tile = _load_tile_disco_ou_rede(z, x, y)
+        if tile is None:
+            return _placeholder_tile()
+        if len(_tiles_memoria) >= MAX_TILES_MEMORIA:
+            del _tiles_memoria[next(iter(_tiles_memoria))]
+    _tiles_memoria[(z, x, y)] = tile
+    return tile
+
+
+def _placeholder_tile():
+    global _tile_indisponivel
+    if _tile_indisponivel is None:
+        img = Image.new("RGB", (TILE_SIZE, TILE_SIZE), "#dddddd")
+        draw = ImageDraw.Draw(img)
+        draw.line((0, 0, TILE_SIZE, TILE_SIZE), fill="#bbbbbb")
+        draw.line((0, TILE_SIZE, TILE_SIZE, 0), fill="#bbbbbb")
+        _tile_indisponivel = img
+    return _tile_indisponivel
+
+
+def _load_tile_disco_ou_rede(z, x, y):
     cache = tile_cache_dir()
     path = os.path.join(cache, f"{z}_{x}_{y}.png")
     if os.path.exists(path):
@@ -197,14 +128,11 @@ def load_tile(z, x, y):
             f.write(data)
         return Image.open(BytesIO(data)).convert("RGB")
     except Exception:
-        img = Image.new("RGB", (TILE_SIZE, TILE_SIZE), "#dddddd")
-        draw = ImageDraw.Draw(img)
-        draw.line((0, 0, TILE_SIZE, TILE_SIZE), fill="#bbbbbb")
-        draw.line((0, TILE_SIZE, TILE_SIZE, 0), fill="#bbbbbb")
-        return img
+        return None
 
 
-def draw_tiles(center_px, center_py, z, canvas_w, canvas_h):
+def draw_tiles(center_px, center_py, z, canvas_w, canvas_h, sobreposicao=None):
+    """Mosaico dos tiles OSM da janela, com os tiles de `sobreposicao` por cima."""
     if not PIL_OK:
         return None
     base = Image.new("RGB", (canvas_w, canvas_h), "#ffffff")
@@ -227,33 +155,13 @@ def draw_tiles(center_px, center_py, z, canvas_w, canvas_h):
             paste_x = ix * TILE_SIZE - offset_x
             paste_y = iy * TILE_SIZE - offset_y
             base.paste(tile, (paste_x, paste_y))
+            if sobreposicao is not None:
+                camada = sobreposicao.tile(z, tx, ty)
+                if camada is not None:
+                    base.paste(camada, (paste_x, paste_y), camada)
     return base
 
 
-def rings_to_pixel(polys, z, center_px, center_py, canvas_w, canvas_h):
-    all_rings = []
-    for poly in polys:
-        out_outer, out_inner = [], []
-        for ring in poly["outer"]:
-            pts = []
-            for lon, lat in ring:
-                px, py = lonlat_to_pixel(lon, lat, z)
-                X = px - center_px + canvas_w / 2
-                Y = py - center_py + canvas_h / 2
-                pts.append((X, Y))
-            out_outer.append(pts)
-        for ring in poly["inner"]:
-            pts = []
-            for lon, lat in ring:
-                px, py = lonlat_to_pixel(lon, lat, z)
-                X = px - center_px + canvas_w / 2
-                Y = py - center_py + canvas_h / 2
-                pts.append((X, Y))
-            out_inner.append(pts)
-        all_rings.append({"outer": out_outer, "inner": out_inner})
-    return all_rings
-
-
 def add_tab(tabhost, ctx):
     titulo_font = ctk.CTkFont(size=13, weight="bold")
     logo_image = getattr(ctx, 'logo_image', None)
@@ -270,8 +178,15 @@ def add_tab(tabhost, ctx):
 
     def escolher():
         path = filedialog.askopenfilename(
-            title="Selecione KMZ ou KML",
-            filetypes=[("KMZ", "*.kmz"), ("KML", "*.kml"), ("Todos os arquivos", "*.*")],
+            title="Selecione o contorno (KMZ, KML, GeoJSON ou Shapefile)",
+            filetypes=[
+                ("Contornos", "*.kmz *.kml *.geojson *.json *.shp *.zip"),
+                ("KMZ", "*.kmz"),
+                ("KML", "*.kml"),
+                ("GeoJSON", "*.geojson *.json"),
+                ("Shapefile (.shp ou .zip)", "*.shp *.zip"),
+                ("Todos os arquivos", "*.*"),
+            ],
         )
         if path:
             caminho_var.set(path)
@@ -285,7 +200,7 @@ def add_tab(tabhost, ctx):
     res_ha_val = ctk.CTkLabel(resultado_frame, text="", anchor="w")
     res_ha_val.pack(side="left", padx=10)
 
-    sec_prev = make_section(frame, "MAPA (arraste p/ mover, roda p/ zoom, duplo clique p/ ajustar)", titulo_font)
+    sec_prev = make_section(frame, "MAPA (clique seleciona o talhão, arraste p/ mover, roda p/ zoom, duplo clique p/ ajustar)", titulo_font)
     canvas = tk.Canvas(sec_prev, width=CANVAS_W, height=CANVAS_H, highlightthickness=0, bg="white")
     canvas.pack(fill="both", expand=True)
     ctk.CTkLabel(sec_prev, text="© OpenStreetMap contributors", anchor="e", font=ctk.CTkFont(size=10)).pack(fill="x", pady=(6, 0))
@@ -298,6 +213,14 @@ def add_tab(tabhost, ctx):
         "center_py": 0.0,
         "drag": None,
         "photo": None,
+        "camada": None,
+        "areas_ha": [],
+        "selecionado": -1,
+        "arrastou": False,
+        "redesenho": None,
+        "raster": None,
+        "sobreposicoes": {},
+        "sobreposicao": None,
     }
 
     def _fit_view():
@@ -316,28 +239,65 @@ def add_tab(tabhost, ctx):
             return
         w = canvas.winfo_width() or CANVAS_W
         h = canvas.winfo_height() or CANVAS_H
-        tiles = draw_tiles(state["center_px"], state["center_py"], state["z"], w, h)
+        tiles = draw_tiles(state["center_px"], state["center_py"], state["z"], w, h, state["sobreposicao"])
         draw = ImageDraw.Draw(tiles, "RGBA")
-        rings_px = rings_to_pixel(state["polys_ll"], state["z"], state["center_px"], state["center_py"], w, h)
+        camada = state["camada"]
+        rings_px, pontos = camada.visiveis(state["z"], state["center_px"], state["center_py"], w, h) if camada else ([], [])
         for poly in rings_px:
+            if poly["indice"] == state["selecionado"]:
+                fill, outline = COR_SELECIONADO, COR_CONTORNO_SELECIONADO
+            else:
+                fill, outline = COR_TALHAO, COR_CONTORNO
             for ring in poly["outer"]:
                 if len(ring) >= 3:
-                    draw.polygon(ring, fill=(106, 168, 79, 120), outline=(34, 95, 16, 255), width=2)
+                    draw.polygon(ring, fill=fill, outline=outline, width=2)
             for ring in poly["inner"]:
                 if len(ring) >= 3:
-                    draw.polygon(ring, fill=(255, 255, 255, 255), outline=(34, 95, 16, 255), width=1)
+                    draw.polygon(ring, fill=(255, 255, 255, 255), outline=COR_CONTORNO, width=1)
+        for X, Y in pontos:
+            draw.ellipse((X - 3, Y - 3, X + 3, Y + 3), fill=COR_CONTORNO)
         photo = ImageTk.PhotoImage(tiles)
         state["photo"] = photo
         canvas.delete("all")
         canvas.create_image(0, 0, image=photo, anchor="nw")
-        for poly in rings_px:
-            for ring in poly["outer"]:
-                if len(ring) >= 3:
-                    flat = [coord for p in ring for coord in p]
-                    canvas.create_polygon(*flat, outline="#225f10", fill="", width=2)
+
+    def _agendar_redraw():
+        # Vários eventos de arraste/roda entre dois quadros viram um só redesenho.
+        if state["redesenho"] is None:
+            state["redesenho"] = canvas.after_idle(_redraw_agendado)
+
+    def _redraw_agendado():
+        state["redesenho"] = None
+        _redraw()
+
+    def _aplicar_area(ha):
+        campo = ctx.campos.get("Área (Ha)")
+        if hasattr(campo, "delete") and hasattr(campo, "insert"):
+            campo.delete(0, "end")
+            campo.insert(0, f"{ha:.4f}")
+            return True
+        messagebox.showwarning("Aplicar", "Campo 'Área (Ha)' não encontrado.")
+        return False
+
+    def _selecionar(canvas_x, canvas_y):
+        camada = state["camada"]
+        if camada is None:
+            return
+        w = canvas.winfo_width() or CANVAS_W
+        h = canvas.winfo_height() or CANVAS_H
+        i = camada.localizar(canvas_x, canvas_y, state["z"], state["center_px"], state["center_py"], w, h)
+        if i == state["selecionado"]:
+            return
+        state["selecionado"] = i
+        if i >= 0:
+            ha = state["areas_ha"][i]
+            res_ha_val.configure(text=f"{ha:.4f} (talhão {i + 1} de {len(camada)})")
+            _aplicar_area(ha)
+        _agendar_redraw()
 
     def _on_button1_press(event):
         state["drag"] = (event.x, event.y)
+        state["arrastou"] = False
 
     def _on_button1_motion(event):
         if state["drag"] is None:
@@ -345,11 +305,14 @@ def add_tab(tabhost, ctx):
         ox, oy = state["drag"]
         dx, dy = event.x - ox, event.y - oy
         state["drag"] = (event.x, event.y)
+        state["arrastou"] = True
         state["center_px"] -= dx
         state["center_py"] -= dy
-        _redraw()
+        _agendar_redraw()
 
-    def _on_button1_release(_event):
+    def _on_button1_release(event):
+        if state["drag"] is not None and not state["arrastou"]:
+            _selecionar(event.x, event.y)
         state["drag"] = None
 
     def _zoom_at(canvas_x, canvas_y, factor):
@@ -364,7 +327,7 @@ def add_tab(tabhost, ctx):
         state["center_px"] += (new_px - px_world)
         state["center_py"] += (new_py - py_world)
         state["z"] = z_new
-        _redraw()
+        _agendar_redraw()
 
     def _on_mousewheel(event):
         if hasattr(event, "delta") and event.delta != 0:
@@ -388,35 +351,81 @@ def add_tab(tabhost, ctx):
     canvas.bind("<Button-5>", _on_mousewheel)
     canvas.bind("<Double-Button-1>", _on_double_click)
 
+    linha_camada = ctk.CTkFrame(sec_prev, fg_color="transparent")
+    linha_camada.pack(fill="x", pady=(6, 0))
+    camada_var = ctk.StringVar(value="Nenhuma")
+    legenda_val = ctk.CTkLabel(linha_camada, text="", anchor="w")
+
+    def escolher_camada(nome):
+        raster = state["raster"]
+        if raster is None or nome not in raster.camadas:
+            state["sobreposicao"] = None
+            legenda_val.configure(text="")
+        else:
+            sobreposicao = state["sobreposicoes"].get(nome)
+            if sobreposicao is None:
+                sobreposicao = state["sobreposicoes"][nome] = SobreposicaoRaster(raster, nome)
+            state["sobreposicao"] = sobreposicao
+            minimo, maximo = sobreposicao.faixa
+            legenda_val.configure(text=f"vermelho {minimo:.2f} → verde {maximo:.2f}")
+        _agendar_redraw()
+
+    menu_camada = ctk.CTkOptionMenu(linha_camada, variable=camada_var, values=["Nenhuma"], command=escolher_camada)
+
+    def carregar_amostras():
+        if not state["polys_ll"]:
+            messagebox.showwarning("Amostras", "Calcule a área do talhão (KMZ/KML) antes de carregar as amostras.")
+            return
+        path = filedialog.askopenfilename(
+            title="Selecione o CSV de amostras em grade",
+            filetypes=[("CSV", "*.csv"), ("Todos os arquivos", "*.*")],
+        )
+        if not path:
+            return
+        try:
+            produtividade = parse_float(ctx.get_entradas().get("Produtividade esperada")) or 3.0
+            raster = gerar_prescricao(ler_amostras(path), state["polys_ll"], produtividade=produtividade)
+        except Exception as e:
+            messagebox.showerror("Erro nas amostras", str(e))
+            return
+        state["raster"] = raster
+        state["sobreposicoes"] = {}
+        nomes = ["Nenhuma", *raster.camadas]
+        menu_camada.configure(values=nomes)
+        camada_var.set(nomes[1] if len(nomes) > 1 else "Nenhuma")
+        escolher_camada(camada_var.get())
+
+    ctk.CTkButton(linha_camada, text="Amostras (CSV)", command=carregar_amostras).pack(side="left")
+    ctk.CTkLabel(linha_camada, text="Sobreposição:").pack(side="left", padx=(10, 4))
+    menu_camada.pack(side="left")
+    legenda_val.pack(side="left", padx=10)
+
     btns_wrap = ctk.CTkFrame(frame, fg_color="transparent")
     btns_wrap.pack(fill="x", pady=(4, 0))
 
     def calcular_area():
         path = caminho_var.get().strip()
         if not path:
-            messagebox.showwarning("Arquivo", "Selecione um arquivo KMZ/KML.")
+            messagebox.showwarning("Arquivo", "Selecione um arquivo KMZ, KML, GeoJSON ou Shapefile.")
             return
         try:
-            if path.lower().endswith(".kmz"):
-                data = _load_kml_from_kmz(path)
-                root = ET.fromstring(data)
-            else:
-                with open(path, "rb") as f:
-                    data = f.read()
-                root = ET.fromstring(data)
-            m2, polys = _sum_kml_polygon_areas_and_collect_rings(root)
+            m2, polys = ler_contorno(path)
             ha = m2 / 10_000.0
             res_ha_val.configure(text=f"{ha:.4f}")
             state["polys_ll"] = polys
+            state["camada"] = CamadaTalhoes(polys)
+            state["areas_ha"] = [_poly_area_m2(p) / 10_000.0 for p in polys]
+            state["selecionado"] = -1
+            state["raster"] = None
+            state["sobreposicoes"] = {}
+            state["sobreposicao"] = None
+            menu_camada.configure(values=["Nenhuma"])
+            camada_var.set("Nenhuma")
+            legenda_val.configure(text="")
             _fit_view()
             _redraw()
             if messagebox.askyesno("Confirmar Área", f"Deseja aplicar {ha:.4f} ha no campo 'Área (Ha)' da aba principal?"):
-                campo = ctx.campos.get("Área (Ha)")
-                if hasattr(campo, "delete") and hasattr(campo, "insert"):
-                    campo.delete(0, "end")
-                    campo.insert(0, f"{ha:.4f}")
-                else:
-                    messagebox.showwarning("Aplicar", "Campo 'Área (Ha)' não encontrado.")
+                _aplicar_area(ha)
         except Exception as e:
             messagebox.showerror("Erro ao calcular", str(e))
 
@@ -14,6 +14,7 @@ from core.calagem_dados import (
 from .design_constants import *
 from .ui import make_section as build_section, place_logo_footer
 
+TITULO = '🪨 Recomendação de Calcário'
 PH_THRESHOLD_NEED = 5.5
 PH_SEVERE_PD = 5.2
 ALPCT_LIMIT_NO_LIME = 10.0
@@ -62,7 +63,7 @@ def add_tab(tabhost, ctx):
 
     logo_image = getattr(ctx, 'logo_image', None)
 
-    aba = tabhost.add_tab('🪨 Recomendação de Calcário')
+    aba = tabhost.add_tab(TITULO)
     outer = ctk.CTkScrollableFrame(aba, fg_color='transparent')
     outer.pack(fill='both', expand=True, padx=PADX_STANDARD, pady=PADY_STANDARD)
     outer.grid_columnconfigure(0, weight=1)
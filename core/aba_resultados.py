@@ -26,6 +26,7 @@ from .design_constants import (
 )
 
 
+TITULO = "🌾 Resultados"
 SUPPLEMENT_NAMES: set[str] = {GESSO_PADRAO.nome, MOLIBDATO_PADRAO.nome}
 SACA_PESO_KG = 50.0
 FRAME_BORDER_COLOR = "#1f1f1f"
@@ -156,6 +157,59 @@ def _obter_fertilizantes(ctx: AppContext) -> Dict[str, object]:
 def _limpar_conteudo(container: ctk.CTkFrame) -> None:
     for widget in container.winfo_children():
         widget.destroy()
+    container._pool_linhas = {}  # noqa: SLF001
+
+
+def _criar_linha(
+    container: ctk.CTkFrame,
+    rotulo: str,
+    valor: str,
+    label_font: ctk.CTkFont,
+    value_font: ctk.CTkFont,
+    align_right: bool,
+) -> dict:
+    linha = ctk.CTkFrame(container, fg_color="transparent")
+    if align_right:
+        linha.grid_columnconfigure(0, weight=0)
+        linha.grid_columnconfigure(1, weight=0)
+        label_sticky = "e"
+        value_sticky = "e"
+        label_anchor = "e"
+        value_anchor = "e"
+    else:
+        linha.grid_columnconfigure(0, weight=1)
+        linha.grid_columnconfigure(1, weight=0)
+        label_sticky = "w"
+        value_sticky = "e"
+        label_anchor = "w"
+        value_anchor = "e"
+    rotulo_label = ctk.CTkLabel(
+        linha,
+        text=rotulo,
+        font=label_font,
+        anchor=label_anchor,
+        text_color=(TEXT_PRIMARY, "#4a9eff"),
+    )
+    rotulo_label.grid(row=0, column=0, sticky=label_sticky)
+    valor_label = ctk.CTkLabel(
+        linha,
+        text=valor,
+        font=value_font,
+        anchor=value_anchor,
+        text_color=TEXT_SECONDARY,
+    )
+    valor_label.grid(row=0, column=1, sticky=value_sticky, padx=(PADX_SMALL, 0))
+    return {"frame": linha, "valor_label": valor_label, "valor": valor, "row": None}
+
+
+def _posicionar_linha(entrada: dict, idx: int, align_right: bool) -> None:
+    if entrada["row"] == idx:
+        return
+    if align_right:
+        entrada["frame"].grid(row=idx, column=0, sticky="e", padx=(PADX_STANDARD, PADX_STANDARD), pady=(PADY_SMALL, PADY_SMALL + 8))
+    else:
+        entrada["frame"].grid(row=idx, column=0, sticky="ew", padx=PADX_STANDARD, pady=(PADY_SMALL, PADY_SMALL + 8))
+    entrada["row"] = idx
 
 
 def _preencher_linhas(
@@ -166,43 +220,30 @@ def _preencher_linhas(
     *,
     align_right: bool = False,
 ) -> None:
-    _limpar_conteudo(container)
+    """Sincroniza as linhas do container com `itens` reaproveitando os widgets.
+
+    As linhas ficam num pool indexado pelo rótulo (e pela ocorrência, caso o
+    mesmo rótulo se repita): valores alterados só trocam o texto do label, e
+    linhas são criadas ou destruídas apenas quando a lista de produtos muda.
+    """
+    pool: Dict[Tuple[str, int], dict] = getattr(container, "_pool_linhas", None) or {}
+    novo_pool: Dict[Tuple[str, int], dict] = {}
+    ocorrencias: Dict[str, int] = {}
     for idx, (rotulo, valor) in enumerate(itens):
-        linha = ctk.CTkFrame(container, fg_color="transparent")
-        if align_right:
-            sticky = "e"
-            linha.grid(row=idx, column=0, sticky=sticky, padx=(PADX_STANDARD, PADX_STANDARD), pady=(PADY_SMALL, PADY_SMALL + 8))
-            linha.grid_columnconfigure(0, weight=0)
-            linha.grid_columnconfigure(1, weight=0)
-            label_sticky = "e"
-            value_sticky = "e"
-            label_anchor = "e"
-            value_anchor = "e"
-        else:
-            sticky = "ew"
-            linha.grid(row=idx, column=0, sticky=sticky, padx=PADX_STANDARD, pady=(PADY_SMALL, PADY_SMALL + 8))
-            linha.grid_columnconfigure(0, weight=1)
-            linha.grid_columnconfigure(1, weight=0)
-            label_sticky = "w"
-            value_sticky = "e"
-            label_anchor = "w"
-            value_anchor = "e"
-        rotulo_label = ctk.CTkLabel(
-            linha,
-            text=rotulo,
-            font=label_font,
-            anchor=label_anchor,
-            text_color=(TEXT_PRIMARY, "#4a9eff"),
-        )
-        rotulo_label.grid(row=0, column=0, sticky=label_sticky)
-        valor_label = ctk.CTkLabel(
-            linha,
-            text=valor,
-            font=value_font,
-            anchor=value_anchor,
-            text_color=TEXT_SECONDARY,
-        )
-        valor_label.grid(row=0, column=1, sticky=value_sticky, padx=(PADX_SMALL, 0))
+        ocorrencia = ocorrencias.get(rotulo, 0)
+        ocorrencias[rotulo] = ocorrencia + 1
+        chave = (rotulo, ocorrencia)
+        entrada = pool.pop(chave, None)
+        if entrada is None:
+            entrada = _criar_linha(container, rotulo, valor, label_font, value_font, align_right)
+        elif entrada["valor"] != valor:
+            entrada["valor_label"].configure(text=valor)
+            entrada["valor"] = valor
+        _posicionar_linha(entrada, idx, align_right)
+        novo_pool[chave] = entrada
+    for sobra in pool.values():
+        sobra["frame"].destroy()
+    container._pool_linhas = novo_pool  # noqa: SLF001
 
 
 def _montar_itens_per_area(
@@ -275,6 +316,8 @@ def _texto_fertilizantes(
 
     if modo_norm.startswith("fertilizantes form"):
         partes.append("Formulado selecionado com complementos calculados automaticamente.")
+    elif modo_norm.startswith("menor custo"):
+        partes.append("Combinação de menor custo calculada a partir dos preços informados.")
     elif submodo_norm.startswith("escolha do usuario"):
         partes.append("Fertilizantes individuais definidos pelo usuário.")
     elif modo_norm:
@@ -387,7 +430,7 @@ def add_tab(tabhost: TabHost, ctx: AppContext):
     value_font = ctk.CTkFont(size=FONT_SIZE_BODY + 1)
     recomend_font = ctk.CTkFont(size=FONT_SIZE_BODY + 2)
 
-    aba = tabhost.add_tab("🌾 Resultados")
+    aba = tabhost.add_tab(TITULO)
     outer = ctk.CTkScrollableFrame(aba, fg_color="transparent")
     outer.pack(fill="both", expand=True, padx=PADX_STANDARD, pady=PADY_STANDARD)
     outer.grid_columnconfigure(0, weight=1)
@@ -522,7 +565,7 @@ def add_tab(tabhost: TabHost, ctx: AppContext):
     }
 
     ctx.resultados_controls = controles
-    ctx.atualizar_resultados = lambda: _refresh_all(ctx)
+    ctx.atualizar_resultados = lambda: ctx.marcar_recalculo("resultados")
 
     _refresh_all(ctx)
 
@@ -4,7 +4,10 @@ from __future__ import annotations
 
 import unicodedata
 from dataclasses import dataclass
-from typing import Dict, Literal, Optional
+from typing import Dict, Literal, Optional, Tuple
+
+from .registros import DATACLASS_SLOTS, RegistroCompacto
+from .tabelas_manual import TabelasManual, tabelas_ou_padrao
 
 NivelSolo = Literal['muito baixo', 'baixo', 'medio', 'alto', 'muito alto']
 EstrategiaMuitoAlto = Literal['zero_e_manutencao', 'repor', 'zero_e_zero']
@@ -15,15 +18,17 @@ def _normalizar(texto: str) -> str:
     return unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode().lower().strip()
 
 
+_NIVEIS: Dict[str, NivelSolo] = {
+    'muito baixo': 'muito baixo',
+    'baixo': 'baixo',
+    'medio': 'medio',
+    'alto': 'alto',
+    'muito alto': 'muito alto',
+}
+
+
 def _nivel(texto: str) -> NivelSolo:
-    mapa = {
-        'muito baixo': 'muito baixo',
-        'baixo': 'baixo',
-        'medio': 'medio',
-        'alto': 'alto',
-        'muito alto': 'muito alto',
-    }
-    return mapa.get(_normalizar(texto), 'medio')
+    return _NIVEIS.get(_normalizar(texto), 'medio')
 
 
 def _arredondar(valor: float, modo: RoundingMode) -> float:
@@ -32,27 +37,32 @@ def _arredondar(valor: float, modo: RoundingMode) -> float:
     return round(valor, 1)
 
 
-def _manutencao(produtividade: float) -> Dict[str, float]:
-    extra = max(0.0, produtividade - 3.0)
-    return {
-        'P2O5': 45.0 + 15.0 * extra,
-        'K2O': 75.0 + 25.0 * extra,
-    }
+class DosePK(RegistroCompacto):
+    """Doses de P2O5 e K2O (kg/ha); lida como ``dose['P2O5']``."""
+
+    __slots__ = ('P2O5', 'K2O')
+
+
+class TotaisAdubacao(RegistroCompacto):
+    __slots__ = ('P2O5_total', 'K2O_total', 'K2O_linha', 'K2O_lanco', 'S_SO4', 'Mo_g_ha', 'Co_g_ha')
 
 
-def _reposicao(produtividade: float) -> Dict[str, float]:
-    return {
-        'P2O5': 14.0 * produtividade,
-        'K2O': 20.0 * produtividade,
-    }
+def _manutencao(produtividade: float, tabelas: TabelasManual) -> DosePK:
+    extra = max(0.0, produtividade - tabelas.produtividade_referencia)
+    (base_p, base_k), (por_t_p, por_t_k) = tabelas.manutencao_base, tabelas.manutencao_por_t
+    return DosePK(base_p + por_t_p * extra, base_k + por_t_k * extra)
 
 
-def _correcao_total(nivel: NivelSolo) -> Dict[str, float]:
-    p_map = {'muito baixo': 160.0, 'baixo': 80.0, 'medio': 40.0}
-    k_map = {'muito baixo': 120.0, 'baixo': 60.0, 'medio': 30.0}
-    if nivel not in p_map:
-        return {'P2O5': 0.0, 'K2O': 0.0}
-    return {'P2O5': p_map[nivel], 'K2O': k_map[nivel]}
+def _reposicao(produtividade: float, tabelas: TabelasManual) -> DosePK:
+    por_t_p, por_t_k = tabelas.reposicao_por_t
+    return DosePK(por_t_p * produtividade, por_t_k * produtividade)
+
+
+_SEM_CORRECAO = (0.0, 0.0)
+
+
+def _correcao_total(nivel: NivelSolo, tabelas: TabelasManual) -> DosePK:
+    return DosePK(*tabelas.correcao_total.get(nivel, _SEM_CORRECAO))
 
 
 def _usar_gradual(argila_pct: Optional[float], ctc: Optional[float]) -> bool:
@@ -63,17 +73,19 @@ def _usar_gradual(argila_pct: Optional[float], ctc: Optional[float]) -> bool:
     return False
 
 
-def _limite_k_linha(k_total: float) -> Dict[str, float]:
-    k_linha = min(k_total, 80.0)
+def _limite_k_linha(k_total: float, k_linha_max: float) -> Tuple[float, float]:
+    """(K2O na linha, K2O a lanço)."""
+    k_linha = min(k_total, k_linha_max)
     k_lanco = max(0.0, k_total - k_linha)
-    return {'K2O_linha': k_linha, 'K2O_lanco': k_lanco}
+    return k_linha, k_lanco
 
 
-def _nutrientes_complementares(s_mg_dm3: Optional[float], ph_agua: Optional[float]) -> Dict[str, float]:
+def _nutrientes_complementares(s_mg_dm3: Optional[float], ph_agua: Optional[float]) -> Tuple[float, float, float]:
+    """(S_SO4 kg/ha, Mo g/ha, Co g/ha)."""
     s_so4 = 20.0 if (s_mg_dm3 is not None and s_mg_dm3 < 10.0) else 0.0
     mo = 35.0 if (ph_agua is not None and ph_agua < 5.5) else 0.0
     co = 3.0
-    return {'S_SO4': s_so4, 'Mo_g_ha': mo, 'Co_g_ha': co}
+    return s_so4, mo, co
 
 
 @dataclass
@@ -92,14 +104,14 @@ class EntradaSoja:
     rounding: RoundingMode = 'nearest5'
 
 
-@dataclass
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class ResultadoAdubacao:
-    totais: Dict[str, float]
+    totais: TotaisAdubacao
     descricao_p: str
     descricao_k: str
-    manutencao: Dict[str, float]
-    reposicao: Dict[str, float]
-    observacoes: list[str]
+    manutencao: DosePK
+    reposicao: DosePK
+    observacoes: Tuple[str, ...]
 
     @property
     def estrategia_p(self) -> str:
@@ -109,16 +121,27 @@ class ResultadoAdubacao:
     def estrategia_k(self) -> str:
         return self.descricao_k
 
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            'totais': self.totais.as_dict(),
+            'descricao_p': self.descricao_p,
+            'descricao_k': self.descricao_k,
+            'manutencao': self.manutencao.as_dict(),
+            'reposicao': self.reposicao.as_dict(),
+            'observacoes': list(self.observacoes),
+        }
+
 
-def recomendar_adubacao_soja(entrada: EntradaSoja) -> ResultadoAdubacao:
+def recomendar_adubacao_soja(entrada: EntradaSoja, tabelas: Optional[TabelasManual] = None) -> ResultadoAdubacao:
+    tabelas = tabelas_ou_padrao(tabelas)
     p_class = _nivel(entrada.p_class)
     k_class = _nivel(entrada.k_class)
 
     gradual_p = _usar_gradual(entrada.argila_pct, entrada.ctc) and p_class in {'muito baixo', 'baixo'}
     gradual_k = _usar_gradual(entrada.argila_pct, entrada.ctc) and k_class in {'muito baixo', 'baixo'}
 
-    manutencao = _manutencao(entrada.produtividade)
-    reposicao = _reposicao(entrada.produtividade)
+    manutencao = _manutencao(entrada.produtividade, tabelas)
+    reposicao = _reposicao(entrada.produtividade, tabelas)
     observacoes: list[str] = []
 
     if entrada.argila_pct is not None and entrada.argila_pct < 20:
@@ -130,7 +153,7 @@ def recomendar_adubacao_soja(entrada: EntradaSoja) -> ResultadoAdubacao:
     p_total = 0.0
     if p_class in {'muito baixo', 'baixo'}:
         descricao_p = 'Correcao total'
-        p_corr = _correcao_total(p_class)['P2O5']
+        p_corr = _correcao_total(p_class, tabelas)['P2O5']
         if gradual_p:
             descricao_p = 'Correcao gradual'
             frac = 2.0 / 3.0 if entrada.cultivo == 1 else 1.0 / 3.0
@@ -139,7 +162,7 @@ def recomendar_adubacao_soja(entrada: EntradaSoja) -> ResultadoAdubacao:
             p_total = (p_corr + manutencao['P2O5']) if entrada.cultivo == 1 else manutencao['P2O5']
     elif p_class == 'medio':
         descricao_p = 'Correcao parcial'
-        p_corr = _correcao_total('medio')['P2O5']
+        p_corr = _correcao_total('medio', tabelas)['P2O5']
         p_total = (p_corr + manutencao['P2O5']) if entrada.cultivo == 1 else manutencao['P2O5']
     elif p_class == 'alto':
         descricao_p = 'Manutencao'
@@ -160,7 +183,7 @@ def recomendar_adubacao_soja(entrada: EntradaSoja) -> ResultadoAdubacao:
     k_total = 0.0
     if k_class in {'muito baixo', 'baixo'}:
         descricao_k = 'Correcao total'
-        k_corr = _correcao_total(k_class)['K2O']
+        k_corr = _correcao_total(k_class, tabelas)['K2O']
         if gradual_k:
             descricao_k = 'Correcao gradual'
             frac = 2.0 / 3.0 if entrada.cultivo == 1 else 1.0 / 3.0
@@ -169,7 +192,7 @@ def recomendar_adubacao_soja(entrada: EntradaSoja) -> ResultadoAdubacao:
             k_total = (k_corr + manutencao['K2O']) if entrada.cultivo == 1 else manutencao['K2O']
     elif k_class == 'medio':
         descricao_k = 'Correcao parcial'
-        k_corr = _correcao_total('medio')['K2O']
+        k_corr = _correcao_total('medio', tabelas)['K2O']
         k_total = (k_corr + manutencao['K2O']) if entrada.cultivo == 1 else manutencao['K2O']
     elif k_class == 'alto':
         descricao_k = 'Manutencao'
@@ -187,17 +210,17 @@ def recomendar_adubacao_soja(entrada: EntradaSoja) -> ResultadoAdubacao:
         k_total += entrada.starter_k2o_kg_ha
 
     complementares = _nutrientes_complementares(entrada.teor_s_mg_dm3, entrada.ph_agua)
-    k_partes = _limite_k_linha(k_total)
-
-    totais = {
-        'P2O5_total': _arredondar(p_total, entrada.rounding),
-        'K2O_total': _arredondar(k_total, entrada.rounding),
-        'K2O_linha': _arredondar(k_partes['K2O_linha'], entrada.rounding),
-        'K2O_lanco': _arredondar(k_partes['K2O_lanco'], entrada.rounding),
-        'S_SO4': complementares['S_SO4'],
-        'Mo_g_ha': complementares['Mo_g_ha'],
-        'Co_g_ha': complementares['Co_g_ha'],
-    }
+    k_linha, k_lanco = _limite_k_linha(k_total, tabelas.k2o_linha_max)
+
+    totais = TotaisAdubacao(
+        P2O5_total=_arredondar(p_total, entrada.rounding),
+        K2O_total=_arredondar(k_total, entrada.rounding),
+        K2O_linha=_arredondar(k_linha, entrada.rounding),
+        K2O_lanco=_arredondar(k_lanco, entrada.rounding),
+        S_SO4=complementares[0],
+        Mo_g_ha=complementares[1],
+        Co_g_ha=complementares[2],
+    )
 
     return ResultadoAdubacao(
         totais=totais,
@@ -205,5 +228,5 @@ def recomendar_adubacao_soja(entrada: EntradaSoja) -> ResultadoAdubacao:
         descricao_k=descricao_k,
         manutencao=manutencao,
         reposicao=reposicao,
-        observacoes=observacoes,
-    )
\ No newline at end of file
+        observacoes=tuple(observacoes),
+    )
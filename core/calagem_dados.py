@@ -1,52 +1,31 @@
 ﻿from __future__ import annotations
 
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional
+
+from .tabelas_manual import EDICAO_PADRAO, TabelasManual, carregar_edicao, tabelas_ou_padrao
 
 # Numeric tables for soybean liming (Manual RS/SC 2016)
 # All doses expressed as t/ha assuming PRNT 100%
 # Strings kept ASCII-only to avoid encoding issues on Windows consoles
 
+_TABELAS_2016 = carregar_edicao(EDICAO_PADRAO)
+
+# Views of the registry tables (core.tabelas_manual) in the original layout.
 SMP_TABLE: List[Dict[str, float]] = [
-    {"SMP_index": 4.4, "NC_t_ha_pH5_5": 15.0, "NC_t_ha_pH6_0": 21.0, "NC_t_ha_pH6_5": 29.0},
-    {"SMP_index": 4.5, "NC_t_ha_pH5_5": 12.5, "NC_t_ha_pH6_0": 17.3, "NC_t_ha_pH6_5": 24.0},
-    {"SMP_index": 4.6, "NC_t_ha_pH5_5": 10.9, "NC_t_ha_pH6_0": 15.1, "NC_t_ha_pH6_5": 20.0},
-    {"SMP_index": 4.7, "NC_t_ha_pH5_5": 9.6,  "NC_t_ha_pH6_0": 13.3, "NC_t_ha_pH6_5": 17.5},
-    {"SMP_index": 4.8, "NC_t_ha_pH5_5": 8.5,  "NC_t_ha_pH6_0": 11.9, "NC_t_ha_pH6_5": 15.7},
-    {"SMP_index": 4.9, "NC_t_ha_pH5_5": 7.7,  "NC_t_ha_pH6_0": 10.7, "NC_t_ha_pH6_5": 14.2},
-    {"SMP_index": 5.0, "NC_t_ha_pH5_5": 6.6,  "NC_t_ha_pH6_0": 9.9,  "NC_t_ha_pH6_5": 13.3},
-    {"SMP_index": 5.1, "NC_t_ha_pH5_5": 6.0,  "NC_t_ha_pH6_0": 9.1,  "NC_t_ha_pH6_5": 12.3},
-    {"SMP_index": 5.2, "NC_t_ha_pH5_5": 5.3,  "NC_t_ha_pH6_0": 8.3,  "NC_t_ha_pH6_5": 11.3},
-    {"SMP_index": 5.3, "NC_t_ha_pH5_5": 4.8,  "NC_t_ha_pH6_0": 7.5,  "NC_t_ha_pH6_5": 10.4},
-    {"SMP_index": 5.4, "NC_t_ha_pH5_5": 4.2,  "NC_t_ha_pH6_0": 6.8,  "NC_t_ha_pH6_5": 9.5},
-    {"SMP_index": 5.5, "NC_t_ha_pH5_5": 3.7,  "NC_t_ha_pH6_0": 6.1,  "NC_t_ha_pH6_5": 8.6},
-    {"SMP_index": 5.6, "NC_t_ha_pH5_5": 3.2,  "NC_t_ha_pH6_0": 5.4,  "NC_t_ha_pH6_5": 7.8},
-    {"SMP_index": 5.7, "NC_t_ha_pH5_5": 2.8,  "NC_t_ha_pH6_0": 4.8,  "NC_t_ha_pH6_5": 7.0},
-    {"SMP_index": 5.8, "NC_t_ha_pH5_5": 2.3,  "NC_t_ha_pH6_0": 4.2,  "NC_t_ha_pH6_5": 6.3},
-    {"SMP_index": 5.9, "NC_t_ha_pH5_5": 2.0,  "NC_t_ha_pH6_0": 3.7,  "NC_t_ha_pH6_5": 5.6},
-    {"SMP_index": 6.0, "NC_t_ha_pH5_5": 1.6,  "NC_t_ha_pH6_0": 3.2,  "NC_t_ha_pH6_5": 4.9},
-    {"SMP_index": 6.1, "NC_t_ha_pH5_5": 1.3,  "NC_t_ha_pH6_0": 2.7,  "NC_t_ha_pH6_5": 4.3},
-    {"SMP_index": 6.2, "NC_t_ha_pH5_5": 1.0,  "NC_t_ha_pH6_0": 2.2,  "NC_t_ha_pH6_5": 3.7},
-    {"SMP_index": 6.3, "NC_t_ha_pH5_5": 0.8,  "NC_t_ha_pH6_0": 1.8,  "NC_t_ha_pH6_5": 3.1},
-    {"SMP_index": 6.4, "NC_t_ha_pH5_5": 0.6,  "NC_t_ha_pH6_0": 1.4,  "NC_t_ha_pH6_5": 2.6},
-    {"SMP_index": 6.5, "NC_t_ha_pH5_5": 0.4,  "NC_t_ha_pH6_0": 1.1,  "NC_t_ha_pH6_5": 2.1},
-    {"SMP_index": 6.6, "NC_t_ha_pH5_5": 0.2,  "NC_t_ha_pH6_0": 0.8,  "NC_t_ha_pH6_5": 1.6},
-    {"SMP_index": 6.7, "NC_t_ha_pH5_5": 0.0,  "NC_t_ha_pH6_0": 0.5,  "NC_t_ha_pH6_5": 1.2},
-    {"SMP_index": 6.8, "NC_t_ha_pH5_5": 0.0,  "NC_t_ha_pH6_0": 0.3,  "NC_t_ha_pH6_5": 0.8},
-    {"SMP_index": 6.9, "NC_t_ha_pH5_5": 0.0,  "NC_t_ha_pH6_0": 0.2,  "NC_t_ha_pH6_5": 0.5},
-    {"SMP_index": 7.0, "NC_t_ha_pH5_5": 0.0,  "NC_t_ha_pH6_0": 0.0,  "NC_t_ha_pH6_5": 0.2},
-    {"SMP_index": 7.1, "NC_t_ha_pH5_5": 0.0,  "NC_t_ha_pH6_0": 0.0,  "NC_t_ha_pH6_5": 0.0},
+    {
+        "SMP_index": smp,
+        "NC_t_ha_pH5_5": _TABELAS_2016.nc_smp[5.5][i],
+        "NC_t_ha_pH6_0": _TABELAS_2016.nc_smp[6.0][i],
+        "NC_t_ha_pH6_5": _TABELAS_2016.nc_smp[6.5][i],
+    }
+    for i, smp in enumerate(_TABELAS_2016.indices_smp)
 ]
 
-V_TARGETS: Dict[float, float] = {
-    5.5: 65.0,
-    6.0: 75.0,
-    6.5: 85.0,
-}
+V_TARGETS: Dict[float, float] = dict(_TABELAS_2016.v_alvo)
 
 POLY_COEFFS: Dict[float, Dict[str, float]] = {
-    5.5: {"a_intercept": -0.653, "b_MO": 0.480, "c_Al": 1.937},
-    6.0: {"a_intercept": -0.516, "b_MO": 0.805, "c_Al": 2.435},
-    6.5: {"a_intercept": -0.122, "b_MO": 1.193, "c_Al": 2.713},
+    ph: {"a_intercept": a, "b_MO": b, "c_Al": c}
+    for ph, (a, b, c) in _TABELAS_2016.coef_polinomio.items()
 }
 
 DECISION_RULES: List[Dict[str, str]] = [
@@ -84,61 +63,30 @@ OUTPUTS_SCHEMA: List[Dict[str, str]] = [
 ]
 
 
-def _interp(x: float, x0: float, y0: float, x1: float, y1: float) -> float:
-    """Simple linear interpolation."""
-    if x1 == x0:
-        return y0
-    t = (x - x0) / (x1 - x0)
-    return y0 + t * (y1 - y0)
-
-
-def _get_two_closest_rows_by_SMP(smp: float) -> Tuple[Dict[str, float], Dict[str, float]]:
-    rows = sorted(SMP_TABLE, key=lambda r: r["SMP_index"])
-    if smp <= rows[0]["SMP_index"]:
-        return rows[0], rows[0]
-    if smp >= rows[-1]["SMP_index"]:
-        return rows[-1], rows[-1]
-    lo = rows[0]
-    for hi in rows[1:]:
-        if lo["SMP_index"] <= smp <= hi["SMP_index"]:
-            return lo, hi
-        lo = hi
-    return rows[-1], rows[-1]
-
-
-def lime_dose_from_SMP(smp: float, desired_pH: float = 6.0) -> Optional[float]:
+def lime_dose_from_SMP(smp: float, desired_pH: float = 6.0, tabelas: Optional[TabelasManual] = None) -> Optional[float]:
     """Return NC (t/ha, PRNT 100%) via SMP table for the chosen pH target."""
-    column = {
-        5.5: "NC_t_ha_pH5_5",
-        6.0: "NC_t_ha_pH6_0",
-        6.5: "NC_t_ha_pH6_5",
-    }.get(desired_pH)
-    if column is None:
-        return None
-    lo, hi = _get_two_closest_rows_by_SMP(smp)
-    if lo["SMP_index"] == hi["SMP_index"]:
-        return float(lo[column])
-    return _interp(smp, lo["SMP_index"], lo[column], hi["SMP_index"], hi[column])
+    return tabelas_ou_padrao(tabelas).nc_smp_interpolado(smp, desired_pH)
 
 
-def lime_dose_from_V(ctc_pH7: float, v_current: float, desired_pH: float = 6.0) -> Optional[float]:
+def lime_dose_from_V(
+    ctc_pH7: float, v_current: float, desired_pH: float = 6.0, tabelas: Optional[TabelasManual] = None
+) -> Optional[float]:
     """NC (t/ha, PRNT 100%) via the V% method: ((V1 - V2)/100) * CTC."""
-    v_target = V_TARGETS.get(desired_pH)
+    v_target = tabelas_ou_padrao(tabelas).v_alvo.get(desired_pH)
     if v_target is None:
         return None
     return ((v_target - v_current) / 100.0) * ctc_pH7
 
 
-def lime_dose_from_polynomial(mo_percent: float, al_cmolc: float, desired_pH: float = 6.0) -> Optional[float]:
+def lime_dose_from_polynomial(
+    mo_percent: float, al_cmolc: float, desired_pH: float = 6.0, tabelas: Optional[TabelasManual] = None
+) -> Optional[float]:
     """NC (t/ha, PRNT 100%) via polynomial equation for low-buffer soils."""
-    coeffs = POLY_COEFFS.get(desired_pH)
+    coeffs = tabelas_ou_padrao(tabelas).coef_polinomio.get(desired_pH)
     if coeffs is None:
         return None
-    return (
-        coeffs["a_intercept"]
-        + coeffs["b_MO"] * mo_percent
-        + coeffs["c_Al"] * al_cmolc
-    )
+    a_intercept, b_mo, c_al = coeffs
+    return a_intercept + b_mo * mo_percent + c_al * al_cmolc
 
 
 def adjust_for_prnt(nc_prnt100: float, prnt_percent: float) -> float:
@@ -3,13 +3,9 @@ from __future__ import annotations
 from typing import Iterable
 from tkinter import messagebox
 
-TABELA_SMP_FIXA = {
-    4.4: 21.0, 4.5: 17.3, 4.6: 15.1, 4.7: 13.3, 4.8: 11.9, 4.9: 10.7,
-    5.0: 9.9, 5.1: 9.1, 5.2: 8.3, 5.3: 7.5, 5.4: 6.8, 5.5: 6.1,
-    5.6: 5.4, 5.7: 4.8, 5.8: 4.2, 5.9: 3.7, 6.0: 3.2, 6.1: 2.7,
-    6.2: 2.2, 6.3: 1.8, 6.4: 1.4, 6.5: 1.1, 6.6: 0.8, 6.7: 0.5,
-    6.8: 0.3, 6.9: 0.2, 7.0: 0.0,
-}
+from . import diagnostico
+from .tabelas_manual import EDICAO_PADRAO, carregar_edicao
+from .ui import coletar_diagnostico_entradas
 
 recom_p2o5: float | None = None
 recom_k2o: float | None = None
@@ -17,7 +13,9 @@ recom_k2o: float | None = None
 campos: dict[str, object] = {}
 labels_classificacao: dict[str, object] = {}
 labels_resultado: dict[str, object] = {}
+ultimas_classificacoes: dict[str, str] = {}
 _cultivo_var = None
+_ctx = None
 
 
 def ligar_cultivo_var(var):
@@ -25,11 +23,21 @@ def ligar_cultivo_var(var):
     _cultivo_var = var
 
 
-def classificar_parametro(valor: float, limites: dict[str, str]) -> str:
-    for faixa, condicao in limites.items():
-        if eval(condicao):
-            return faixa
-    return "Desconhecido"
+def ligar_contexto(ctx):
+    """Contexto onde o diagnóstico do laudo fica guardado para as outras abas."""
+    global _ctx
+    _ctx = ctx
+
+
+def aplicar_classificacoes() -> None:
+    """Escreve as últimas classificações nos labels registrados (abas construídas depois)."""
+    for chave, valor in ultimas_classificacoes.items():
+        widget = labels_classificacao.get(chave)
+        if widget is not None:
+            try:
+                widget.configure(text=valor)
+            except Exception:
+                pass
 
 
 def _valor_widget(widget):
@@ -65,6 +73,19 @@ def _float_opcional(chaves: Iterable[str], default: float = 0.0) -> float:
     return default
 
 
+def _diagnostico_laudo() -> diagnostico.DiagnosticoSoja:
+    entradas = {}
+    for chave, widget in campos.items():
+        try:
+            entradas[chave] = widget.get()
+        except Exception:
+            entradas[chave] = None
+    dados = coletar_diagnostico_entradas(entradas)
+    if _ctx is None:
+        return diagnostico.diagnosticar_soja_registro(dados)
+    return diagnostico.diagnostico_do_laudo(_ctx, dados)
+
+
 def calcular():
     global recom_p2o5, recom_k2o
     if _cultivo_var is None:
@@ -74,145 +95,32 @@ def calcular():
         produtividade = _float_obrigatorio('Produtividade esperada')
         cultivo = _cultivo_var.get()
 
-        fosforo = _float_opcional(['Fosforo (mg/dm3)', 'P (mg/dm3)'], default=0.0)
-        potassio = _float_opcional(['Potassio (mg/dm3)', 'K (mg/dm3)'], default=0.0)
         enxofre = _float_opcional(['Enxofre (mg/dm3)', 'S (mg/dm3)'], default=0.0)
 
         argila = _float_obrigatorio('Argila (%)')
-        ctc = _float_obrigatorio('CTC (cmolc/dm3)')
+        _float_obrigatorio('CTC (cmolc/dm3)')  # classe de K depende da CTC
         ph = _float_obrigatorio('pH (Agua)')
 
-        if argila > 60:
-            classe_argila = 1
-        elif argila > 40:
-            classe_argila = 2
-        elif argila > 20:
-            classe_argila = 3
-        else:
-            classe_argila = 4
-
-        if classe_argila == 1:
-            class_p = classificar_parametro(fosforo, {
-                'Muito Baixo': 'valor <= 3',
-                'Baixo': '3 < valor <= 6',
-                'Medio': '6 < valor <= 9',
-                'Alto': '9 < valor <= 18',
-                'Muito Alto': 'valor > 18',
-            })
-        elif classe_argila == 2:
-            class_p = classificar_parametro(fosforo, {
-                'Muito Baixo': 'valor <= 4',
-                'Baixo': '4 < valor <= 8',
-                'Medio': '8 < valor <= 12',
-                'Alto': '12 < valor <= 24',
-                'Muito Alto': 'valor > 24',
-            })
-        elif classe_argila == 3:
-            class_p = classificar_parametro(fosforo, {
-                'Muito Baixo': 'valor <= 6',
-                'Baixo': '6 < valor <= 12',
-                'Medio': '12 < valor <= 18',
-                'Alto': '18 < valor <= 36',
-                'Muito Alto': 'valor > 36',
-            })
-        else:
-            class_p = classificar_parametro(fosforo, {
-                'Muito Baixo': 'valor <= 10',
-                'Baixo': '10 < valor <= 20',
-                'Medio': '20 < valor <= 30',
-                'Alto': '30 < valor <= 60',
-                'Muito Alto': 'valor > 60',
-            })
-
-        if ctc <= 7.5:
-            class_k = classificar_parametro(potassio, {
-                'Muito Baixo': 'valor <= 30',
-                'Baixo': '30 < valor <= 60',
-                'Medio': '60 < valor <= 90',
-                'Alto': '90 < valor <= 180',
-                'Muito Alto': 'valor > 180',
-            })
-        elif ctc <= 15:
-            class_k = classificar_parametro(potassio, {
-                'Muito Baixo': 'valor <= 40',
-                'Baixo': '40 < valor <= 80',
-                'Medio': '80 < valor <= 120',
-                'Alto': '120 < valor <= 240',
-                'Muito Alto': 'valor > 240',
-            })
-        else:
-            class_k = classificar_parametro(potassio, {
-                'Muito Baixo': 'valor <= 45',
-                'Baixo': '45 < valor <= 90',
-                'Medio': '90 < valor <= 135',
-                'Alto': '135 < valor <= 270',
-                'Muito Alto': 'valor > 270',
-            })
-
-        class_ctc = classificar_parametro(ctc, {
-            'Baixa': 'valor <= 7.5',
-            'Media': '7.5 < valor <= 15',
-            'Alta': '15 < valor <= 30',
-            'Muito Alta': 'valor > 30',
-        })
-        class_mo = classificar_parametro(_float_opcional(['M.O. (%)'], default=0), {
-            'Baixa': 'valor <= 2.5',
-            'Media': '2.5 < valor <= 5',
-            'Alta': 'valor > 5',
-        })
-        class_ca = classificar_parametro(_float_opcional(['Ca (cmolc/dm3)'], default=0), {
-            'Baixo': 'valor < 2',
-            'Medio': '2 <= valor <= 4',
-            'Alto': 'valor > 4',
-        })
-        class_mg = classificar_parametro(_float_opcional(['Mg (cmolc/dm3)'], default=0), {
-            'Baixo': 'valor < 0.5',
-            'Medio': '0.5 <= valor <= 1',
-            'Alto': 'valor > 1',
-        })
-        class_s = classificar_parametro(enxofre, {
-            'Baixo': 'valor < 2',
-            'Medio': '2 <= valor <= 5',
-            'Alto': 'valor > 5',
-        })
-        class_zn = classificar_parametro(_float_opcional(['Zn (mg/dm3)'], default=0), {
-            'Baixo': 'valor < 0.2',
-            'Medio': '0.2 <= valor <= 0.5',
-            'Alto': 'valor > 0.5',
-        })
-        class_cu = classificar_parametro(_float_opcional(['Cu (mg/dm3)'], default=0), {
-            'Baixo': 'valor < 2',
-            'Medio': '2 <= valor <= 4',
-            'Alto': 'valor > 4',
-        })
-        class_b = classificar_parametro(_float_opcional(['B (mg/dm3)'], default=0), {
-            'Baixo': 'valor <= 0.1',
-            'Medio': '0.1 < valor <= 0.3',
-            'Alto': 'valor > 0.3',
-        })
-        class_mn = classificar_parametro(_float_opcional(['Mn (mg/dm3)'], default=0), {
-            'Baixo': 'valor < 2.5',
-            'Medio': '2.5 <= valor <= 5',
-            'Alto': 'valor > 5',
-        })
-
-        dose_calagem = TABELA_SMP_FIXA.get(round(smp, 1), 'SMP fora da faixa')
-
-        tabela_p = {
-            '1Âº Cultivo': {'Muito Baixo': 155, 'Baixo': 95, 'Medio': 85, 'Alto': 45, 'Muito Alto': 0},
-            '2Âº Cultivo': {'Muito Baixo': 95, 'Baixo': 75, 'Medio': 45, 'Alto': 45, 'Muito Alto': 30},
-        }
-        tabela_k = {
-            '1Âº Cultivo': {'Muito Baixo': 155, 'Baixo': 115, 'Medio': 105, 'Alto': 75, 'Muito Alto': 0},
-            '2Âº Cultivo': {'Muito Baixo': 95, 'Baixo': 75, 'Medio': 75, 'Alto': 75, 'Muito Alto': 50},
-        }
+        diag = _diagnostico_laudo()
+        classe_argila = diag.classe_argila_num
+        class_p = diag.classe_p
+        class_k = diag.classe_k
 
-        base_p = tabela_p.get(cultivo, {}).get(class_p, 0)
-        correcao_p = max(0.0, produtividade - 3.0) * 15
+        tabelas = carregar_edicao(EDICAO_PADRAO)
+        dose_calagem = tabelas.nc_smp_exato(smp, 6.0)
+        if dose_calagem is None:
+            dose_calagem = 'SMP fora da faixa'
+
+        num_cultivo = 2 if "2" in str(cultivo) else 1
+        extra = max(0.0, produtividade - tabelas.produtividade_referencia)
+        por_t_p, por_t_k = tabelas.manutencao_por_t
+
+        base_p = tabelas.dose_p_cultivo[num_cultivo][diag.indice_p] if diag.indice_p >= 0 else 0
+        correcao_p = extra * por_t_p
         total_p = base_p + correcao_p
 
-        base_k = tabela_k.get(cultivo, {}).get(class_k, 0)
-        correcao_k = max(0.0, produtividade - 3.0) * 25
+        base_k = tabelas.dose_k_cultivo[num_cultivo][diag.indice_k] if diag.indice_k >= 0 else 0
+        correcao_k = extra * por_t_k
         total_k = base_k + correcao_k
 
         dose_s = 20 if (enxofre * 2000 / 1000.0) < 10 else 0
@@ -246,25 +154,21 @@ def calcular():
         
         classificacoes = {
             'Classe do teor de Argila': f"Classe {classe_argila} ({classificacao_solo.get(classe_argila, '')})",
-            'CTC': class_ctc,
-            'M.O.': class_mo,
+            'CTC': diag.classe_ctc,
+            'M.O.': diag.classe_mo,
             'Fósforo (P)': class_p,
             'Potássio (K)': class_k,
-            'Cálcio (Ca)': class_ca,
-            'Magnésio (Mg)': class_mg,
-            'Enxofre (S)': class_s,
-            'Zinco (Zn)': class_zn,
-            'Cobre (Cu)': class_cu,
-            'Boro (B)': class_b,
-            'Manganês (Mn)': class_mn,
+            'Cálcio (Ca)': diag.classe_ca,
+            'Magnésio (Mg)': diag.classe_mg,
+            'Enxofre (S)': diag.classe_s,
+            'Zinco (Zn)': diag.classe_zn,
+            'Cobre (Cu)': diag.classe_cu,
+            'Boro (B)': diag.classe_b,
+            'Manganês (Mn)': diag.classe_mn,
         }
-        for chave, valor in classificacoes.items():
-            widget = labels_classificacao.get(chave)
-            if widget is not None:
-                try:
-                    widget.configure(text=valor)
-                except Exception:
-                    pass
+        ultimas_classificacoes.clear()
+        ultimas_classificacoes.update(classificacoes)
+        aplicar_classificacoes()
         return True
     except Exception as exc:
         messagebox.showerror('Erro', f"Entrada inválida: {exc}")
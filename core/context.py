@@ -1,25 +1,160 @@
 import importlib
 import pkgutil
 import sys
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Callable
 import customtkinter as ctk
 
 
 class TabHost:
     def __init__(self, tabview: ctk.CTkTabview):
         self._tabview = tabview
+        self._pendentes: dict[str, tuple[Callable[[], object], tuple[str, ...]]] = {}
 
     @property
     def widget(self):
         return self._tabview
 
     def add_tab(self, title: str):
+        if self.existe(title):
+            # Aba já reservada por adiar_tab: devolve o frame vazio para ser preenchido.
+            return self._tabview.tab(title)
         return self._tabview.add(title)
 
     def tab(self, title: str):
         return self._tabview.tab(title)
 
+    def existe(self, title: str) -> bool:
+        return title in self._tabview._tab_dict  # noqa: SLF001
+
+    def adiar_tab(self, title: str, construtor: Callable[[], object], depende_de: tuple[str, ...] = ()):
+        """Reserva a aba (mantendo a ordem) e adia a construção do conteúdo.
+
+        `construtor` roda na primeira chamada de `garantir_tab(title)`; as abas
+        listadas em `depende_de` são construídas antes dela.
+        """
+        self._tabview.add(title)
+        self._pendentes[title] = (construtor, tuple(depende_de))
+
+    def garantir_tab(self, title: str) -> bool:
+        item = self._pendentes.pop(title, None)
+        if item is None:
+            return False
+        construtor, depende_de = item
+        for dependencia in depende_de:
+            self.garantir_tab(dependencia)
+        construtor()
+        return True
+
+
+class AgendadorRecalculo:
+    """Recalcula etapas dependentes uma única vez por ciclo do event loop.
+
+    Cada etapa declara as etapas das quais lê dados (`entradas`). `marcar`
+    suja a etapa e todas as que dependem dela; as sujas são executadas em
+    ordem topológica no próximo tique (`agendar`, p. ex. `janela.after_idle`).
+    Sem `agendar`, as etapas rodam imediatamente (uso fora da interface).
+    """
+
+    def __init__(self, agendar: Callable[[Callable[[], None]], object] | None = None):
+        self._agendar = agendar
+        self._etapas: dict[str, tuple[Callable[[], object], tuple[str, ...]]] = {}
+        self._dependentes: dict[str, set[str]] = {}
+        self._ordem: list[str] | None = None
+        self._sujas: set[str] = set()
+        self._agendado = False
+        self._executando = False
+        self.pedidos = 0
+        self.execucoes = 0
+        self.tiques = 0
+        self.execucoes_por_etapa: dict[str, int] = {}
+
+    def registrar(self, nome: str, funcao: Callable[[], object], entradas: tuple[str, ...] = ()) -> None:
+        self._etapas[nome] = (funcao, tuple(entradas))
+        for entrada in entradas:
+            self._dependentes.setdefault(entrada, set()).add(nome)
+        self._ordem = None
+
+    def _ordem_topologica(self) -> list[str]:
+        if self._ordem is not None:
+            return self._ordem
+        grau = {nome: 0 for nome in self._etapas}
+        for nome, (_, entradas) in self._etapas.items():
+            grau[nome] = sum(1 for e in entradas if e in self._etapas)
+        fila = [nome for nome, g in grau.items() if g == 0]
+        ordem: list[str] = []
+        while fila:
+            atual = fila.pop(0)
+            ordem.append(atual)
+            for dep in sorted(self._dependentes.get(atual, ())):
+                if dep not in grau:
+                    continue
+                grau[dep] -= 1
+                if grau[dep] == 0:
+                    fila.append(dep)
+        if len(ordem) != len(self._etapas):
+            raise ValueError("Dependências circulares entre etapas de recálculo.")
+        self._ordem = ordem
+        return ordem
+
+    def marcar(self, *nomes: str) -> None:
+        pendentes = list(nomes)
+        while pendentes:
+            nome = pendentes.pop()
+            self.pedidos += 1
+            if nome in self._sujas:
+                continue
+            self._sujas.add(nome)
+            pendentes.extend(self._dependentes.get(nome, ()))
+        self._solicitar_execucao()
+
+    def _solicitar_execucao(self) -> None:
+        if self._executando or self._agendado:
+            return
+        if self._agendar is None:
+            self.executar_pendentes()
+            return
+        self._agendado = True
+        self._agendar(self.executar_pendentes)
+
+    def executar_pendentes(self) -> None:
+        self._agendado = False
+        if self._executando or not self._sujas:
+            return
+        self._executando = True
+        self.tiques += 1
+        adiadas: set[str] = set()
+        try:
+            for nome in self._ordem_topologica():
+                if nome not in self._sujas:
+                    continue
+                self._sujas.discard(nome)
+                funcao, _ = self._etapas[nome]
+                self.execucoes += 1
+                self.execucoes_por_etapa[nome] = self.execucoes_por_etapa.get(nome, 0) + 1
+                funcao()
+            # Marcações para etapas já executadas neste tique ficam para o próximo.
+            adiadas = {nome for nome in self._sujas if nome in self._etapas}
+            self._sujas = adiadas
+        finally:
+            self._executando = False
+        if adiadas:
+            self._solicitar_execucao()
+
+    @property
+    def economizadas(self) -> int:
+        return max(self.pedidos - self.execucoes, 0)
+
+    def estatisticas(self) -> dict:
+        return {
+            "pedidos": self.pedidos,
+            "execucoes": self.execucoes,
+            "economizadas": self.economizadas,
+            "tiques": self.tiques,
+            "por_etapa": dict(self.execucoes_por_etapa),
+        }
+
 
 @dataclass
 class AppContext:
@@ -30,6 +165,10 @@ class AppContext:
     labels_resultado: dict
     cultivo_var: ctk.StringVar
     calcular: callable
+    agendador: AgendadorRecalculo = field(default_factory=AgendadorRecalculo)
+
+    def marcar_recalculo(self, *etapas: str) -> None:
+        self.agendador.marcar(*etapas)
 
     def get_entradas(self):
         out = {}
@@ -0,0 +1,409 @@
+"""Leitura dos contornos dos talhões: KML/KMZ, GeoJSON e Shapefile.
+
+Todos os leitores devolvem ``(área total em m², polígonos)`` com os
+polígonos no formato ``{"outer": [anel, ...], "inner": [anel, ...]}`` e
+anéis de ``(lon, lat)`` sem repetir o primeiro vértice, de modo que a aba
+do mapa, a prescrição e o cálculo de área tratam as três origens igual.
+
+* GeoJSON: as features são decodificadas uma a uma enquanto o arquivo é
+  lido em blocos, sem carregar a coleção inteira;
+* Shapefile (.shp solto ou .zip): leitura binária com ``struct`` sobre o
+  arquivo mapeado em memória, pelos deslocamentos do .shx quando existe.
+  Só coordenadas geográficas (WGS84/SIRGAS 2000); .prj projetado é recusado.
+"""
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import xml.etree.ElementTree as ET
+import zipfile
+
+from .geometria import contem
+
+R_EARTH = 6_371_000.0
+BLOCO_LEITURA = 1 << 16
+# Caracteres que mudam o estado da varredura fora e dentro de strings.
+_ESTRUTURA = re.compile(r'[{}\[\]"]')
+_TEXTO = re.compile(r'["\\]')
+_FIM_ESCALAR = re.compile(r'[\s,\]}]')
+TIPOS_POLIGONO_SHP = (5, 15, 25)  # Polygon, PolygonZ, PolygonM
+
+
+def _lonlat_to_xy_m(lat0_deg, lon_deg, lat_deg):
+    lat0 = math.radians(lat0_deg)
+    x = math.radians(lon_deg) * math.cos(lat0) * R_EARTH
+    y = math.radians(lat_deg) * R_EARTH
+    return x, y
+
+
+def _ring_area_m2(coords):
+    if len(coords) < 3:
+        return 0.0
+    lat0 = sum(lat for _, lat in coords) / len(coords)
+    pts = [_lonlat_to_xy_m(lat0, lon, lat) for lon, lat in coords]
+    area2 = 0.0
+    for i in range(len(pts)):
+        x1, y1 = pts[i]
+        x2, y2 = pts[(i + 1) % len(pts)]
+        area2 += x1 * y2 - x2 * y1
+    return abs(area2) * 0.5
+
+
+def _poly_area_m2(poly):
+    area = sum(_ring_area_m2(r) for r in poly["outer"]) - sum(_ring_area_m2(r) for r in poly["inner"])
+    return max(0.0, area)
+
+
+def _parse_coords_text(text):
+    out = []
+    if not text:
+        return out
+    for tok in text.replace('\n', ' ').replace('	', ' ').split():
+        parts = tok.split(',')
+        if len(parts) >= 2:
+            try:
+                lon = float(parts[0])
+                lat = float(parts[1])
+                out.append((lon, lat))
+            except ValueError:
+                pass
+    if len(out) > 1 and out[0] == out[-1]:
+        out = out[:-1]
+    return out
+
+
+def _sum_kml_polygon_areas_and_collect_rings(root):
+    ns = {"kml": "http://www.opengis.net/kml/2.2"}
+    total_m2 = 0.0
+    polys = []
+
+    def _findall(el, path):
+        found = el.findall(path, ns)
+        if not found:
+            found = el.findall(path.replace("kml:", ""))
+        return found
+
+    all_polys = root.findall(".//kml:Polygon", ns) or root.findall(".//Polygon")
+    for polygon in all_polys:
+        outer_nodes = _findall(polygon, ".//kml:outerBoundaryIs/kml:LinearRing/kml:coordinates")
+        inner_nodes = _findall(polygon, ".//kml:innerBoundaryIs/kml:LinearRing/kml:coordinates")
+
+        outers, inners = [], []
+        for node in outer_nodes:
+            coords = _parse_coords_text(node.text)
+            if coords:
+                outers.append(coords)
+                total_m2 += _ring_area_m2(coords)
+        for node in inner_nodes:
+            coords = _parse_coords_text(node.text)
+            if coords:
+                inners.append(coords)
+                total_m2 -= _ring_area_m2(coords)
+
+        if outers or inners:
+            polys.append({"outer": outers, "inner": inners})
+
+    return max(0.0, total_m2), polys
+
+
+def _load_kml_from_kmz(path):
+    with zipfile.ZipFile(path, "r") as zf:
+        kml_name = None
+        for name in zf.namelist():
+            if name.lower().endswith(".kml"):
+                if name.lower().endswith("doc.kml"):
+                    kml_name = name
+                    break
+                if kml_name is None:
+                    kml_name = name
+        if not kml_name:
+            raise ValueError("KMZ não contém arquivo .kml")
+        with zf.open(kml_name) as f:
+            data = f.read()
+    return data
+
+
+def _anel_aberto(coords):
+    out = [(float(p[0]), float(p[1])) for p in coords]
+    if len(out) > 1 and out[0] == out[-1]:
+        out = out[:-1]
+    return out
+
+
+def _poligonos_geometria(geom):
+    if not geom:
+        return []
+    tipo = geom.get("type")
+    if tipo == "Polygon":
+        aneis = [_anel_aberto(a) for a in geom.get("coordinates") or ()]
+        aneis = [a for a in aneis if a]
+        return [{"outer": aneis[:1], "inner": aneis[1:]}] if aneis else []
+    if tipo == "MultiPolygon":
+        return [p for coords in geom.get("coordinates") or () for p in _poligonos_geometria({"type": "Polygon", "coordinates": coords})]
+    if tipo == "GeometryCollection":
+        return [p for g in geom.get("geometries") or () for p in _poligonos_geometria(g)]
+    if tipo == "Feature":
+        return _poligonos_geometria(geom.get("geometry"))
+    if tipo == "FeatureCollection":
+        return [p for f in geom.get("features") or () for p in _poligonos_geometria(f)]
+    return []
+
+
+def _features_geojson(f):
+    """Objetos do vetor ``"features"`` um a um, lendo o arquivo em blocos.
+
+    O objeto de topo é percorrido chave a chave; só o ``"features"`` desse
+    nível é lido em partes. O fim de cada valor é achado pela profundidade de
+    chaves/colchetes (fora das strings) antes de decodificar, então cada byte
+    é varrido uma vez mesmo numa Feature de dezenas de MB. Se o documento não
+    tem ``"features"`` (uma Feature ou geometria solta), devolve o documento
+    inteiro como único objeto.
+    """
+    buf = ""
+
+    def ler_mais():
+        # Leituras do tamanho do que já está no buffer: o total copiado
+        # fica proporcional ao tamanho do objeto.
+        nonlocal buf
+        bloco = f.read(max(BLOCO_LEITURA, len(buf)))
+        if not bloco:
+            return False
+        buf += bloco
+        return True
+
+    def exigir_mais():
+        if not ler_mais():
+            raise ValueError("GeoJSON inválido: o arquivo termina no meio do documento")
+
+    def pular(i, separadores=" \t\r\n"):
+        while True:
+            while i < len(buf) and buf[i] in separadores:
+                i += 1
+            if i < len(buf):
+                return i
+            exigir_mais()
+
+    def fim_do_valor(i):
+        """Posição logo após o valor JSON que começa em ``buf[i]``."""
+        if buf[i] not in '{["':
+            while True:  # número, true, false ou null
+                m = _FIM_ESCALAR.search(buf, i)
+                if m is not None:
+                    return m.start()
+                i = len(buf)
+                exigir_mais()
+        profundidade = 0
+        em_texto = False
+        while True:
+            m = (_TEXTO if em_texto else _ESTRUTURA).search(buf, i)
+            if m is None:
+                i = max(i, len(buf))
+                exigir_mais()
+                continue
+            c = m.group()
+            i = m.end()
+            if em_texto:
+                if c == "\\":
+                    i += 1  # pula o caractere escapado (pode estar no próximo bloco)
+                else:
+                    em_texto = False
+                    if profundidade == 0:
+                        return i
+            elif c == '"':
+                em_texto = True
+            elif c in "{[":
+                profundidade += 1
+            else:
+                profundidade -= 1
+                if profundidade == 0:
+                    return i
+
+    pos = pular(0)
+    if buf[pos] != "{":
+        while ler_mais():
+            pass
+        yield json.loads(buf)
+        return
+    pos += 1
+    while True:
+        pos = pular(pos, " \t\r\n,")
+        if buf[pos] == "}":
+            while ler_mais():
+                pass
+            yield json.loads(buf)
+            return
+        if buf[pos] != '"':
+            raise ValueError(f"GeoJSON inválido: chave começa com {buf[pos]!r}")
+        fim = fim_do_valor(pos)
+        chave = json.loads(buf[pos:fim])
+        pos = pular(fim)
+        if buf[pos] != ":":
+            raise ValueError(f"GeoJSON inválido: esperado ':' depois de {chave!r}")
+        pos = pular(pos + 1)
+        if chave == "features" and buf[pos] == "[":
+            pos += 1
+            break
+        pos = fim_do_valor(pos)
+
+    while True:
+        pos = pular(pos, " \t\r\n,")
+        if buf[pos] == "]":
+            return
+        if buf[pos] != "{":
+            raise ValueError(f"GeoJSON inválido: item de 'features' começa com {buf[pos]!r}")
+        fim = fim_do_valor(pos)
+        yield json.loads(buf[pos:fim])
+        pos = fim
+        if pos > BLOCO_LEITURA:
+            buf = buf[pos:]
+            pos = 0
+
+
+def ler_geojson(path):
+    total_m2 = 0.0
+    polys = []
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for feature in _features_geojson(f):
+            for poly in _poligonos_geometria(feature):
+                total_m2 += _poly_area_m2(poly)
+                polys.append(poly)
+    return total_m2, polys
+
+
+def _area_assinada(anel):
+    area2 = 0.0
+    for i, (x1, y1) in enumerate(anel):
+        x2, y2 = anel[i - 1]
+        area2 += x2 * y1 - x1 * y2
+    return area2 * 0.5
+
+
+def _poligonos_registro(aneis):
+    # Na especificação os anéis externos vêm em sentido horário e os furos
+    # em anti-horário; cada furo vai para o externo que contém seu vértice.
+    externos = [{"outer": [a], "inner": []} for a in aneis if _area_assinada(a) <= 0]
+    furos = [a for a in aneis if _area_assinada(a) > 0]
+    if not externos:
+        return [{"outer": [a], "inner": []} for a in furos]
+    for furo in furos:
+        x, y = furo[0]
+        dono = next((p for p in externos if contem(p, x, y)), externos[0])
+        dono["inner"].append(furo)
+    return externos
+
+
+def _aneis_shp(dados, inicio):
+    """Anéis do registro de polígono que começa em `inicio` (após o cabeçalho)."""
+    tipo, = struct.unpack_from("<i", dados, inicio)
+    if tipo not in TIPOS_POLIGONO_SHP:
+        return []
+    n_partes, n_pontos = struct.unpack_from("<2i", dados, inicio + 36)
+    partes = struct.unpack_from(f"<{n_partes}i", dados, inicio + 44)
+    xy = struct.unpack_from(f"<{2 * n_pontos}d", dados, inicio + 44 + 4 * n_partes)
+    aneis = []
+    for j, p0 in enumerate(partes):
+        p1 = partes[j + 1] if j + 1 < n_partes else n_pontos
+        anel = _anel_aberto(zip(xy[2 * p0:2 * p1:2], xy[2 * p0 + 1:2 * p1:2]))
+        if len(anel) >= 3:
+            aneis.append(anel)
+    return aneis
+
+
+def _offsets_shx(shx):
+    n = (len(shx) - 100) // 8
+    return [2 * o + 8 for o in struct.unpack_from(f">{2 * n}i", shx, 100)[::2]]
+
+
+def _offsets_sequenciais(dados):
+    fim = min(len(dados), 2 * struct.unpack_from(">i", dados, 24)[0])
+    pos = 100
+    offsets = []
+    while pos + 8 <= fim:
+        _, palavras = struct.unpack_from(">2i", dados, pos)
+        offsets.append(pos + 8)
+        pos += 8 + 2 * palavras
+    return offsets
+
+
+def _verificar_prj(prj):
+    if prj and prj.lstrip().upper().startswith("PROJCS"):
+        nome = prj.split('"')[1] if '"' in prj else "projetado"
+        raise ValueError(
+            f"Shapefile em sistema projetado ({nome}). Exporte em coordenadas geográficas (WGS84/SIRGAS 2000)."
+        )
+
+
+def _ler_shp_bytes(dados, shx=None, prj=None):
+    _verificar_prj(prj)
+    codigo, = struct.unpack_from(">i", dados, 0)
+    if codigo != 9994:
+        raise ValueError("Arquivo .shp inválido")
+    tipo, = struct.unpack_from("<i", dados, 32)
+    if tipo not in TIPOS_POLIGONO_SHP:
+        raise ValueError("O shapefile não contém polígonos")
+    offsets = _offsets_shx(shx) if shx else _offsets_sequenciais(dados)
+    total_m2 = 0.0
+    polys = []
+    for inicio in offsets:
+        for poly in _poligonos_registro(_aneis_shp(dados, inicio)):
+            total_m2 += _poly_area_m2(poly)
+            polys.append(poly)
+    for poly in polys:
+        lon, lat = poly["outer"][0][0]
+        if not (-180.0 <= lon <= 180.0 and -90.0 <= lat <= 90.0):
+            raise ValueError("Coordenadas fora de longitude/latitude; exporte o shapefile em WGS84/SIRGAS 2000.")
+        break
+    return total_m2, polys
+
+
+def ler_shapefile(path):
+    """Polígonos de um .shp (com .shx/.prj ao lado) ou de um .zip que os contém."""
+    if path.lower().endswith(".zip"):
+        with zipfile.ZipFile(path, "r") as zf:
+            nomes = {os.path.splitext(n)[1].lower(): n for n in zf.namelist() if not n.startswith("__MACOSX")}
+            if ".shp" not in nomes:
+                raise ValueError("ZIP não contém arquivo .shp")
+            base = os.path.splitext(nomes[".shp"])[0]
+            membros = {n.lower(): n for n in zf.namelist()}
+
+            def _membro(ext):
+                nome = membros.get((base + ext).lower())
+                return zf.read(nome) if nome else None
+
+            prj = _membro(".prj")
+            return _ler_shp_bytes(_membro(".shp"), _membro(".shx"), prj.decode("latin-1") if prj else None)
+    base = os.path.splitext(path)[0]
+    prj = None
+    for ext in (".prj", ".PRJ"):
+        if os.path.exists(base + ext):
+            with open(base + ext, "r", encoding="latin-1") as f:
+                prj = f.read()
+            break
+    shx_path = next((base + e for e in (".shx", ".SHX") if os.path.exists(base + e)), None)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as dados:
+        if shx_path is None:
+            return _ler_shp_bytes(dados, None, prj)
+        with open(shx_path, "rb") as g, mmap.mmap(g.fileno(), 0, access=mmap.ACCESS_READ) as shx:
+            return _ler_shp_bytes(dados, shx, prj)
+
+
+def ler_kml(path):
+    if path.lower().endswith(".kmz"):
+        data = _load_kml_from_kmz(path)
+    else:
+        with open(path, "rb") as f:
+            data = f.read()
+    return _sum_kml_polygon_areas_and_collect_rings(ET.fromstring(data))
+
+
+def ler_contorno(path):
+    """(área total em m², polígonos) do arquivo, escolhendo o leitor pela
+    extensão; extensões desconhecidas são lidas como KML."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".geojson", ".json"):
+        return ler_geojson(path)
+    if ext in (".shp", ".zip"):
+        return ler_shapefile(path)
+    return ler_kml(path)
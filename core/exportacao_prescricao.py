@@ -0,0 +1,289 @@
+"""Exportação da prescrição em taxa variável para os controladores.
+
+Três formatos, todos gravados célula a célula (sem montar a coleção inteira
+na memória):
+
+* GeoJSON: um polígono por célula do talhão, com as taxas como propriedades;
+* Shapefile (.shp/.shx/.dbf/.prj): o mesmo, com escritor próprio; os
+  cabeçalhos que dependem do total são corrigidos no fim com ``seek``;
+* ISO 11783-10 (TASKDATA): ``TASKDATA.XML`` e grade binária tipo 2, com um
+  valor int32 por produto em cada célula (mg/m²).
+
+As taxas são do produto, em kg/ha: ``valor da camada * fator`` (veja
+`CamadaTaxa`). A grade da prescrição é regular em longitude/latitude, então
+as células viram retângulos exatos em graus.
+"""
+from __future__ import annotations
+
+import datetime as _dt
+import json
+import math
+import os
+import struct
+import sys
+import xml.etree.ElementTree as ET
+from array import array
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from .prescricao import R_TERRA, RasterPrescricao
+from .registros import DATACLASS_SLOTS
+
+# ISO 11783-11: Setpoint Mass Per Area Application Rate (mg/m²).
+DDI_TAXA_MASSA = 0x0006
+MG_M2_POR_KG_HA = 100.0
+
+PRJ_WGS84 = (
+    'GEOGCS["GCS_WGS_1984",DATUM["D_WGS_1984",SPHEROID["WGS_1984",6378137.0,298.257223563]],'
+    'PRIMEM["Greenwich",0.0],UNIT["Degree",0.0174532925199433]]'
+)
+
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
+class CamadaTaxa:
+    """Camada do raster exportada como taxa de um produto (kg/ha)."""
+
+    camada: str
+    produto: str
+    campo: str
+    fator: float = 1.0
+
+    @classmethod
+    def de_teor(cls, camada: str, produto: str, campo: str, teor_percent: float) -> "CamadaTaxa":
+        """Dose de nutriente (kg/ha) convertida em produto pelo teor (%)."""
+        if teor_percent <= 0:
+            raise ValueError("Teor do produto deve ser positivo")
+        return cls(camada, produto, campo, 100.0 / teor_percent)
+
+
+TAXAS_PADRAO: Tuple[CamadaTaxa, ...] = (
+    CamadaTaxa('calcario_t_ha', 'Calcario', 'CALCARIO', 1000.0),
+    CamadaTaxa('P2O5_kg_ha', 'P2O5', 'P2O5'),
+    CamadaTaxa('K2O_kg_ha', 'K2O', 'K2O'),
+)
+
+
+def _bordas(raster: RasterPrescricao) -> Tuple[List[float], List[float]]:
+    """Longitudes das bordas das colunas (oeste -> leste) e latitudes das
+    bordas das linhas (norte -> sul)."""
+    escala_lon = math.degrees(1.0 / (math.cos(math.radians(raster.lat0)) * R_TERRA))
+    escala_lat = math.degrees(1.0 / R_TERRA)
+    lons = [(raster.x_min + c * raster.resolucao_m) * escala_lon for c in range(raster.largura + 1)]
+    lats = [(raster.y_max - l * raster.resolucao_m) * escala_lat for l in range(raster.altura + 1)]
+    return lons, lats
+
+
+def _taxas_usadas(
+    raster: RasterPrescricao, taxas: Sequence[CamadaTaxa], camadas: Optional[Mapping[str, Sequence[float]]]
+) -> Tuple[List[CamadaTaxa], List[Sequence[float]]]:
+    fonte = camadas if camadas is not None else raster.camadas
+    usadas = [taxa for taxa in taxas if taxa.camada in fonte]
+    if not usadas:
+        raise ValueError("Nenhuma camada de taxa disponível para exportar")
+    return usadas, [fonte[taxa.camada] for taxa in usadas]
+
+
+def _celulas(
+    raster: RasterPrescricao, taxas: Sequence[CamadaTaxa], colunas: Sequence[Sequence[float]]
+) -> Iterator[Tuple[int, int, Tuple[float, ...]]]:
+    """(linha, coluna, taxas em kg/ha) das células com alguma taxa definida."""
+    fatores = [taxa.fator for taxa in taxas]
+    for linha in range(raster.altura):
+        base = linha * raster.largura
+        for coluna in range(raster.largura):
+            pos = base + coluna
+            valores = [c[pos] for c in colunas]
+            if all(v != v for v in valores):
+                continue
+            yield linha, coluna, tuple(0.0 if v != v else v * f for v, f in zip(valores, fatores))
+
+
+def exportar_geojson(
+    raster: RasterPrescricao,
+    caminho: str,
+    taxas: Sequence[CamadaTaxa] = TAXAS_PADRAO,
+    camadas: Optional[Mapping[str, Sequence[float]]] = None,
+) -> int:
+    usadas, colunas = _taxas_usadas(raster, taxas, camadas)
+    lons, lats = _bordas(raster)
+    campos = [json.dumps(taxa.campo) for taxa in usadas]
+    n = 0
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        arquivo.write('{"type":"FeatureCollection","features":[\n')
+        for linha, coluna, valores in _celulas(raster, usadas, colunas):
+            oeste, leste = lons[coluna], lons[coluna + 1]
+            norte, sul = lats[linha], lats[linha + 1]
+            propriedades = ','.join(f'{campo}:{valor:.3f}' for campo, valor in zip(campos, valores))
+            arquivo.write(
+                ('' if n == 0 else ',\n')
+                + '{"type":"Feature","properties":{' + propriedades + '},'
+                + '"geometry":{"type":"Polygon","coordinates":[['
+                + f'[{oeste:.8f},{sul:.8f}],[{leste:.8f},{sul:.8f}],[{leste:.8f},{norte:.8f}],'
+                + f'[{oeste:.8f},{norte:.8f}],[{oeste:.8f},{sul:.8f}]]]}}}}'
+            )
+            n += 1
+        arquivo.write('\n]}\n')
+    return n
+
+
+_TIPO_POLIGONO = 5
+_CONTEUDO_CELULA = struct.calcsize('<i4d2ii') + 5 * 16  # 1 parte, 5 vértices
+
+
+def _cabecalho_shp(arquivo: BinaryIO, comprimento_bytes: int, caixa: Tuple[float, float, float, float]) -> None:
+    arquivo.seek(0)
+    arquivo.write(struct.pack('>7i', 9994, 0, 0, 0, 0, 0, comprimento_bytes // 2))
+    arquivo.write(struct.pack('<2i', 1000, _TIPO_POLIGONO))
+    arquivo.write(struct.pack('<8d', *caixa, 0.0, 0.0, 0.0, 0.0))
+
+
+def _cabecalho_dbf(arquivo: BinaryIO, registros: int, campos: Sequence[Tuple[str, int, int]]) -> None:
+    hoje = _dt.date.today()
+    tamanho_registro = 1 + sum(largura for _, largura, _ in campos)
+    arquivo.seek(0)
+    arquivo.write(struct.pack(
+        '<4BIHH20x', 0x03, hoje.year - 1900, hoje.month, hoje.day,
+        registros, 32 + 32 * len(campos) + 1, tamanho_registro,
+    ))
+    for nome, largura, decimais in campos:
+        arquivo.write(struct.pack('<11sc4xBB14x', nome.encode('ascii')[:10], b'N', largura, decimais))
+    arquivo.write(b'\r')
+
+
+def exportar_shapefile(
+    raster: RasterPrescricao,
+    caminho: str,
+    taxas: Sequence[CamadaTaxa] = TAXAS_PADRAO,
+    camadas: Optional[Mapping[str, Sequence[float]]] = None,
+) -> int:
+    """Grava ``<base>.shp/.shx/.dbf/.prj``; devolve o número de células."""
+    usadas, colunas = _taxas_usadas(raster, taxas, camadas)
+    base = caminho[:-4] if caminho.lower().endswith('.shp') else caminho
+    lons, lats = _bordas(raster)
+    campos = [(taxa.campo.upper(), 12, 3) for taxa in usadas]
+    palavras_conteudo = _CONTEUDO_CELULA // 2
+    caixa = [math.inf, math.inf, -math.inf, -math.inf]
+    n = 0
+    with open(base + '.shp', 'wb') as shp, open(base + '.shx', 'wb') as shx, open(base + '.dbf', 'wb') as dbf:
+        shp.write(bytes(100))
+        shx.write(bytes(100))
+        _cabecalho_dbf(dbf, 0, campos)
+        deslocamento = 50  # em palavras de 16 bits
+        for linha, coluna, valores in _celulas(raster, usadas, colunas):
+            oeste, leste = lons[coluna], lons[coluna + 1]
+            norte, sul = lats[linha], lats[linha + 1]
+            n += 1
+            shp.write(struct.pack('>2i', n, palavras_conteudo))
+            # Anel externo em sentido horário, como pede a especificação.
+            shp.write(struct.pack(
+                '<i4d2ii10d', _TIPO_POLIGONO, oeste, sul, leste, norte, 1, 5, 0,
+                oeste, norte, leste, norte, leste, sul, oeste, sul, oeste, norte,
+            ))
+            shx.write(struct.pack('>2i', deslocamento, palavras_conteudo))
+            deslocamento += 4 + palavras_conteudo
+            dbf.write(b' ' + ''.join(f'{valor:12.3f}'[:12] for valor in valores).encode('ascii'))
+            caixa[0] = min(caixa[0], oeste)
+            caixa[1] = min(caixa[1], sul)
+            caixa[2] = max(caixa[2], leste)
+            caixa[3] = max(caixa[3], norte)
+        dbf.write(b'\x1a')
+        if n == 0:
+            caixa = [0.0, 0.0, 0.0, 0.0]
+        _cabecalho_shp(shp, deslocamento * 2, tuple(caixa))
+        _cabecalho_shp(shx, 100 + 8 * n, tuple(caixa))
+        _cabecalho_dbf(dbf, n, campos)
+    with open(base + '.prj', 'w', encoding='ascii') as prj:
+        prj.write(PRJ_WGS84)
+    return n
+
+
+def exportar_isoxml(
+    raster: RasterPrescricao,
+    diretorio: str,
+    taxas: Sequence[CamadaTaxa] = TAXAS_PADRAO,
+    camadas: Optional[Mapping[str, Sequence[float]]] = None,
+    nome_tarefa: str = "Prescricao FertiSoja",
+) -> int:
+    """Grava ``TASKDATA.XML`` e ``GRD00001.BIN`` (grade tipo 2) em `diretorio`.
+
+    A grade cobre todo o retângulo do raster, da linha mais ao sul para o
+    norte; células fora do talhão recebem taxa 0. Devolve, como os outros
+    formatos, o número de células com alguma taxa definida.
+    """
+    usadas, colunas = _taxas_usadas(raster, taxas, camadas)
+    os.makedirs(diretorio, exist_ok=True)
+    lons, lats = _bordas(raster)
+    escalas = [taxa.fator * MG_M2_POR_KG_HA for taxa in usadas]
+    nome_grade = 'GRD00001'
+    inverter = sys.byteorder != 'little'
+    n = 0
+    with open(os.path.join(diretorio, nome_grade + '.BIN'), 'wb') as grade:
+        for linha in range(raster.altura - 1, -1, -1):
+            base = linha * raster.largura
+            valores = array('i', bytes(4 * raster.largura * len(usadas)))
+            for coluna in range(raster.largura):
+                pos = base + coluna
+                definida = False
+                for j, (c, escala) in enumerate(zip(colunas, escalas)):
+                    v = c[pos]
+                    if v == v:
+                        definida = True
+                        valores[coluna * len(usadas) + j] = max(0, int(round(v * escala)))
+                n += definida
+            if inverter:
+                valores.byteswap()
+            grade.write(valores.tobytes())
+        tamanho = grade.tell()
+
+    raiz = ET.Element('ISO11783_TaskData', {
+        'VersionMajor': '4',
+        'VersionMinor': '0',
+        'ManagementSoftwareManufacturer': 'FertiSoja',
+        'ManagementSoftwareVersion': '1.0',
+        'DataTransferOrigin': '1',
+    })
+    for i, taxa in enumerate(usadas, start=1):
+        ET.SubElement(raiz, 'PDT', {'A': f'PDT{i}', 'B': taxa.produto})
+    tarefa = ET.SubElement(raiz, 'TSK', {'A': 'TSK1', 'B': nome_tarefa, 'G': '1'})
+    zona = ET.SubElement(tarefa, 'TZN', {'A': '1', 'B': 'Taxa variavel'})
+    for i in range(1, len(usadas) + 1):
+        ET.SubElement(zona, 'PDV', {'A': f'{DDI_TAXA_MASSA:04X}', 'B': '0', 'C': f'PDT{i}'})
+    ET.SubElement(tarefa, 'GRD', {
+        'A': f'{lats[-1]:.9f}',
+        'B': f'{lons[0]:.9f}',
+        'C': f'{lats[0] - lats[1]:.9f}',
+        'D': f'{lons[1] - lons[0]:.9f}',
+        'E': str(raster.largura),
+        'F': str(raster.altura),
+        'G': nome_grade,
+        'H': str(tamanho),
+        'I': '2',
+        'J': '1',
+    })
+    ET.ElementTree(raiz).write(os.path.join(diretorio, 'TASKDATA.XML'), encoding='UTF-8', xml_declaration=True)
+    return n
+
+
+def exportar(
+    raster: RasterPrescricao,
+    destino: str,
+    taxas: Sequence[CamadaTaxa] = TAXAS_PADRAO,
+    camadas: Optional[Mapping[str, Sequence[float]]] = None,
+) -> int:
+    """Escolhe o formato pela extensão: .geojson/.json, .shp ou pasta (ISO-XML)."""
+    minusculo = destino.lower()
+    if minusculo.endswith(('.geojson', '.json')):
+        return exportar_geojson(raster, destino, taxas, camadas)
+    if minusculo.endswith('.shp'):
+        return exportar_shapefile(raster, destino, taxas, camadas)
+    return exportar_isoxml(raster, destino, taxas, camadas)
+
+
+__all__ = [
+    'CamadaTaxa',
+    'TAXAS_PADRAO',
+    'exportar',
+    'exportar_geojson',
+    'exportar_isoxml',
+    'exportar_shapefile',
+]
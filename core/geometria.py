@@ -0,0 +1,270 @@
+"""Operações espaciais sobre os polígonos dos talhões.
+
+Os polígonos seguem o formato de `aba_mapa_area`: ``{"outer": [anel, ...],
+"inner": [anel, ...]}`` com anéis como listas de ``(x, y)`` (ou ``(lon,
+lat)``) sem repetir o primeiro vértice. Todas as rotinas usam a regra
+par-ímpar sobre os anéis do polígono, de modo que os ``inner`` viram furos.
+"""
+from __future__ import annotations
+
+import math
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+Ponto = Tuple[float, float]
+Anel = Sequence[Ponto]
+Poligono = Mapping[str, Sequence[Anel]]
+Caixa = Tuple[float, float, float, float]  # (x_min, y_min, x_max, y_max)
+
+# Filhos por nó da R-tree empacotada (STR).
+CAPACIDADE_NO = 16
+
+
+def aneis(poligono: Poligono) -> List[Anel]:
+    return [*poligono.get('outer', ()), *poligono.get('inner', ())]
+
+
+def caixa(poligono: Poligono) -> Optional[Caixa]:
+    pontos = [p for anel in poligono.get('outer', ()) for p in anel]
+    if not pontos:
+        return None
+    xs = [x for x, _ in pontos]
+    ys = [y for _, y in pontos]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+def transformar(poligono: Poligono, funcao) -> Dict[str, List[List[Ponto]]]:
+    """Aplica ``funcao(x, y) -> (x', y')`` a todos os vértices."""
+    return {
+        chave: [[funcao(x, y) for x, y in anel] for anel in poligono.get(chave, ())]
+        for chave in ('outer', 'inner')
+    }
+
+
+def _arestas(poligono: Poligono) -> List[Tuple[float, float, float, float]]:
+    arestas = []
+    for anel in aneis(poligono):
+        for i, (x1, y1) in enumerate(anel):
+            x2, y2 = anel[i - 1]
+            if y1 != y2:
+                arestas.append((x1, y1, x2, y2))
+    return arestas
+
+
+def contem(poligono: Poligono, x: float, y: float) -> bool:
+    """Ponto dentro do polígono (fora dos furos), por cruzamento de raio."""
+    dentro = False
+    for anel in aneis(poligono):
+        for i, (x1, y1) in enumerate(anel):
+            x2, y2 = anel[i - 1]
+            if (y1 <= y < y2) or (y2 <= y < y1):
+                if x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                    dentro = not dentro
+    return dentro
+
+
+class FaixasPoligono:
+    """Arestas de um polígono repartidas em faixas horizontais da sua caixa.
+
+    O teste de ponto percorre só as arestas da faixa que contém ``y`` (cerca
+    de raiz quadrada do total), com a mesma regra de `contem`.
+    """
+
+    __slots__ = ('y_min', 'y_max', 'altura_faixa', 'faixas')
+
+    def __init__(self, poligono: Poligono) -> None:
+        arestas = _arestas(poligono)
+        ys = [y for x1, y1, x2, y2 in arestas for y in (y1, y2)]
+        self.y_min = min(ys, default=0.0)
+        self.y_max = max(ys, default=0.0)
+        n = max(1, int(math.sqrt(len(arestas))))
+        self.altura_faixa = (self.y_max - self.y_min) / n or 1.0
+        self.faixas: List[List[Tuple[float, float, float, float]]] = [[] for _ in range(n)]
+        for aresta in arestas:
+            _, y1, _, y2 = aresta
+            for f in range(self._faixa(min(y1, y2)), self._faixa(max(y1, y2)) + 1):
+                self.faixas[f].append(aresta)
+
+    def _faixa(self, y: float) -> int:
+        return min(len(self.faixas) - 1, max(0, int((y - self.y_min) / self.altura_faixa)))
+
+    def contem(self, x: float, y: float) -> bool:
+        if y < self.y_min or y >= self.y_max:
+            return False
+        dentro = False
+        for x1, y1, x2, y2 in self.faixas[self._faixa(y)]:
+            if (y1 <= y < y2) or (y2 <= y < y1):
+                if x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                    dentro = not dentro
+        return dentro
+
+
+def rasterizar(
+    poligonos: Iterable[Poligono],
+    x_min: float,
+    y_max: float,
+    resolucao: float,
+    largura: int,
+    altura: int,
+) -> bytearray:
+    """Máscara ``largura * altura`` (linhas de norte para sul) com 1 nas células
+    cujo centro está dentro de algum polígono.
+
+    Varredura por linhas com tabela de arestas ativas: cada aresta entra na
+    linha em que começa e sai na linha em que termina, então o custo é
+    proporcional a arestas + cruzamentos, não a linhas x arestas.
+    """
+    mascara = bytearray(largura * altura)
+    for poligono in poligonos:
+        entrada: Dict[int, List[Tuple[float, float, float, float]]] = {}
+        for x1, y1, x2, y2 in _arestas(poligono):
+            y_baixo, y_alto = (y1, y2) if y1 < y2 else (y2, y1)
+            # linhas com y_baixo <= centro < y_alto; centro = y_max - (linha + 0.5) * resolucao
+            primeira = max(0, math.floor((y_max - y_alto) / resolucao - 0.5) + 1)
+            ultima = min(altura, math.floor((y_max - y_baixo) / resolucao - 0.5) + 1)
+            if primeira < ultima:
+                inclinacao = (x2 - x1) / (y2 - y1)
+                entrada.setdefault(primeira, []).append((ultima, x1, y1, inclinacao))
+        if not entrada:
+            continue
+        ativas: List[Tuple[float, float, float, float]] = []
+        for linha in range(min(entrada), altura):
+            novas = entrada.pop(linha, None)
+            if novas:
+                ativas.extend(novas)
+            ativas = [aresta for aresta in ativas if aresta[0] > linha]
+            if not ativas:
+                if not entrada:
+                    break
+                continue
+            y = y_max - (linha + 0.5) * resolucao
+            cortes = sorted(x1 + (y - y1) * inclinacao for _, x1, y1, inclinacao in ativas)
+            base = linha * largura
+            for xa, xb in zip(cortes[::2], cortes[1::2]):
+                inicio = max(0, math.ceil((xa - x_min) / resolucao - 0.5))
+                fim = min(largura, math.ceil((xb - x_min) / resolucao - 0.5))
+                if fim > inicio:
+                    mascara[base + inicio:base + fim] = b'\x01' * (fim - inicio)
+    return mascara
+
+
+class IndicePoligonos:
+    """R-tree empacotada por Sort-Tile-Recursive sobre as caixas dos polígonos.
+
+    Montada uma vez; os nós ficam em listas paralelas (caixa, filhos, folha?),
+    e os filhos de uma folha são índices de polígonos. `localizar` devolve o
+    índice do polígono que contém cada ponto (-1 se nenhum), testando só os
+    candidatos da árvore, cada um pelas suas `FaixasPoligono` (montadas na
+    primeira consulta que o alcança).
+    """
+
+    def __init__(self, poligonos: Sequence[Poligono], capacidade: int = CAPACIDADE_NO) -> None:
+        self.poligonos = list(poligonos)
+        self._capacidade = max(2, capacidade)
+        self._caixas: List[Caixa] = []
+        self._filhos: List[Tuple[int, ...]] = []
+        self._folha: List[bool] = []
+        self._caixas_poligono = [caixa(p) for p in self.poligonos]
+        self._faixas: List[Optional[FaixasPoligono]] = [None] * len(self.poligonos)
+        itens = [(c, i) for i, c in enumerate(self._caixas_poligono) if c is not None]
+        self._raiz = self._montar(itens) if itens else -1
+
+    def __len__(self) -> int:
+        return len(self.poligonos)
+
+    def _novo_no(self, grupo: Sequence[Tuple[Caixa, int]], folha: bool) -> Tuple[Caixa, int]:
+        caixa_no = (
+            min(c[0] for c, _ in grupo),
+            min(c[1] for c, _ in grupo),
+            max(c[2] for c, _ in grupo),
+            max(c[3] for c, _ in grupo),
+        )
+        no = len(self._caixas)
+        self._caixas.append(caixa_no)
+        self._filhos.append(tuple(i for _, i in grupo))
+        self._folha.append(folha)
+        return caixa_no, no
+
+    def _montar(self, itens: List[Tuple[Caixa, int]]) -> int:
+        folha = True
+        while True:
+            m = self._capacidade
+            n_nos = math.ceil(len(itens) / m)
+            fatias = math.ceil(math.sqrt(n_nos))
+            itens.sort(key=lambda item: item[0][0] + item[0][2])
+            por_fatia = fatias * m
+            nivel = []
+            for inicio in range(0, len(itens), por_fatia):
+                fatia = sorted(itens[inicio:inicio + por_fatia], key=lambda item: item[0][1] + item[0][3])
+                for j in range(0, len(fatia), m):
+                    nivel.append(self._novo_no(fatia[j:j + m], folha))
+            if len(nivel) == 1:
+                return nivel[0][1]
+            itens = nivel
+            folha = False
+
+    def candidatos(self, x: float, y: float) -> List[int]:
+        """Polígonos cuja caixa contém (x, y)."""
+        saida = []
+        if self._raiz < 0:
+            return saida
+        pilha = [self._raiz]
+        while pilha:
+            no = pilha.pop()
+            x0, y0, x1, y1 = self._caixas[no]
+            if x < x0 or x > x1 or y < y0 or y > y1:
+                continue
+            if self._folha[no]:
+                for i in self._filhos[no]:
+                    cx0, cy0, cx1, cy1 = self._caixas_poligono[i]
+                    if cx0 <= x <= cx1 and cy0 <= y <= cy1:
+                        saida.append(i)
+            else:
+                pilha.extend(self._filhos[no])
+        return saida
+
+    def na_caixa(self, busca: Caixa) -> List[int]:
+        """Polígonos cuja caixa intersecta `busca` (x_min, y_min, x_max, y_max)."""
+        saida = []
+        if self._raiz < 0:
+            return saida
+        bx0, by0, bx1, by1 = busca
+        pilha = [self._raiz]
+        while pilha:
+            no = pilha.pop()
+            x0, y0, x1, y1 = self._caixas[no]
+            if x1 < bx0 or x0 > bx1 or y1 < by0 or y0 > by1:
+                continue
+            if self._folha[no]:
+                for i in self._filhos[no]:
+                    cx0, cy0, cx1, cy1 = self._caixas_poligono[i]
+                    if cx1 >= bx0 and cx0 <= bx1 and cy1 >= by0 and cy0 <= by1:
+                        saida.append(i)
+            else:
+                pilha.extend(self._filhos[no])
+        return saida
+
+    def localizar(self, pontos: Iterable[Ponto]) -> List[int]:
+        """Índice do polígono que contém cada ponto; -1 fora de todos."""
+        saida = []
+        for x, y in pontos:
+            achado = -1
+            for i in self.candidatos(x, y):
+                faixas = self._faixas[i]
+                if faixas is None:
+                    faixas = self._faixas[i] = FaixasPoligono(self.poligonos[i])
+                if faixas.contem(x, y):
+                    achado = i
+                    break
+            saida.append(achado)
+        return saida
+
+
+__all__ = [
+    'FaixasPoligono',
+    'IndicePoligonos',
+    'aneis',
+    'caixa',
+    'contem',
+    'rasterizar',
+    'transformar',
+]
@@ -0,0 +1,289 @@
+"""Histórico persistente de laudos, diagnósticos e recomendações (SQLite).
+
+Um único arquivo SQLite em modo WAL (a interface e o serviço local podem
+ler enquanto outro processo grava) com as tabelas ``fazendas``,
+``talhoes``, ``laudos``, ``diagnosticos`` (uma linha por nutriente) e
+``recomendacoes`` (uma linha por tipo: adubação, calagem...).
+
+``talhao_id`` e ``safra`` são repetidos em ``diagnosticos`` e
+``recomendacoes``; assim, perguntas como "talhões com P Muito baixo nesta
+safra" são respondidas só pelo índice ``(safra, nutriente, classe,
+talhao_id)``, sem juntar com ``laudos``, mesmo com milhões de linhas.
+
+`registrar_lote` grava muitos laudos numa transação, com ``executemany``
+por tabela; os ids dos laudos são reservados antes, em vez de um
+``lastrowid`` por linha.
+
+O arquivo padrão fica em ``~/.fertisoja/historico.sqlite3``, ou no caminho
+indicado em ``FERTISOJA_HISTORICO``.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from .diagnostico import DiagnosticoSoja, diagnosticar_soja_registro
+from .registros import DATACLASS_SLOTS
+from .tabelas_manual import TabelasManual, carregar_edicao
+
+ENV_VAR = "FERTISOJA_HISTORICO"
+
+# Nutriente -> atributo de `DiagnosticoSoja` com a classe.
+NUTRIENTES: Dict[str, str] = {
+    'P': 'classe_p',
+    'K': 'classe_k',
+    'Ca': 'classe_ca',
+    'Mg': 'classe_mg',
+    'S': 'classe_s',
+    'Cu': 'classe_cu',
+    'Zn': 'classe_zn',
+    'B': 'classe_b',
+    'Mn': 'classe_mn',
+}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS fazendas (
+    id INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL,
+    municipio TEXT NOT NULL DEFAULT '',
+    produtor TEXT NOT NULL DEFAULT '',
+    UNIQUE (nome, municipio)
+);
+CREATE TABLE IF NOT EXISTS talhoes (
+    id INTEGER PRIMARY KEY,
+    fazenda_id INTEGER NOT NULL REFERENCES fazendas(id),
+    nome TEXT NOT NULL,
+    area_ha REAL,
+    UNIQUE (fazenda_id, nome)
+);
+CREATE TABLE IF NOT EXISTS laudos (
+    id INTEGER PRIMARY KEY,
+    talhao_id INTEGER NOT NULL REFERENCES talhoes(id),
+    safra TEXT NOT NULL,
+    data TEXT,
+    edicao TEXT,
+    valores TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS diagnosticos (
+    laudo_id INTEGER NOT NULL REFERENCES laudos(id) ON DELETE CASCADE,
+    nutriente TEXT NOT NULL,
+    classe TEXT NOT NULL,
+    talhao_id INTEGER NOT NULL,
+    safra TEXT NOT NULL,
+    PRIMARY KEY (laudo_id, nutriente)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS recomendacoes (
+    id INTEGER PRIMARY KEY,
+    laudo_id INTEGER NOT NULL REFERENCES laudos(id) ON DELETE CASCADE,
+    tipo TEXT NOT NULL,
+    talhao_id INTEGER NOT NULL,
+    safra TEXT NOT NULL,
+    p2o5_kg_ha REAL,
+    k2o_kg_ha REAL,
+    calcario_t_ha REAL,
+    dados TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_laudos_talhao_safra ON laudos (talhao_id, safra);
+CREATE INDEX IF NOT EXISTS ix_laudos_safra ON laudos (safra);
+CREATE INDEX IF NOT EXISTS ix_diagnosticos_classe ON diagnosticos (safra, nutriente, classe, talhao_id);
+CREATE INDEX IF NOT EXISTS ix_diagnosticos_talhao ON diagnosticos (talhao_id, safra);
+CREATE INDEX IF NOT EXISTS ix_recomendacoes_laudo ON recomendacoes (laudo_id);
+CREATE INDEX IF NOT EXISTS ix_recomendacoes_talhao ON recomendacoes (talhao_id, safra, tipo);
+"""
+
+
+def caminho_padrao() -> Path:
+    destino = os.environ.get(ENV_VAR)
+    if destino:
+        return Path(destino)
+    return Path.home() / ".fertisoja" / "historico.sqlite3"
+
+
+def _doses(dados: Mapping[str, Any]) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+    """(P2O5 kg/ha, K2O kg/ha, calcário t/ha) das saídas dos motores, se houver."""
+    totais = dados.get('totais') or {}
+    calcario = None
+    for chave in ('dose_t_ha', 'NC_surface_capped_t_ha', 'NC_adjusted_for_PRNT_t_ha'):
+        if dados.get(chave) is not None:
+            calcario = float(dados[chave])
+            break
+    p2o5 = totais.get('P2O5_total')
+    k2o = totais.get('K2O_total')
+    return (
+        float(p2o5) if p2o5 is not None else None,
+        float(k2o) if k2o is not None else None,
+        calcario,
+    )
+
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
+class RegistroLaudo:
+    """Um laudo a gravar: valores com as chaves dos motores (``P_mg_dm3``...).
+
+    Sem ``diagnostico``, as classes são calculadas na gravação, com as
+    tabelas da ``edicao`` (ou as da edição padrão).
+    ``recomendacoes`` mapeia o tipo (``"adubacao"``, ``"calagem"``...) para
+    a saída do motor.
+    """
+
+    talhao_id: int
+    safra: str
+    laudo: Mapping[str, Any]
+    diagnostico: Optional[DiagnosticoSoja] = None
+    recomendacoes: Mapping[str, Mapping[str, Any]] = field(default_factory=dict)
+    data: Optional[str] = None
+    edicao: Optional[str] = None
+
+
+class Historico:
+    """Conexão com o arquivo de histórico; use em ``with`` ou chame `fechar`."""
+
+    def __init__(self, caminho: Optional[os.PathLike | str] = None) -> None:
+        self.caminho = Path(caminho) if caminho is not None else caminho_padrao()
+        if str(self.caminho) != ":memory:":
+            self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        self.conexao = sqlite3.connect(str(self.caminho), isolation_level=None)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+        self.conexao.execute("PRAGMA foreign_keys=ON")
+        self.conexao.executescript(ESQUEMA)
+
+    def fechar(self) -> None:
+        self.conexao.close()
+
+    def __enter__(self) -> "Historico":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.fechar()
+
+    # -- cadastro ---------------------------------------------------------
+    def fazenda(self, nome: str, municipio: str = "", produtor: str = "") -> int:
+        """Id da fazenda, criando-a se ainda não existe."""
+        self.conexao.execute(
+            "INSERT INTO fazendas (nome, municipio, produtor) VALUES (?, ?, ?) "
+            "ON CONFLICT (nome, municipio) DO UPDATE SET produtor = excluded.produtor "
+            "WHERE excluded.produtor != ''",
+            (nome, municipio, produtor),
+        )
+        return self.conexao.execute(
+            "SELECT id FROM fazendas WHERE nome = ? AND municipio = ?", (nome, municipio)
+        ).fetchone()[0]
+
+    def talhao(self, fazenda_id: int, nome: str, area_ha: Optional[float] = None) -> int:
+        """Id do talhão na fazenda, criando-o (ou atualizando a área)."""
+        self.conexao.execute(
+            "INSERT INTO talhoes (fazenda_id, nome, area_ha) VALUES (?, ?, ?) "
+            "ON CONFLICT (fazenda_id, nome) DO UPDATE SET area_ha = COALESCE(excluded.area_ha, area_ha)",
+            (fazenda_id, nome, area_ha),
+        )
+        return self.conexao.execute(
+            "SELECT id FROM talhoes WHERE fazenda_id = ? AND nome = ?", (fazenda_id, nome)
+        ).fetchone()[0]
+
+    # -- gravação ---------------------------------------------------------
+    def registrar(self, registro: RegistroLaudo) -> int:
+        """Grava um laudo com diagnóstico e recomendações; devolve o id."""
+        return self.registrar_lote((registro,))[0]
+
+    def registrar_lote(self, registros: Iterable[RegistroLaudo]) -> List[int]:
+        """Grava os laudos numa única transação; devolve os ids na ordem."""
+        laudos: List[Tuple] = []
+        diagnosticos: List[Tuple] = []
+        recomendacoes: List[Tuple] = []
+        edicoes: Dict[str, TabelasManual] = {}
+        conexao = self.conexao
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            # Dentro da transação ninguém mais grava: os ids seguintes são nossos.
+            proximo = conexao.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM laudos").fetchone()[0]
+            for laudo_id, r in enumerate(registros, start=proximo):
+                diag = r.diagnostico
+                if diag is None:
+                    tabelas = None
+                    if r.edicao:
+                        tabelas = edicoes.get(r.edicao)
+                        if tabelas is None:
+                            tabelas = edicoes[r.edicao] = carregar_edicao(r.edicao)
+                    diag = diagnosticar_soja_registro(dict(r.laudo), tabelas)
+                laudos.append((laudo_id, r.talhao_id, r.safra, r.data, r.edicao, json.dumps(dict(r.laudo), ensure_ascii=False)))
+                for nutriente, atributo in NUTRIENTES.items():
+                    classe = getattr(diag, atributo)
+                    if classe:
+                        diagnosticos.append((laudo_id, nutriente, classe, r.talhao_id, r.safra))
+                for tipo, dados in r.recomendacoes.items():
+                    recomendacoes.append(
+                        (laudo_id, tipo, r.talhao_id, r.safra, *_doses(dados), json.dumps(dados, ensure_ascii=False, default=str))
+                    )
+            conexao.executemany(
+                "INSERT INTO laudos (id, talhao_id, safra, data, edicao, valores) VALUES (?, ?, ?, ?, ?, ?)", laudos
+            )
+            conexao.executemany(
+                "INSERT INTO diagnosticos (laudo_id, nutriente, classe, talhao_id, safra) VALUES (?, ?, ?, ?, ?)",
+                diagnosticos,
+            )
+            conexao.executemany(
+                "INSERT INTO recomendacoes (laudo_id, tipo, talhao_id, safra, p2o5_kg_ha, k2o_kg_ha, calcario_t_ha, dados) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                recomendacoes,
+            )
+        except BaseException:
+            conexao.execute("ROLLBACK")
+            raise
+        conexao.execute("COMMIT")
+        return [linha[0] for linha in laudos]
+
+    # -- consultas --------------------------------------------------------
+    def talhoes_com_classe(self, nutriente: str, classe: str, safra: str) -> List[Dict[str, Any]]:
+        """Talhões com ao menos um laudo da safra na classe (ex.: P "Muito baixo")."""
+        cursor = self.conexao.execute(
+            "SELECT t.id, t.nome, f.nome, f.municipio, t.area_ha, c.laudos "
+            "FROM (SELECT talhao_id, COUNT(*) AS laudos FROM diagnosticos "
+            "      WHERE safra = ? AND nutriente = ? AND classe = ? GROUP BY talhao_id) AS c "
+            "JOIN talhoes t ON t.id = c.talhao_id JOIN fazendas f ON f.id = t.fazenda_id "
+            "ORDER BY f.nome, t.nome",
+            (safra, nutriente, classe),
+        )
+        return [
+            {'talhao_id': i, 'talhao': nome, 'fazenda': fazenda, 'municipio': municipio, 'area_ha': area, 'laudos': n}
+            for i, nome, fazenda, municipio, area, n in cursor
+        ]
+
+    def laudos_do_talhao(self, talhao_id: int, safra: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Laudos do talhão (de uma safra ou de todas), com classes e recomendações."""
+        filtro, parametros = ("AND safra = ?", (talhao_id, safra)) if safra is not None else ("", (talhao_id,))
+        laudos = {
+            laudo_id: {
+                'id': laudo_id, 'safra': s, 'data': data, 'edicao': edicao,
+                'laudo': json.loads(valores), 'classes': {}, 'recomendacoes': {},
+            }
+            for laudo_id, s, data, edicao, valores in self.conexao.execute(
+                f"SELECT id, safra, data, edicao, valores FROM laudos WHERE talhao_id = ? {filtro} ORDER BY safra, id",
+                parametros,
+            )
+        }
+        for laudo_id, nutriente, classe in self.conexao.execute(
+            f"SELECT laudo_id, nutriente, classe FROM diagnosticos WHERE talhao_id = ? {filtro}", parametros
+        ):
+            laudos[laudo_id]['classes'][nutriente] = classe
+        for laudo_id, tipo, dados in self.conexao.execute(
+            f"SELECT laudo_id, tipo, dados FROM recomendacoes WHERE talhao_id = ? {filtro}", parametros
+        ):
+            laudos[laudo_id]['recomendacoes'][tipo] = json.loads(dados)
+        return list(laudos.values())
+
+    def safras(self) -> List[str]:
+        return [s for (s,) in self.conexao.execute("SELECT DISTINCT safra FROM laudos ORDER BY safra")]
+
+
+__all__ = [
+    'ENV_VAR',
+    'Historico',
+    'NUTRIENTES',
+    'RegistroLaudo',
+    'caminho_padrao',
+]
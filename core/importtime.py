@@ -0,0 +1,168 @@
+"""Relatório de tempo de importação (ms acumulados por módulo).
+
+Dois modos de uso:
+
+* No build do PyInstaller (ou em qualquer execução), defina a variável de
+  ambiente ``FERTISOJA_IMPORTTIME``. Com o valor ``1`` o relatório vai para o
+  stderr; qualquer outro valor é tratado como caminho do arquivo de saída.
+  As importações são cronometradas por um gancho em ``builtins.__import__``.
+* A partir do código-fonte, ``python -m core.importtime [modulos...]`` executa
+  um interpretador novo com ``-X importtime`` e resume a saída.
+"""
+from __future__ import annotations
+
+import builtins
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+ENV_VAR = "FERTISOJA_IMPORTTIME"
+
+MODULOS_STARTUP: Tuple[str, ...] = (
+    "fertisoja",
+    "core.aba_dados",
+    "core.aba_condicoes",
+    "core.aba_recomendacao_calcario",
+    "core.aba_adubacao",
+    "core.aba_fertilizacao",
+    "core.aba_resultados",
+    "core.aba_exportacao",
+)
+
+_import_original = builtins.__import__
+_acumulado_ms: Dict[str, float] = {}
+_proprio_ms: Dict[str, float] = {}
+_pilha: List[float] = []
+
+
+def _nome_absoluto(name: str, globals_: Optional[dict], level: int) -> str:
+    if level <= 0:
+        return name
+    pacote = (globals_ or {}).get("__package__") or ""
+    partes = pacote.split(".")
+    if level > 1:
+        partes = partes[: len(partes) - (level - 1)]
+    base = ".".join(p for p in partes if p)
+    if not name:
+        return base
+    return f"{base}.{name}" if base else name
+
+
+def _cronometrar(alvo: str, name, globals_, locals_, fromlist, level):
+    inicio = time.perf_counter()
+    _pilha.append(0.0)
+    try:
+        return _import_original(name, globals_, locals_, fromlist, level)
+    finally:
+        decorrido = time.perf_counter() - inicio
+        filhos = _pilha.pop()
+        if _pilha:
+            _pilha[-1] += decorrido
+        if alvo in sys.modules and alvo not in _acumulado_ms:
+            _acumulado_ms[alvo] = decorrido * 1000.0
+            _proprio_ms[alvo] = max(decorrido - filhos, 0.0) * 1000.0
+
+
+def _import_cronometrado(name, globals=None, locals=None, fromlist=(), level=0):
+    alvo = _nome_absoluto(name, globals, level)
+    if fromlist and alvo in sys.modules:
+        # "from pacote import modulo": cronometra cada submódulo novo em separado.
+        for item in fromlist:
+            if not isinstance(item, str) or item == "*":
+                continue
+            sub = f"{alvo}.{item}"
+            if sub in sys.modules or hasattr(sys.modules[alvo], item):
+                continue
+            try:
+                _cronometrar(sub, sub, globals, locals, (), 0)
+            except ImportError:
+                pass
+    if alvo in sys.modules:
+        return _import_original(name, globals, locals, fromlist, level)
+    return _cronometrar(alvo, name, globals, locals, fromlist, level)
+
+
+def instalar() -> None:
+    builtins.__import__ = _import_cronometrado
+
+
+def desinstalar() -> None:
+    builtins.__import__ = _import_original
+
+
+def ativo() -> bool:
+    return bool(os.environ.get(ENV_VAR))
+
+
+def instalar_se_ativo() -> None:
+    if ativo():
+        instalar()
+
+
+def medicoes() -> Dict[str, Tuple[float, float]]:
+    """Retorna {modulo: (proprio_ms, acumulado_ms)} do gancho em processo."""
+    return {nome: (_proprio_ms.get(nome, 0.0), ms) for nome, ms in _acumulado_ms.items()}
+
+
+def parse_importtime(texto: str) -> Dict[str, Tuple[float, float]]:
+    """Converte a saída de ``python -X importtime`` em {modulo: (proprio_ms, acumulado_ms)}."""
+    resultado: Dict[str, Tuple[float, float]] = {}
+    for linha in texto.splitlines():
+        if not linha.startswith("import time:"):
+            continue
+        partes = linha[len("import time:"):].split("|")
+        if len(partes) != 3:
+            continue
+        try:
+            proprio = int(partes[0].strip()) / 1000.0
+            acumulado = int(partes[1].strip()) / 1000.0
+        except ValueError:
+            continue
+        nome = partes[2].strip()
+        resultado[nome] = (proprio, acumulado)
+    return resultado
+
+
+def formatar_relatorio(dados: Dict[str, Tuple[float, float]], limite: int = 40) -> str:
+    linhas = [f"{'acumulado (ms)':>15} {'proprio (ms)':>13}  modulo"]
+    ordenado = sorted(dados.items(), key=lambda item: item[1][1], reverse=True)
+    for nome, (proprio, acumulado) in ordenado[:limite]:
+        linhas.append(f"{acumulado:15.2f} {proprio:13.2f}  {nome}")
+    total = sum(proprio for proprio, _ in dados.values())
+    linhas.append(f"{len(dados)} modulos, {total:.1f} ms no total")
+    return "\n".join(linhas)
+
+
+def emitir_se_ativo(limite: int = 40) -> None:
+    destino = os.environ.get(ENV_VAR)
+    if not destino:
+        return
+    texto = formatar_relatorio(medicoes(), limite)
+    if destino == "1":
+        if sys.stderr is not None:
+            print(texto, file=sys.stderr)
+        return
+    try:
+        with open(destino, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto + "\n")
+    except OSError:
+        pass
+
+
+def medir_subprocesso(modulos: Iterable[str] = MODULOS_STARTUP) -> Dict[str, Tuple[float, float]]:
+    codigo = "; ".join(f"import {nome}" for nome in modulos)
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=raiz,
+        capture_output=True,
+        text=True,
+    )
+    return parse_importtime(proc.stderr)
+
+
+if __name__ == "__main__":
+    alvos = sys.argv[1:] or list(MODULOS_STARTUP)
+    print(formatar_relatorio(medir_subprocesso(alvos)))
@@ -0,0 +1,165 @@
+"""Camada de cor sobre o mapa para atributos e doses de `RasterPrescricao`.
+
+A sobreposição é cortada na mesma grade de tiles de 256 px do OSM, então o
+mapa só cola tiles prontos ao arrastar. Cada tile é colorizado por uma
+tabela de 256 cores RGBA (rampa vermelho -> amarelo -> verde, NaN
+transparente) e guardado por (camada, z, x, y).
+
+Na projeção Mercator a longitude de um pixel depende só da coluna e a
+latitude só da linha; como a grade da prescrição é regular em lon/lat, o
+índice da célula sai de dois vetores (coluna e linha do raster) por tile.
+Com NumPy a colorização é vetorizada; sem ele, monta os bytes linha a linha.
+"""
+from __future__ import annotations
+
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .mapa_talhoes import TILE_SIZE, pixel_to_lonlat
+from .prescricao import R_TERRA, RasterPrescricao
+
+try:
+    from PIL import Image
+    PIL_OK = True
+except Exception:
+    PIL_OK = False
+
+try:
+    import numpy as np
+    NUMPY_OK = True
+except Exception:
+    np = None
+    NUMPY_OK = False
+
+ALFA_SOBREPOSICAO = 150
+MAX_TILES_SOBREPOSICAO = 512
+# (posição 0..1, R, G, B): baixo em vermelho, alto em verde.
+RAMPA_PADRAO: Tuple[Tuple[float, int, int, int], ...] = (
+    (0.0, 215, 25, 28),
+    (0.25, 253, 174, 97),
+    (0.5, 255, 255, 191),
+    (0.75, 166, 217, 106),
+    (1.0, 26, 150, 65),
+)
+
+
+def tabela_cores(rampa: Sequence[Tuple[float, int, int, int]] = RAMPA_PADRAO, alfa: int = ALFA_SOBREPOSICAO) -> bytes:
+    """256 cores RGBA concatenadas (1024 bytes): a 0 é transparente (sem
+    dado) e as 1..255 percorrem a rampa do mínimo ao máximo."""
+    saida = bytearray(4)
+    for i in range(255):
+        t = i / 254.0
+        for (p0, *c0), (p1, *c1) in zip(rampa, rampa[1:]):
+            if t <= p1:
+                f = (t - p0) / (p1 - p0) if p1 > p0 else 0.0
+                saida.extend(round(a + (b - a) * f) for a, b in zip(c0, c1))
+                break
+        else:
+            saida.extend(rampa[-1][1:])
+        saida.append(alfa)
+    return bytes(saida)
+
+
+class SobreposicaoRaster:
+    """Tiles RGBA de uma camada do raster, gerados sob demanda e guardados."""
+
+    def __init__(
+        self,
+        raster: RasterPrescricao,
+        camada: str,
+        faixa: Optional[Tuple[float, float]] = None,
+        rampa: Sequence[Tuple[float, int, int, int]] = RAMPA_PADRAO,
+    ) -> None:
+        self.raster = raster
+        self.camada = camada
+        valores = raster.camadas[camada]
+        if faixa is None:
+            definidos = [v for v in valores if v == v]
+            faixa = (min(definidos), max(definidos)) if definidos else (0.0, 1.0)
+        self.faixa = faixa
+        self._lut = tabela_cores(rampa)
+        self._cache: Dict[Tuple[str, int, int, int], Optional["Image.Image"]] = {}
+        # Caixa do raster em lon/lat, para pular tiles sem nenhuma célula.
+        escala_lon = math.degrees(1.0 / (math.cos(math.radians(raster.lat0)) * R_TERRA))
+        escala_lat = math.degrees(1.0 / R_TERRA)
+        self._lon_min = raster.x_min * escala_lon
+        self._lon_max = (raster.x_min + raster.largura * raster.resolucao_m) * escala_lon
+        self._lat_max = raster.y_max * escala_lat
+        self._lat_min = (raster.y_max - raster.altura * raster.resolucao_m) * escala_lat
+        # Cor de cada célula como índice na tabela (0 = NaN).
+        minimo, maximo = faixa
+        passo = (maximo - minimo) or 1.0
+        self._quantizado = bytearray(
+            0 if v != v else 1 + min(254, max(0, int((v - minimo) / passo * 254.0 + 0.5)))
+            for v in valores
+        )
+
+    def _indices_tile(self, z: int, tx: int, ty: int) -> Tuple[List[int], List[int]]:
+        r = self.raster
+        cos_lat0 = math.cos(math.radians(r.lat0))
+        colunas = []
+        for i in range(TILE_SIZE):
+            lon, _ = pixel_to_lonlat(tx * TILE_SIZE + i + 0.5, 0.0, z)
+            x = math.radians(lon) * cos_lat0 * R_TERRA
+            c = math.floor((x - r.x_min) / r.resolucao_m)
+            colunas.append(c if 0 <= c < r.largura else -1)
+        linhas = []
+        for j in range(TILE_SIZE):
+            _, lat = pixel_to_lonlat(0.0, ty * TILE_SIZE + j + 0.5, z)
+            y = math.radians(lat) * R_TERRA
+            l = math.floor((r.y_max - y) / r.resolucao_m)
+            linhas.append(l if 0 <= l < r.altura else -1)
+        return linhas, colunas
+
+    def _fora(self, z: int, tx: int, ty: int) -> bool:
+        oeste, norte = pixel_to_lonlat(tx * TILE_SIZE, ty * TILE_SIZE, z)
+        leste, sul = pixel_to_lonlat((tx + 1) * TILE_SIZE, (ty + 1) * TILE_SIZE, z)
+        return leste < self._lon_min or oeste > self._lon_max or norte < self._lat_min or sul > self._lat_max
+
+    def _renderizar(self, z: int, tx: int, ty: int):
+        linhas, colunas = self._indices_tile(z, tx, ty)
+        largura = self.raster.largura
+        if NUMPY_OK:
+            q = np.frombuffer(self._quantizado, dtype=np.uint8)
+            lut = np.frombuffer(self._lut, dtype=np.uint8).reshape(256, 4)
+            lin = np.asarray(linhas)
+            col = np.asarray(colunas)
+            validos = (lin[:, None] >= 0) & (col[None, :] >= 0)
+            idx = np.where(validos, lin[:, None] * largura + col[None, :], 0)
+            cores = np.where(validos, q[idx], 0)
+            rgba = lut[cores]
+            return Image.fromarray(np.ascontiguousarray(rgba), "RGBA")
+        lut = self._lut
+        cores = [lut[4 * k:4 * k + 4] for k in range(256)]
+        q = self._quantizado
+        transparente = bytes(4 * TILE_SIZE)
+        dados = bytearray()
+        for l in linhas:
+            if l < 0:
+                dados.extend(transparente)
+                continue
+            base = l * largura
+            dados.extend(b''.join(cores[q[base + c]] if c >= 0 else cores[0] for c in colunas))
+        return Image.frombytes("RGBA", (TILE_SIZE, TILE_SIZE), bytes(dados))
+
+    def tile(self, z: int, tx: int, ty: int):
+        """Imagem RGBA do tile, ou None se não há células nele (ou sem Pillow)."""
+        if not PIL_OK:
+            return None
+        chave = (self.camada, z, tx, ty)
+        if chave in self._cache:
+            imagem = self._cache.pop(chave)
+        else:
+            imagem = None if self._fora(z, tx, ty) else self._renderizar(z, tx, ty)
+            if len(self._cache) >= MAX_TILES_SOBREPOSICAO:
+                del self._cache[next(iter(self._cache))]
+        self._cache[chave] = imagem
+        return imagem
+
+
+__all__ = [
+    'NUMPY_OK',
+    'RAMPA_PADRAO',
+    'SobreposicaoRaster',
+    'tabela_cores',
+]
@@ -0,0 +1,123 @@
+"""Projeção e seleção dos talhões desenhados no mapa (sem dependência de GUI).
+
+Os polígonos são projetados uma única vez para pixels de Web Mercator no
+zoom 0; em qualquer zoom ``z`` basta multiplicar por ``2**z``. A cada quadro
+só entram os talhões cuja caixa cruza a janela visível (consulta na R-tree
+de `core.geometria`), e com nível de detalhe:
+
+* talhões menores que `LOD_PONTO_PX` na tela viram um ponto no centro;
+* vértices a menos de `SIMPLIFICAR_PX` do anterior são descartados.
+
+Os anéis simplificados ficam guardados para o zoom atual, então arrastar o
+mapa só desloca pontos já prontos; o cache é refeito quando o zoom muda.
+"""
+from __future__ import annotations
+
+import math
+from typing import Dict, List, Sequence, Tuple
+
+from .geometria import IndicePoligonos, Poligono, caixa, transformar
+
+TILE_SIZE = 256
+LOD_PONTO_PX = 4.0
+SIMPLIFICAR_PX = 1.0
+
+
+def lonlat_to_pixel(lon, lat, z):
+    lat = max(min(lat, 85.05112878), -85.05112878)
+    siny = math.sin(math.radians(lat))
+    n = 2.0 ** z
+    x = (lon + 180.0) / 360.0 * n * TILE_SIZE
+    y = (0.5 - math.log((1 + siny) / (1 - siny)) / (4 * math.pi)) * n * TILE_SIZE
+    return x, y
+
+
+def pixel_to_lonlat(px, py, z):
+    n = 2.0 ** z
+    lon = px / (n * TILE_SIZE) * 360.0 - 180.0
+    y = 0.5 - (py / (n * TILE_SIZE))
+    lat = 90.0 - 360.0 * math.atan(math.exp(-y * 2 * math.pi)) / math.pi
+    return lon, lat
+
+
+def _simplificar(anel, escala: float) -> List[Tuple[float, float]]:
+    pontos = []
+    ux = uy = math.inf
+    for x, y in anel:
+        X = x * escala
+        Y = y * escala
+        if abs(X - ux) + abs(Y - uy) >= SIMPLIFICAR_PX:
+            pontos.append((X, Y))
+            ux, uy = X, Y
+    return pontos
+
+
+class CamadaTalhoes:
+    """Talhões de um KML/KMZ prontos para desenho com recorte pela janela."""
+
+    def __init__(self, polys_ll: Sequence[Poligono]) -> None:
+        self.polys = [transformar(p, lambda lon, lat: lonlat_to_pixel(lon, lat, 0)) for p in polys_ll]
+        self.indice = IndicePoligonos(self.polys)
+        self._caixas = [caixa(p) for p in self.polys]
+        self._zoom = None
+        self._aneis_zoom: Dict[int, Tuple[list, list]] = {}
+
+    def __len__(self) -> int:
+        return len(self.polys)
+
+    def _aneis(self, i: int, z, escala: float) -> Tuple[list, list]:
+        if z != self._zoom:
+            self._zoom = z
+            self._aneis_zoom = {}
+        aneis = self._aneis_zoom.get(i)
+        if aneis is None:
+            poly = self.polys[i]
+            aneis = self._aneis_zoom[i] = (
+                [_simplificar(anel, escala) for anel in poly["outer"]],
+                [_simplificar(anel, escala) for anel in poly["inner"]],
+            )
+        return aneis
+
+    def visiveis(self, z, center_px, center_py, canvas_w, canvas_h):
+        """(polígonos em pixels de tela, pontos dos talhões pequenos demais).
+
+        Cada polígono é ``{"outer": [...], "inner": [...], "indice": i}``,
+        com os anéis em pixels de tela; só entram os que cruzam a janela
+        ``canvas_w x canvas_h`` centrada em (center_px, center_py).
+        """
+        escala = 2.0 ** z
+        dx = canvas_w / 2 - center_px
+        dy = canvas_h / 2 - center_py
+        janela = (
+            (center_px - canvas_w / 2) / escala,
+            (center_py - canvas_h / 2) / escala,
+            (center_px + canvas_w / 2) / escala,
+            (center_py + canvas_h / 2) / escala,
+        )
+        poligonos, pontos = [], []
+        for i in sorted(self.indice.na_caixa(janela)):
+            x0, y0, x1, y1 = self._caixas[i]
+            if max(x1 - x0, y1 - y0) * escala < LOD_PONTO_PX:
+                pontos.append(((x0 + x1) / 2 * escala + dx, (y0 + y1) / 2 * escala + dy))
+                continue
+            externos, internos = self._aneis(i, z, escala)
+            poligonos.append({
+                "indice": i,
+                "outer": [[(X + dx, Y + dy) for X, Y in anel] for anel in externos],
+                "inner": [[(X + dx, Y + dy) for X, Y in anel] for anel in internos],
+            })
+        return poligonos, pontos
+
+    def localizar(self, canvas_x, canvas_y, z, center_px, center_py, canvas_w, canvas_h) -> int:
+        """Índice do talhão sob o ponto (canvas_x, canvas_y) da tela; -1 se nenhum."""
+        escala = 2.0 ** z
+        x = (canvas_x - canvas_w / 2 + center_px) / escala
+        y = (canvas_y - canvas_h / 2 + center_py) / escala
+        return self.indice.localizar([(x, y)])[0]
+
+
+__all__ = [
+    'CamadaTalhoes',
+    'lonlat_to_pixel',
+    'pixel_to_lonlat',
+]
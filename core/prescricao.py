@@ -0,0 +1,496 @@
+"""Prescrição em taxa variável a partir de amostragem em grade.
+
+As amostras georreferenciadas são interpoladas por IDW (vizinhos mais
+próximos numa árvore k-d) sobre uma grade regular que cobre o talhão; cada
+célula dentro do contorno recebe a dose de calcário (SMP ou V%) e as doses
+de P2O5/K2O dos motores de calagem e adubação.
+
+A saída é CSV, ou o formato do controlador pela extensão do destino
+(.geojson, .shp ou uma pasta TASKDATA; veja `core.exportacao_prescricao`).
+
+Uso: python -m core.prescricao contorno.(kmz|kml|geojson|shp|zip) amostras.csv saida.(csv|geojson|shp|pasta) [resolucao_m] [produtividade_t_ha]
+"""
+from __future__ import annotations
+
+import csv
+import heapq
+import math
+import re
+import sys
+import unicodedata
+from array import array
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+from .adubacao_dados import EntradaSoja, ResultadoAdubacao, recomendar_adubacao_soja
+from .contornos import ler_contorno
+from .diagnostico import classificar_k, classificar_p
+from .geometria import rasterizar, transformar
+from .registros import DATACLASS_SLOTS
+from .tabelas_manual import TabelasManual, tabelas_ou_padrao
+
+R_TERRA = 6_371_000.0
+RESOLUCAO_PADRAO_M = 10.0
+VIZINHOS_PADRAO = 8
+POTENCIA_PADRAO = 2.0
+# Células processadas juntas na busca de vizinhos (lado do bloco, em células).
+BLOCO_CELULAS = 8
+
+ATRIBUTOS = ('P', 'K', 'SMP', 'V', 'argila', 'CTC', 'MO', 'pH')
+CAMADAS_DOSE = ('calcario_t_ha', 'P2O5_kg_ha', 'K2O_kg_ha')
+
+_APELIDOS = {
+    'p': 'P', 'fosforo': 'P',
+    'k': 'K', 'potassio': 'K',
+    'smp': 'SMP', 'indice smp': 'SMP',
+    'v': 'V', 'v%': 'V', 'saturacao por bases': 'V',
+    'argila': 'argila',
+    'ctc': 'CTC', 'ctc ph7': 'CTC', 'ctc ph 7': 'CTC',
+    'mo': 'MO', 'm.o.': 'MO', 'm.o': 'MO', 'materia organica': 'MO',
+    'ph': 'pH', 'ph agua': 'pH', 'ph h2o': 'pH',
+}
+_COLUNAS_LON = {'lon', 'longitude', 'x'}
+_COLUNAS_LAT = {'lat', 'latitude', 'y'}
+
+Poligono = Mapping[str, Sequence[Sequence[Tuple[float, float]]]]
+
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
+class AmostraGrade:
+    lon: float
+    lat: float
+    valores: Mapping[str, float]
+
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
+class RasterPrescricao:
+    """Grade de células quadradas (projeção local); NaN fora do talhão.
+
+    As camadas são vetores ``array('d')`` em ordem de linha (norte -> sul),
+    com ``largura * altura`` valores.
+    """
+
+    resolucao_m: float
+    largura: int
+    altura: int
+    x_min: float
+    y_max: float
+    lat0: float
+    celulas: int
+    camadas: Mapping[str, array]
+
+    @property
+    def area_ha(self) -> float:
+        return self.celulas * self.resolucao_m * self.resolucao_m / 10_000.0
+
+    def centro_lonlat(self, linha: int, coluna: int) -> Tuple[float, float]:
+        x = self.x_min + (coluna + 0.5) * self.resolucao_m
+        y = self.y_max - (linha + 0.5) * self.resolucao_m
+        return _xy_para_lonlat(self.lat0, x, y)
+
+    def valor(self, camada: str, linha: int, coluna: int) -> float:
+        return self.camadas[camada][linha * self.largura + coluna]
+
+    def resumo(self) -> Dict[str, Tuple[float, float, float, float]]:
+        """{camada: (mínimo, média, máximo, total na área)} das células do talhão.
+
+        O total (t ou kg) só existe para as camadas de dose; nas demais é NaN.
+        """
+        area_celula_ha = self.resolucao_m * self.resolucao_m / 10_000.0
+        saida = {}
+        for nome, valores in self.camadas.items():
+            dentro = [v for v in valores if v == v]
+            if not dentro:
+                continue
+            soma = math.fsum(dentro)
+            total = soma * area_celula_ha if nome in CAMADAS_DOSE else math.nan
+            saida[nome] = (min(dentro), soma / len(dentro), max(dentro), total)
+        return saida
+
+    def salvar_csv(self, caminho: str, camadas: Optional[Sequence[str]] = None) -> int:
+        """Uma linha por célula do talhão (lon, lat do centro e camadas)."""
+        nomes = list(camadas or self.camadas)
+        colunas = [self.camadas[nome] for nome in nomes]
+        linhas = 0
+        with open(caminho, 'w', newline='', encoding='utf-8') as arquivo:
+            escritor = csv.writer(arquivo)
+            escritor.writerow(['lon', 'lat', *nomes])
+            for linha in range(self.altura):
+                base = linha * self.largura
+                for coluna in range(self.largura):
+                    if colunas and colunas[0][base + coluna] != colunas[0][base + coluna]:
+                        continue
+                    lon, lat = self.centro_lonlat(linha, coluna)
+                    escritor.writerow([f"{lon:.7f}", f"{lat:.7f}", *(f"{c[base + coluna]:.3f}" for c in colunas)])
+                    linhas += 1
+        return linhas
+
+
+def _lonlat_para_xy(lat0: float, lon: float, lat: float) -> Tuple[float, float]:
+    return (math.radians(lon) * math.cos(math.radians(lat0)) * R_TERRA, math.radians(lat) * R_TERRA)
+
+
+def _xy_para_lonlat(lat0: float, x: float, y: float) -> Tuple[float, float]:
+    return (math.degrees(x / (math.cos(math.radians(lat0)) * R_TERRA)), math.degrees(y / R_TERRA))
+
+
+class IndicePontos:
+    """Árvore k-d em 2D (listas paralelas), com busca dos k vizinhos e por raio."""
+
+    def __init__(self, pontos: Sequence[Tuple[float, float]]) -> None:
+        self._x: List[float] = []
+        self._y: List[float] = []
+        self._origem: List[int] = []
+        self._esq: List[int] = []
+        self._dir: List[int] = []
+        self._raiz = self._montar(list(enumerate(pontos)), 0)
+
+    def __len__(self) -> int:
+        return len(self._x)
+
+    def _montar(self, itens, profundidade: int) -> int:
+        if not itens:
+            return -1
+        eixo = profundidade % 2
+        itens.sort(key=lambda item: item[1][eixo])
+        meio = len(itens) // 2
+        no = len(self._x)
+        origem, (x, y) = itens[meio]
+        self._x.append(x)
+        self._y.append(y)
+        self._origem.append(origem)
+        self._esq.append(-1)
+        self._dir.append(-1)
+        self._esq[no] = self._montar(itens[:meio], profundidade + 1)
+        self._dir[no] = self._montar(itens[meio + 1:], profundidade + 1)
+        return no
+
+    def distancia_k(self, x: float, y: float, k: int) -> float:
+        """Distância ao k-ésimo vizinho mais próximo de (x, y)."""
+        melhores: List[float] = []  # heap máximo via distância negativa
+        pilha = [(self._raiz, 0)]
+        while pilha:
+            no, profundidade = pilha.pop()
+            if no < 0:
+                continue
+            dx = x - self._x[no]
+            dy = y - self._y[no]
+            d2 = dx * dx + dy * dy
+            if len(melhores) < k:
+                heapq.heappush(melhores, -d2)
+            elif d2 < -melhores[0]:
+                heapq.heapreplace(melhores, -d2)
+            delta = dx if profundidade % 2 == 0 else dy
+            perto, longe = (self._esq[no], self._dir[no]) if delta < 0 else (self._dir[no], self._esq[no])
+            if len(melhores) < k or delta * delta < -melhores[0]:
+                pilha.append((longe, profundidade + 1))
+            pilha.append((perto, profundidade + 1))
+        return math.sqrt(-melhores[0]) if melhores else math.inf
+
+    def no_raio(self, x: float, y: float, raio: float) -> List[int]:
+        """Índices (na ordem de entrada) dos pontos a até `raio` de (x, y)."""
+        raio2 = raio * raio
+        saida = []
+        pilha = [(self._raiz, 0)]
+        while pilha:
+            no, profundidade = pilha.pop()
+            if no < 0:
+                continue
+            dx = x - self._x[no]
+            dy = y - self._y[no]
+            if dx * dx + dy * dy <= raio2:
+                saida.append(self._origem[no])
+            delta = dx if profundidade % 2 == 0 else dy
+            perto, longe = (self._esq[no], self._dir[no]) if delta < 0 else (self._dir[no], self._esq[no])
+            if delta * delta <= raio2:
+                pilha.append((longe, profundidade + 1))
+            pilha.append((perto, profundidade + 1))
+        return saida
+
+
+def _normalizar_coluna(nome: str) -> str:
+    texto = unicodedata.normalize('NFKD', nome or '').encode('ascii', 'ignore').decode().lower()
+    return re.sub(r'\(.*?\)', '', texto).replace('_', ' ').strip()
+
+
+def _numero(texto: object) -> Optional[float]:
+    bruto = str(texto or '').strip().replace(',', '.')
+    if not bruto:
+        return None
+    try:
+        return float(bruto)
+    except ValueError:
+        return None
+
+
+def ler_amostras(caminho: str) -> List[AmostraGrade]:
+    """Lê um CSV (``,`` ou ``;``) com lon/lat e os atributos da amostra."""
+    with open(caminho, newline='', encoding='utf-8-sig') as arquivo:
+        texto = arquivo.read()
+    delimitador = ';' if texto.split('\n', 1)[0].count(';') > 0 else ','
+    leitor = csv.DictReader(texto.splitlines(), delimiter=delimitador)
+    colunas = {coluna: _normalizar_coluna(coluna) for coluna in leitor.fieldnames or ()}
+    col_lon = next((c for c, n in colunas.items() if n in _COLUNAS_LON), None)
+    col_lat = next((c for c, n in colunas.items() if n in _COLUNAS_LAT), None)
+    if col_lon is None or col_lat is None:
+        raise ValueError("Arquivo de amostras sem colunas de longitude/latitude")
+    atributos = {c: _APELIDOS[n] for c, n in colunas.items() if n in _APELIDOS}
+    amostras = []
+    for registro in leitor:
+        lon = _numero(registro.get(col_lon))
+        lat = _numero(registro.get(col_lat))
+        if lon is None or lat is None:
+            continue
+        valores = {}
+        for coluna, atributo in atributos.items():
+            valor = _numero(registro.get(coluna))
+            if valor is not None:
+                valores[atributo] = valor
+        amostras.append(AmostraGrade(lon, lat, MappingProxyType(valores)))
+    return amostras
+
+
+def carregar_contorno(caminho: str) -> List[Poligono]:
+    """Polígonos do talhão (KML/KMZ, GeoJSON ou Shapefile), lidos como na aba do mapa."""
+    _, poligonos = ler_contorno(caminho)
+    if not poligonos:
+        raise ValueError("Contorno sem polígonos")
+    return poligonos
+
+
+def _interpolar(
+    pontos: Sequence[Tuple[float, float]],
+    valores: Mapping[str, Sequence[float]],
+    mascara: bytearray,
+    x_min: float,
+    y_max: float,
+    resolucao: float,
+    largura: int,
+    altura: int,
+    vizinhos: int,
+    potencia: float,
+) -> Dict[str, array]:
+    """IDW dos `valores` nas células da máscara.
+
+    A árvore é consultada uma vez por bloco de células: com ``d`` a distância
+    ao k-ésimo vizinho do centro do bloco e ``r`` a meia-diagonal do bloco,
+    os k vizinhos de qualquer célula do bloco estão a até ``d + 2r`` do
+    centro; cada célula escolhe os seus entre esses candidatos.
+    """
+    nan = math.nan
+    saida = {nome: array('d', [nan]) * (largura * altura) for nome in valores}
+    if not pontos:
+        return saida
+    k = min(vizinhos, len(pontos))
+    indice = IndicePontos(pontos)
+    xs = [p[0] for p in pontos]
+    ys = [p[1] for p in pontos]
+    nomes = list(valores)
+    colunas = [valores[nome] for nome in nomes]
+    destinos = [saida[nome] for nome in nomes]
+    meia_potencia = potencia / 2.0
+    meia_diagonal = BLOCO_CELULAS * resolucao * math.sqrt(0.5)
+
+    for linha0 in range(0, altura, BLOCO_CELULAS):
+        linha1 = min(altura, linha0 + BLOCO_CELULAS)
+        for coluna0 in range(0, largura, BLOCO_CELULAS):
+            coluna1 = min(largura, coluna0 + BLOCO_CELULAS)
+            if not any(any(mascara[l * largura + coluna0:l * largura + coluna1]) for l in range(linha0, linha1)):
+                continue
+            cx = x_min + (coluna0 + coluna1) * 0.5 * resolucao
+            cy = y_max - (linha0 + linha1) * 0.5 * resolucao
+            raio = indice.distancia_k(cx, cy, k) + 2.0 * meia_diagonal
+            candidatos = indice.no_raio(cx, cy, raio)
+            cand_x = [xs[i] for i in candidatos]
+            cand_y = [ys[i] for i in candidatos]
+            cand_v = [[coluna[i] for i in candidatos] for coluna in colunas]
+            for linha in range(linha0, linha1):
+                y = y_max - (linha + 0.5) * resolucao
+                base = linha * largura
+                for coluna in range(coluna0, coluna1):
+                    pos = base + coluna
+                    if not mascara[pos]:
+                        continue
+                    x = x_min + (coluna + 0.5) * resolucao
+                    d2 = [(x - px) * (x - px) + (y - py) * (y - py) for px, py in zip(cand_x, cand_y)]
+                    proximos = heapq.nsmallest(k, range(len(d2)), key=d2.__getitem__)
+                    if d2[proximos[0]] == 0.0:
+                        for destino, vals in zip(destinos, cand_v):
+                            destino[pos] = vals[proximos[0]]
+                        continue
+                    pesos = [d2[j] ** -meia_potencia for j in proximos]
+                    soma = math.fsum(pesos)
+                    for destino, vals in zip(destinos, cand_v):
+                        destino[pos] = sum(p * vals[j] for p, j in zip(pesos, proximos)) / soma
+    return saida
+
+
+def gerar_prescricao(
+    amostras: Sequence[AmostraGrade],
+    poligonos: Sequence[Poligono],
+    produtividade: float,
+    cultivo: int = 1,
+    resolucao_m: float = RESOLUCAO_PADRAO_M,
+    vizinhos: int = VIZINHOS_PADRAO,
+    potencia: float = POTENCIA_PADRAO,
+    desired_pH: float = 6.0,
+    prnt_percent: float = 100.0,
+    constantes: Optional[Mapping[str, float]] = None,
+    tabelas: Optional[TabelasManual] = None,
+) -> RasterPrescricao:
+    """Interpola as amostras no talhão e calcula as doses de cada célula.
+
+    `constantes` completa os atributos que não vieram nas amostras (por
+    exemplo a CTC média do laudo do talhão). A calagem usa o índice SMP e,
+    sem ele, o método da saturação por bases (V% e CTC).
+    """
+    if resolucao_m <= 0:
+        raise ValueError("Resolução deve ser positiva")
+    tabelas = tabelas_ou_padrao(tabelas)
+    constantes = dict(constantes or {})
+
+    aneis = [anel for poligono in poligonos for anel in poligono.get('outer', ())]
+    if not aneis:
+        raise ValueError("Contorno sem anel externo")
+    lats = [lat for anel in aneis for _, lat in anel]
+    lat0 = (min(lats) + max(lats)) / 2.0
+    poligonos_xy = [transformar(poligono, lambda lon, lat: _lonlat_para_xy(lat0, lon, lat)) for poligono in poligonos]
+    xy_aneis = [_lonlat_para_xy(lat0, lon, lat) for anel in aneis for lon, lat in anel]
+    x_min = min(x for x, _ in xy_aneis)
+    x_max = max(x for x, _ in xy_aneis)
+    y_min = min(y for _, y in xy_aneis)
+    y_max = max(y for _, y in xy_aneis)
+    largura = max(1, math.ceil((x_max - x_min) / resolucao_m))
+    altura = max(1, math.ceil((y_max - y_min) / resolucao_m))
+    mascara = rasterizar(poligonos_xy, x_min, y_max, resolucao_m, largura, altura)
+
+    # Atributos com o mesmo conjunto de amostras compartilham a busca de vizinhos.
+    grupos: Dict[Tuple[int, ...], List[str]] = {}
+    for atributo in ATRIBUTOS:
+        com_valor = tuple(i for i, amostra in enumerate(amostras) if atributo in amostra.valores)
+        if com_valor:
+            grupos.setdefault(com_valor, []).append(atributo)
+    camadas: Dict[str, array] = {}
+    for indices, atributos in grupos.items():
+        pontos = [_lonlat_para_xy(lat0, amostras[i].lon, amostras[i].lat) for i in indices]
+        valores = {a: [amostras[i].valores[a] for i in indices] for a in atributos}
+        camadas.update(
+            _interpolar(pontos, valores, mascara, x_min, y_max, resolucao_m, largura, altura, vizinhos, potencia)
+        )
+
+    camadas.update(_doses(camadas, mascara, constantes, produtividade, cultivo, desired_pH, prnt_percent, tabelas))
+    return RasterPrescricao(
+        resolucao_m=resolucao_m,
+        largura=largura,
+        altura=altura,
+        x_min=x_min,
+        y_max=y_max,
+        lat0=lat0,
+        celulas=sum(mascara),
+        camadas=MappingProxyType(camadas),
+    )
+
+
+def _doses(
+    camadas: Mapping[str, array],
+    mascara: bytearray,
+    constantes: Mapping[str, float],
+    produtividade: float,
+    cultivo: int,
+    desired_pH: float,
+    prnt_percent: float,
+    tabelas: TabelasManual,
+) -> Dict[str, array]:
+    """Doses por célula; a adubação roda uma vez por combinação de classes."""
+    n = len(mascara)
+    nan = math.nan
+    saida = {nome: array('d', [nan]) * n for nome in CAMADAS_DOSE}
+    fator_prnt = 100.0 / prnt_percent if prnt_percent > 0 else nan
+    v_alvo = tabelas.v_alvo.get(desired_pH)
+
+    def coluna(nome):
+        if nome in camadas:
+            return camadas[nome]
+        valor = constantes.get(nome)
+        return None if valor is None else array('d', [valor]) * n
+
+    smp, v, ctc = coluna('SMP'), coluna('V'), coluna('CTC')
+    p, k, argila = coluna('P'), coluna('K'), coluna('argila')
+    calcario = saida['calcario_t_ha']
+    dose_p, dose_k = saida['P2O5_kg_ha'], saida['K2O_kg_ha']
+    resultados: Dict[Tuple[str, str, bool, bool], ResultadoAdubacao] = {}
+
+    for pos in range(n):
+        if not mascara[pos]:
+            continue
+        nc = None
+        if smp is not None:
+            nc = tabelas.nc_smp_interpolado(smp[pos], desired_pH)
+        elif v is not None and ctc is not None and v_alvo is not None:
+            nc = max(0.0, (v_alvo - v[pos]) / 100.0 * ctc[pos])
+        if nc is not None:
+            calcario[pos] = nc * fator_prnt
+
+        if p is None or k is None or argila is None or ctc is None:
+            continue
+        arg, cap = argila[pos], ctc[pos]
+        classe_p = classificar_p(p[pos], arg, tabelas)[0]
+        classe_k = classificar_k(k[pos], cap, tabelas)[0]
+        chave = (classe_p, classe_k, arg < 20.0, cap < 7.5)
+        resultado = resultados.get(chave)
+        if resultado is None:
+            entrada = EntradaSoja(
+                p_class=classe_p,
+                k_class=classe_k,
+                produtividade=produtividade,
+                cultivo=cultivo,
+                argila_pct=arg,
+                ctc=cap,
+                teor_s_mg_dm3=constantes.get('S'),
+                ph_agua=constantes.get('pH'),
+            )
+            resultado = resultados[chave] = recomendar_adubacao_soja(entrada, tabelas)
+        dose_p[pos] = resultado.totais.P2O5_total
+        dose_k[pos] = resultado.totais.K2O_total
+
+    if p is None or k is None or argila is None or ctc is None:
+        del saida['P2O5_kg_ha'], saida['K2O_kg_ha']
+    if smp is None and (v is None or ctc is None or v_alvo is None):
+        del saida['calcario_t_ha']
+    return saida
+
+
+def main(argv: Sequence[str]) -> int:
+    if len(argv) < 3:
+        print(__doc__.strip().splitlines()[-1], file=sys.stderr)
+        return 2
+    contorno, arquivo_amostras, destino = argv[:3]
+    resolucao = float(argv[3]) if len(argv) > 3 else RESOLUCAO_PADRAO_M
+    produtividade = float(argv[4]) if len(argv) > 4 else 3.0
+    raster = gerar_prescricao(
+        ler_amostras(arquivo_amostras), carregar_contorno(contorno), produtividade=produtividade, resolucao_m=resolucao
+    )
+    if destino.lower().endswith('.csv'):
+        linhas = raster.salvar_csv(destino)
+    else:
+        from .exportacao_prescricao import exportar
+        linhas = exportar(raster, destino)
+    print(f"{linhas} células ({raster.area_ha:.2f} ha) gravadas em {destino}")
+    for nome, (minimo, media, maximo, total) in raster.resumo().items():
+        print(f"{nome:>14}: min {minimo:.2f}  média {media:.2f}  max {maximo:.2f}  total {total:.1f}")
+    return 0
+
+
+__all__ = [
+    'AmostraGrade',
+    'IndicePontos',
+    'RasterPrescricao',
+    'carregar_contorno',
+    'gerar_prescricao',
+    'ler_amostras',
+]
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
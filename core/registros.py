@@ -0,0 +1,61 @@
+"""Registros compactos (sem ``__dict__``) para resultados dos cálculos."""
+from __future__ import annotations
+
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Tuple
+
+# ``@dataclass(**DATACLASS_SLOTS)``: slots quando o Python oferece (3.10+).
+DATACLASS_SLOTS: Dict[str, bool] = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+class RegistroCompacto(Mapping):
+    """Mapeamento imutável de campos fixos guardados em ``__slots__``.
+
+    As subclasses declaram ``__slots__`` com os nomes dos campos; a leitura
+    por chave (``registro['P2O5']``, ``.get``, ``.items``) continua valendo
+    para o código que esperava um ``dict``. ``as_dict()`` cria o ``dict``
+    apenas quando alguém pede.
+    """
+
+    __slots__: Tuple[str, ...] = ()
+
+    def __init__(self, *valores: Any, **nomeados: Any) -> None:
+        campos = self.__slots__
+        if len(valores) > len(campos):
+            raise TypeError(f"{type(self).__name__} recebe no máximo {len(campos)} valores")
+        for campo, valor in zip(campos, valores):
+            object.__setattr__(self, campo, valor)
+        for campo in campos[len(valores):]:
+            if campo not in nomeados:
+                raise TypeError(f"{type(self).__name__}: campo '{campo}' ausente")
+            object.__setattr__(self, campo, nomeados.pop(campo))
+        if nomeados:
+            raise TypeError(f"{type(self).__name__}: campos desconhecidos {sorted(nomeados)}")
+
+    def __setattr__(self, nome: str, valor: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} é imutável")
+
+    def __getitem__(self, chave: str) -> Any:
+        if chave in self.__slots__:
+            return getattr(self, chave)
+        raise KeyError(chave)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__slots__)
+
+    def __len__(self) -> int:
+        return len(self.__slots__)
+
+    def __repr__(self) -> str:
+        campos = ', '.join(f"{campo}={getattr(self, campo)!r}" for campo in self.__slots__)
+        return f"{type(self).__name__}({campos})"
+
+    def __reduce__(self):
+        return (type(self), tuple(getattr(self, campo) for campo in self.__slots__))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {campo: getattr(self, campo) for campo in self.__slots__}
+
+
+__all__ = ['DATACLASS_SLOTS', 'RegistroCompacto']
@@ -0,0 +1,110 @@
+"""Tabela única de regras para classificar o laudo de solo (soja, Mehlich-1).
+
+`core.calculo` e `core.diagnostico` leem as mesmas faixas daqui. Quem altera
+um limite deve alterar também `VERSAO_REGRAS`: a versão faz parte da chave do
+diagnóstico guardado no contexto e aparece no benchmark.
+"""
+from __future__ import annotations
+
+import operator
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Callable, Hashable, Mapping, Optional, Tuple
+
+from .registros import DATACLASS_SLOTS
+
+VERSAO_REGRAS = "2024.1-grupo2"
+
+CLASSES_P_K: Tuple[str, ...] = ("Muito baixo", "Baixo", "Medio", "Alto", "Muito alto")
+
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
+class RegraFaixas:
+    """Faixas ordenadas: o valor cai na primeira faixa cujo limite ele respeita.
+
+    `cortes` traz ``(limite, inclusivo)`` para cada faixa menos a última;
+    ``inclusivo`` indica ``valor <= limite`` (senão ``valor < limite``).
+    """
+
+    rotulos: Tuple[Hashable, ...]
+    cortes: Tuple[Tuple[float, bool], ...]
+    _testes: Tuple[Tuple[Callable[[float, float], bool], float], ...] = field(default=(), repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        if len(self.cortes) != len(self.rotulos) - 1:
+            raise ValueError("RegraFaixas precisa de um corte a menos que o número de rótulos")
+        testes = tuple((operator.le if inclusivo else operator.lt, float(limite)) for limite, inclusivo in self.cortes)
+        object.__setattr__(self, '_testes', testes)
+
+    def indice(self, valor: float) -> int:
+        for idx, (compara, limite) in enumerate(self._testes):
+            if compara(valor, limite):
+                return idx
+        return len(self._testes)
+
+    def classificar(self, valor: Optional[float]) -> Hashable:
+        if valor is None:
+            return ""
+        return self.rotulos[self.indice(valor)]
+
+
+def _ate(rotulos: Tuple[Hashable, ...], *limites: float) -> RegraFaixas:
+    """Faixas fechadas à direita: ``valor <= limite``."""
+    return RegraFaixas(rotulos, tuple((limite, True) for limite in limites))
+
+
+def _tres_faixas(lim_baixo: float, lim_medio: float) -> RegraFaixas:
+    """Baixo abaixo de `lim_baixo`; Medio até `lim_medio` inclusive; Alto acima."""
+    return RegraFaixas(("Baixo", "Medio", "Alto"), ((lim_baixo, False), (lim_medio, True)))
+
+
+# Classe textural 1 (mais argilosa) a 4 (arenosa).
+REGRA_ARGILA = RegraFaixas((4, 3, 2, 1), ((21.0, False), (41.0, False), (60.0, True)))
+
+REGRA_CTC = _ate(("Baixa", "Media", "Alta", "Muito alta"), 7.5, 15.0, 30.0)
+
+# Teor de P por classe de argila.
+REGRAS_P: Mapping[int, RegraFaixas] = MappingProxyType({
+    1: _ate(CLASSES_P_K, 3.0, 6.0, 9.0, 18.0),
+    2: _ate(CLASSES_P_K, 4.0, 8.0, 12.0, 24.0),
+    3: _ate(CLASSES_P_K, 6.0, 12.0, 18.0, 36.0),
+    4: _ate(CLASSES_P_K, 10.0, 20.0, 30.0, 60.0),
+})
+
+# Teor de K por classe de CTC a pH 7.
+REGRAS_K: Mapping[str, RegraFaixas] = MappingProxyType({
+    "Baixa": _ate(CLASSES_P_K, 20.0, 40.0, 60.0, 120.0),
+    "Media": _ate(CLASSES_P_K, 30.0, 60.0, 90.0, 180.0),
+    "Alta": _ate(CLASSES_P_K, 40.0, 80.0, 120.0, 240.0),
+    "Muito alta": _ate(CLASSES_P_K, 45.0, 90.0, 135.0, 270.0),
+})
+
+REGRAS: Mapping[str, RegraFaixas] = MappingProxyType({
+    'argila': REGRA_ARGILA,
+    'ctc': REGRA_CTC,
+    'mo': _ate(("Baixo", "Medio", "Alto"), 2.5, 5.0),
+    'ca': _tres_faixas(2.0, 4.0),
+    'mg': _tres_faixas(0.5, 1.0),
+    's': _tres_faixas(2.0, 5.0),
+    'cu': _tres_faixas(0.2, 0.4),
+    'zn': _tres_faixas(0.5, 1.0),
+    'b': _ate(("Baixo", "Medio", "Alto"), 0.2, 0.5),
+    'mn': _tres_faixas(2.5, 5.0),
+})
+
+
+def regra(nome: str) -> RegraFaixas:
+    return REGRAS[nome]
+
+
+__all__ = [
+    'CLASSES_P_K',
+    'REGRA_ARGILA',
+    'REGRA_CTC',
+    'REGRAS',
+    'REGRAS_K',
+    'REGRAS_P',
+    'RegraFaixas',
+    'VERSAO_REGRAS',
+    'regra',
+]
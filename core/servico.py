@@ -0,0 +1,540 @@
+"""Serviço HTTP local (JSON) com os motores de recomendação, para o LIMS.
+
+Só biblioteca padrão: servidor ``asyncio`` com HTTP/1.1 mínimo (keep-alive,
+corpo por Content-Length) ouvindo em ``127.0.0.1`` por padrão. Rotas:
+
+* ``POST /v1/diagnostico``  -> `diagnosticar_soja` (chaves do laudo, ex. ``P_mg_dm3``);
+* ``POST /v1/adubacao``     -> `recomendar_adubacao_soja` (campos de `EntradaSoja`;
+  sem ``p_class``/``k_class``, as classes saem do ``laudo`` informado);
+* ``POST /v1/calagem``      -> NC por SMP, V% ou polinômio, ajustada ao PRNT;
+* ``POST /v1/fertilizacao`` -> `fertilizacao.resolver` (modo, demanda, grade...);
+* ``GET /v1/metricas``      -> contagem e latência p50/p99 por rota;
+* ``GET /v1/saude``;
+* ``/v1/tarefas``            -> tarefas em massa (NDJSON/CSV), ver `core.servico_tarefas`.
+
+Um corpo JSON em lista é tratado como lote e devolve a lista de respostas.
+Os cálculos rodam num pool de processos; pedidos que chegam juntos são
+agrupados enquanto os processos estão ocupados (até `LOTE_MAXIMO` itens) e
+vão ao pool numa única tarefa, para que o custo de IPC não domine cálculos
+de microssegundos.
+Edição do manual opcional por pedido em ``"edicao"``.
+
+Uso: python -m core.servico [--porta 8765] [--host 127.0.0.1] [--processos N]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import fields
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs
+
+from .adubacao_dados import EntradaSoja, recomendar_adubacao_soja
+from .calagem_dados import adjust_for_prnt, cap_surface_application
+from .diagnostico import diagnosticar_soja, diagnosticar_soja_registro
+from .servico_tarefas import GerenciadorTarefas, linhas_do_corpo, tamanho_do_corpo
+from .tabelas_manual import carregar_edicao, tabelas_ou_padrao
+
+HOST_PADRAO = "127.0.0.1"
+PORTA_PADRAO = 8765
+LOTE_MAXIMO = 64
+CORPO_MAXIMO = 1 << 20
+AMOSTRAS_LATENCIA = 4096
+
+_CAMPOS_ENTRADA = {campo.name for campo in fields(EntradaSoja)}
+# Parâmetros públicos de `fertilizacao.resolver` (``cache`` é interno).
+PARAMETROS_FERTILIZACAO = (
+    "modo", "demanda", "grade", "nome_formulado", "sacos_50kg",
+    "submodo", "fosfatado_codigo", "potassico_codigo", "precos",
+)
+
+
+class ErroPedido(ValueError):
+    """Entrada inválida; vira resposta 400 com a mensagem."""
+
+
+def _tabelas(corpo: Dict[str, Any]):
+    edicao = corpo.get("edicao")
+    if edicao is None:
+        return None
+    try:
+        return carregar_edicao(edicao)
+    except KeyError as exc:
+        raise ErroPedido(str(exc.args[0])) from None
+
+
+def _objeto(corpo: Dict[str, Any], campo: str, opcional: bool = False) -> Optional[Dict[str, Any]]:
+    valor = corpo.get(campo)
+    if valor is None and opcional:
+        return None
+    if not isinstance(valor, dict):
+        raise ErroPedido(f"'{campo}' deve ser um objeto JSON")
+    return valor
+
+
+def _diagnostico(corpo: Dict[str, Any]) -> Dict[str, Any]:
+    laudo = _objeto(corpo, "laudo") if "laudo" in corpo else corpo
+    return diagnosticar_soja({k: v for k, v in laudo.items() if k != "edicao"}, _tabelas(corpo))
+
+
+def _adubacao(corpo: Dict[str, Any]) -> Dict[str, Any]:
+    tabelas = _tabelas(corpo)
+    dados = {k: v for k, v in corpo.items() if k in _CAMPOS_ENTRADA}
+    desconhecidos = set(corpo) - _CAMPOS_ENTRADA - {"laudo", "edicao"}
+    if desconhecidos:
+        raise ErroPedido(f"Campos desconhecidos: {', '.join(sorted(desconhecidos))}")
+    laudo = _objeto(corpo, "laudo", opcional=True)
+    if laudo is not None and not ("p_class" in dados and "k_class" in dados):
+        diag = diagnosticar_soja_registro(laudo, tabelas)
+        dados.setdefault("p_class", diag.classe_p)
+        dados.setdefault("k_class", diag.classe_k)
+        dados.setdefault("argila_pct", laudo.get("argila_percent"))
+        dados.setdefault("ctc", laudo.get("CTC_pH7"))
+        dados.setdefault("teor_s_mg_dm3", laudo.get("S_mg_dm3"))
+        dados.setdefault("ph_agua", laudo.get("pH_H2O"))
+    for obrigatorio in ("p_class", "k_class", "produtividade"):
+        if not dados.get(obrigatorio):
+            raise ErroPedido(f"Campo obrigatório ausente: {obrigatorio}")
+    return recomendar_adubacao_soja(EntradaSoja(**dados), tabelas).as_dict()
+
+
+def _calagem(corpo: Dict[str, Any]) -> Dict[str, Any]:
+    """Saída no formato de `OUTPUTS_SCHEMA` de `core.calagem_dados`."""
+    tabelas = tabelas_ou_padrao(_tabelas(corpo))
+    desired_pH = float(corpo.get("desired_pH", 6.0))
+    metodo = corpo.get("method")
+    if metodo is None:
+        if corpo.get("SMP_index") is not None:
+            metodo = "SMP"
+        elif corpo.get("V_percent") is not None and corpo.get("CTC_pH7") is not None:
+            metodo = "V_percent"
+        elif corpo.get("MO_percent") is not None and corpo.get("Al_cmolc_dm3") is not None:
+            metodo = "Polynomial"
+        else:
+            raise ErroPedido("Informe SMP_index, V_percent + CTC_pH7 ou MO_percent + Al_cmolc_dm3")
+    notas = []
+    if metodo == "SMP":
+        nc = tabelas.nc_smp_interpolado(float(corpo["SMP_index"]), desired_pH)
+    elif metodo == "V_percent":
+        v_alvo = tabelas.v_alvo.get(desired_pH)
+        nc = None if v_alvo is None else max(0.0, (v_alvo - float(corpo["V_percent"])) / 100.0 * float(corpo["CTC_pH7"]))
+    elif metodo == "Polynomial":
+        coef = tabelas.coef_polinomio.get(desired_pH)
+        nc = None if coef is None else max(0.0, coef[0] + coef[1] * float(corpo["MO_percent"]) + coef[2] * float(corpo["Al_cmolc_dm3"]))
+    else:
+        raise ErroPedido(f"Método de calagem desconhecido: {metodo}")
+    if nc is None:
+        raise ErroPedido(f"Sem tabela para desired_pH={desired_pH}")
+    modo = corpo.get("application_mode", "Incorporated")
+    ajustada = adjust_for_prnt(nc, float(corpo.get("PRNT_percent", 100.0)))
+    limitada = cap_surface_application(ajustada) if modo == "Superficial" else ajustada
+    if limitada < ajustada:
+        notas.append("Dose superficial limitada a 5 t/ha")
+    return {
+        "method": metodo,
+        "desired_pH": desired_pH,
+        "NC_PRNT100_t_ha": nc,
+        "application_mode": modo,
+        "NC_adjusted_for_PRNT_t_ha": ajustada,
+        "NC_surface_capped_t_ha": limitada,
+        "notes": "; ".join(notas),
+    }
+
+
+def _fertilizacao(corpo: Dict[str, Any]) -> Dict[str, Any]:
+    import fertilizacao
+
+    desconhecidos = set(corpo) - set(PARAMETROS_FERTILIZACAO)
+    if desconhecidos:
+        raise ErroPedido(f"Campos desconhecidos: {', '.join(sorted(desconhecidos))}")
+    if "modo" not in corpo:
+        raise ErroPedido("Campo obrigatório ausente: modo")
+    modo, submodo = corpo["modo"], corpo.get("submodo", "")
+    if not (isinstance(modo, str) and isinstance(submodo, str) and fertilizacao.modo_conhecido(modo, submodo)):
+        raise ErroPedido(
+            f"modo/submodo desconhecido: {modo!r}/{submodo!r} "
+            f"(modos: {', '.join(fertilizacao.MODOS)}; submodos: {', '.join(fertilizacao.SUBMODOS)})"
+        )
+    _objeto(corpo, "demanda")
+    _objeto(corpo, "grade", opcional=True)
+    _objeto(corpo, "precos", opcional=True)
+    try:
+        resultado = fertilizacao.resolver(**corpo)
+    except TypeError as exc:
+        raise ErroPedido(str(exc)) from None
+    return {
+        "produtos": [list(item) for item in resultado.produtos],
+        "alertas": list(resultado.alertas),
+        "faltantes": dict(resultado.faltantes),
+        "custo": resultado.custo,
+    }
+
+
+ROTAS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    "/v1/diagnostico": _diagnostico,
+    "/v1/adubacao": _adubacao,
+    "/v1/calagem": _calagem,
+    "/v1/fertilizacao": _fertilizacao,
+}
+
+
+def executar_lote(itens: List[Tuple[str, Any]]) -> List[Tuple[int, Any]]:
+    """Roda ``[(rota, corpo), ...]`` e devolve ``[(status, resposta), ...]``.
+
+    Cada item falha sozinho: erros de entrada viram 400 e os demais 500.
+    """
+    saida = []
+    for rota, corpo in itens:
+        try:
+            if not isinstance(corpo, dict):
+                raise ErroPedido("O corpo deve ser um objeto JSON")
+            saida.append((200, ROTAS[rota](corpo)))
+        except (ErroPedido, KeyError, TypeError, ValueError) as exc:
+            saida.append((400, {"erro": str(exc) or type(exc).__name__}))
+        except Exception as exc:  # pragma: no cover - falha inesperada do motor
+            saida.append((500, {"erro": f"{type(exc).__name__}: {exc}"}))
+    return saida
+
+
+class Latencias:
+    """Últimas `AMOSTRAS_LATENCIA` latências por rota, com p50/p99 sob demanda."""
+
+    def __init__(self, tamanho: int = AMOSTRAS_LATENCIA) -> None:
+        self.tamanho = tamanho
+        self._amostras: Dict[str, Deque[float]] = {}
+        self._contagem: Dict[str, int] = {}
+
+    def registrar(self, rota: str, segundos: float) -> None:
+        fila = self._amostras.get(rota)
+        if fila is None:
+            fila = self._amostras[rota] = deque(maxlen=self.tamanho)
+        fila.append(segundos)
+        self._contagem[rota] = self._contagem.get(rota, 0) + 1
+
+    @staticmethod
+    def _percentil(ordenadas: List[float], p: float) -> float:
+        return ordenadas[min(len(ordenadas) - 1, max(0, math.ceil(p / 100.0 * len(ordenadas)) - 1))]
+
+    def resumo(self) -> Dict[str, Dict[str, float]]:
+        saida = {}
+        for rota, fila in self._amostras.items():
+            ordenadas = sorted(fila)
+            saida[rota] = {
+                "pedidos": self._contagem[rota],
+                "p50_ms": self._percentil(ordenadas, 50) * 1e3,
+                "p99_ms": self._percentil(ordenadas, 99) * 1e3,
+                "max_ms": ordenadas[-1] * 1e3,
+            }
+        return saida
+
+
+class Agrupador:
+    """Junta os pedidos pendentes em lotes para o executor.
+
+    Com vaga no executor, o lote sai na próxima volta do laço (leva o que
+    chegou junto); com todos ocupados, os pedidos esperam o fim de um lote
+    em andamento e seguem juntos, até `maximo` por lote.
+    """
+
+    def __init__(self, executor: Optional[Executor], vagas: int = 1, maximo: int = LOTE_MAXIMO) -> None:
+        self.executor = executor
+        self.vagas = max(1, vagas)
+        self.maximo = maximo
+        self._fila: List[Tuple[str, Any, asyncio.Future]] = []
+        self._agendado = False
+        self._em_andamento = 0
+        self.lotes = 0
+
+    def enviar(self, itens: List[Tuple[str, Any]]) -> "asyncio.Future":
+        loop = asyncio.get_running_loop()
+        futuros = []
+        for rota, corpo in itens:
+            futuro = loop.create_future()
+            self._fila.append((rota, corpo, futuro))
+            futuros.append(futuro)
+        if not self._agendado and self._em_andamento < self.vagas:
+            self._agendado = True
+            loop.call_soon(self._despachar)
+        return asyncio.gather(*futuros)
+
+    def _despachar(self) -> None:
+        self._agendado = False
+        while self._fila and self._em_andamento < self.vagas:
+            lote, self._fila = self._fila[:self.maximo], self._fila[self.maximo:]
+            self._em_andamento += 1
+            asyncio.ensure_future(self._rodar(lote))
+
+    async def _rodar(self, lote: List[Tuple[str, Any, asyncio.Future]]) -> None:
+        self.lotes += 1
+        itens = [(rota, corpo) for rota, corpo, _ in lote]
+        try:
+            if self.executor is None:
+                resultados = executar_lote(itens)
+            else:
+                resultados = await asyncio.get_running_loop().run_in_executor(self.executor, executar_lote, itens)
+        except Exception as exc:
+            resultados = [(500, {"erro": f"{type(exc).__name__}: {exc}"})] * len(lote)
+        finally:
+            self._em_andamento -= 1
+        for (_, _, futuro), resultado in zip(lote, resultados):
+            if not futuro.done():
+                futuro.set_result(resultado)
+        self._despachar()
+
+
+_MOTIVOS = {
+    200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error",
+}
+PREFIXO_TAREFAS = "/v1/tarefas"
+# Nas tarefas em CSV da adubação, as colunas fora de `EntradaSoja` formam o ``laudo``.
+CAMPOS_CSV = {"/v1/adubacao": frozenset(_CAMPOS_ENTRADA | {"edicao"})}
+
+
+def _carregar_catalogo() -> int:
+    """Acrescenta os produtos de ``FERTISOJA_CATALOGO``; também inicializa cada processo do pool."""
+    import fertilizacao
+
+    return fertilizacao.carregar_catalogo()
+
+
+class ServicoRecomendacao:
+    """Servidor HTTP; `iniciar` abre a porta e `encerrar` fecha porta e pool."""
+
+    def __init__(self, host: str = HOST_PADRAO, porta: int = PORTA_PADRAO, processos: Optional[int] = None) -> None:
+        self.host = host
+        self.porta = porta
+        if processos is None:
+            processos = max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.processos = processos
+        self.aviso_catalogo = ""
+        try:
+            _carregar_catalogo()
+            iniciar: Optional[Callable[[], int]] = _carregar_catalogo
+        except (OSError, ValueError) as exc:
+            self.aviso_catalogo = f"Catálogo de fertilizantes não carregado: {exc}"
+            iniciar = None
+        # "spawn": processos criados por fork herdariam os sockets já aceitos,
+        # e o cliente não veria o fechamento da conexão.
+        self.executor = (
+            ProcessPoolExecutor(
+                max_workers=processos, mp_context=multiprocessing.get_context("spawn"), initializer=iniciar
+            )
+            if processos > 0 else None
+        )
+        self.agrupador = Agrupador(self.executor, vagas=processos)
+        self.latencias = Latencias()
+        self.tarefas = GerenciadorTarefas(self.executor, executar_lote, ROTAS, CAMPOS_CSV)
+        self._servidor: Optional[asyncio.AbstractServer] = None
+        self._conexoes: Set[asyncio.StreamWriter] = set()
+
+    async def iniciar(self) -> None:
+        self._servidor = await asyncio.start_server(self._conexao, self.host, self.porta)
+        self.porta = self._servidor.sockets[0].getsockname()[1]
+
+    async def encerrar(self) -> None:
+        if self._servidor is not None:
+            self._servidor.close()
+            for escritor in list(self._conexoes):
+                escritor.close()
+            await self._servidor.wait_closed()
+            await asyncio.sleep(0)
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        self.tarefas.descartar_todas()
+
+    async def _conexao(self, leitor: asyncio.StreamReader, escritor: asyncio.StreamWriter) -> None:
+        self._conexoes.add(escritor)
+        try:
+            while True:
+                try:
+                    cabecalho = await leitor.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                linhas = cabecalho.decode("latin-1").split("\r\n")
+                partes = linhas[0].split(" ")
+                if len(partes) != 3:
+                    return
+                metodo, alvo, versao = partes
+                campos = {}
+                for linha in linhas[1:]:
+                    nome, sep, valor = linha.partition(":")
+                    if sep:
+                        campos[nome.strip().lower()] = valor.strip()
+                try:
+                    tamanho = tamanho_do_corpo(campos)
+                except ValueError as exc:
+                    # Sem saber onde o corpo termina, a conexão não pode ser reaproveitada.
+                    await self._responder(escritor, 400, {"erro": str(exc)}, False)
+                    return
+                manter = campos.get("connection", "").lower() != "close" and versao == "HTTP/1.1"
+                if alvo.startswith(PREFIXO_TAREFAS):
+                    # O corpo das tarefas é lido aos poucos pelo próprio tratador.
+                    try:
+                        if not await self._tarefas(metodo, alvo, campos, tamanho, leitor, escritor, manter):
+                            return
+                    except (asyncio.IncompleteReadError, ConnectionError):
+                        return
+                    continue
+                if tamanho > CORPO_MAXIMO:
+                    await self._responder(escritor, 413, {"erro": "Corpo maior que 1 MiB"}, False)
+                    return
+                corpo = await leitor.readexactly(tamanho) if tamanho else b""
+                status, resposta = await self._tratar(metodo, alvo.split("?", 1)[0], corpo)
+                await self._responder(escritor, status, resposta, manter)
+                if not manter:
+                    return
+        finally:
+            self._conexoes.discard(escritor)
+            escritor.close()
+
+    async def _tratar(self, metodo: str, rota: str, corpo: bytes) -> Tuple[int, Any]:
+        if rota == "/v1/saude":
+            return 200, {"status": "ok", "processos": self.processos}
+        if rota == "/v1/metricas":
+            return 200, {"rotas": self.latencias.resumo(), "lotes": self.agrupador.lotes}
+        if rota not in ROTAS:
+            return 404, {"erro": f"Rota desconhecida: {rota}", "rotas": sorted(ROTAS)}
+        if metodo != "POST":
+            return 405, {"erro": "Use POST"}
+        inicio = time.perf_counter()
+        try:
+            dados = json.loads(corpo or b"{}")
+        except ValueError as exc:
+            return 400, {"erro": f"JSON inválido: {exc}"}
+        lote = isinstance(dados, list)
+        itens = [(rota, item) for item in dados] if lote else [(rota, dados)]
+        resultados = await self.agrupador.enviar(itens) if itens else []
+        self.latencias.registrar(rota, time.perf_counter() - inicio)
+        if lote:
+            return 200, [{"status": status, "resultado": resposta} for status, resposta in resultados]
+        return resultados[0]
+
+    async def _tarefas(
+        self,
+        metodo: str,
+        alvo: str,
+        campos: Dict[str, str],
+        tamanho: int,
+        leitor: asyncio.StreamReader,
+        escritor: asyncio.StreamWriter,
+        manter: bool,
+    ) -> bool:
+        """Rotas ``/v1/tarefas``; devolve se a conexão continua aberta."""
+        rota, _, consulta = alvo.partition("?")
+        partes = rota[len(PREFIXO_TAREFAS):].strip("/").split("/")
+        parametros = parse_qs(consulta)
+        com_corpo = (
+            tamanho > 0
+            or campos.get("transfer-encoding", "").lower() == "chunked"
+        )
+        csv_ = "csv" in campos.get("content-type", "") or parametros.get("formato") == ["csv"]
+
+        async def responder(status: int, resposta: Any) -> bool:
+            # Um corpo não lido deixaria a conexão fora de sincronia.
+            fica = manter and (not com_corpo or status in (200, 202))
+            await self._responder(escritor, status, resposta, fica)
+            return fica
+
+        async def receber(tarefa) -> bool:
+            if tarefa.estado != "aguardando":
+                return await responder(409, {"erro": f"Tarefa já recebeu dados (estado {tarefa.estado})"})
+            try:
+                await self.tarefas.receber(tarefa, linhas_do_corpo(leitor, campos), csv_)
+            except ValueError as exc:  # corpo malformado (p. ex. bloco chunked inválido)
+                return await responder(400, {"erro": str(exc)})
+            return await responder(202, tarefa.status())
+
+        if partes == [""]:
+            if metodo == "GET":
+                return await responder(200, [t.status() for t in self.tarefas.tarefas.values()])
+            if metodo != "POST":
+                return await responder(405, {"erro": "Use POST para criar ou GET para listar"})
+            nome = parametros.get("rota", [""])[0]
+            try:
+                tarefa = self.tarefas.criar(f"/v1/{nome}")
+            except KeyError:
+                return await responder(400, {"erro": f"Rota desconhecida: {nome!r}", "rotas": sorted(ROTAS)})
+            return await (receber(tarefa) if com_corpo else responder(202, tarefa.status()))
+        tarefa = self.tarefas.tarefas.get(partes[0])
+        if tarefa is None:
+            return await responder(404, {"erro": f"Tarefa desconhecida: {partes[0]}"})
+        acao = partes[1] if len(partes) > 1 else ""
+        if acao == "" and metodo == "GET":
+            return await responder(200, tarefa.status())
+        if acao == "" and metodo == "DELETE":
+            del self.tarefas.tarefas[tarefa.id]
+            tarefa.descartar()
+            return await responder(200, tarefa.status())
+        if acao == "dados" and metodo == "POST":
+            return await receber(tarefa)
+        if acao == "resultados" and metodo == "GET":
+            escritor.write(
+                f"HTTP/1.1 200 OK\r\n"
+                f"Content-Type: application/x-ndjson; charset=utf-8\r\n"
+                f"Transfer-Encoding: chunked\r\n"
+                f"Connection: {'keep-alive' if manter else 'close'}\r\n\r\n".encode("latin-1")
+            )
+            async for dados in tarefa.acompanhar():
+                escritor.write(b"%x\r\n%s\r\n" % (len(dados), dados))
+                await escritor.drain()
+            escritor.write(b"0\r\n\r\n")
+            await escritor.drain()
+            return manter
+        return await responder(405, {"erro": f"Método {metodo} não aceito em {rota}"})
+
+    @staticmethod
+    async def _responder(escritor: asyncio.StreamWriter, status: int, resposta: Any, manter: bool) -> None:
+        dados = json.dumps(resposta, ensure_ascii=False).encode("utf-8")
+        escritor.write(
+            f"HTTP/1.1 {status} {_MOTIVOS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(dados)}\r\n"
+            f"Connection: {'keep-alive' if manter else 'close'}\r\n\r\n".encode("latin-1")
+            + dados
+        )
+        await escritor.drain()
+
+
+async def servir(host: str = HOST_PADRAO, porta: int = PORTA_PADRAO, processos: Optional[int] = None) -> None:
+    servico = ServicoRecomendacao(host, porta, processos)
+    if servico.aviso_catalogo:
+        print(servico.aviso_catalogo)
+    await servico.iniciar()
+    print(f"FERTISOJA servindo em http://{servico.host}:{servico.porta}/v1/ (Ctrl+C para sair)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await servico.encerrar()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serviço HTTP local dos motores do FERTISOJA")
+    parser.add_argument("--host", default=HOST_PADRAO)
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    parser.add_argument("--processos", type=int, default=None, help="0 = calcular no próprio processo")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(servir(args.host, args.porta, args.processos))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+__all__ = [
+    'ROTAS',
+    'ServicoRecomendacao',
+    'executar_lote',
+    'servir',
+]
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,372 @@
+"""Tarefas em massa do serviço local: laudos em NDJSON ou CSV, resultados em NDJSON.
+
+Fluxo (rotas em `core.servico`):
+
+1. ``POST /v1/tarefas?rota=adubacao`` cria a tarefa e devolve o ``id``;
+2. ``POST /v1/tarefas/<id>/dados`` envia os laudos (NDJSON ou CSV pelo
+   Content-Type ou ``?formato=csv``; Content-Length ou ``chunked``). O corpo é lido aos poucos
+   e cortado em blocos de `BLOCO_LINHAS`, que vão para os processos;
+3. ``GET /v1/tarefas/<id>/resultados`` devolve NDJSON em ``chunked``: cada
+   bloco aparece assim que termina (linhas ``{"linha", "status",
+   "resultado"}``, na ordem em que os blocos ficam prontos) e a resposta
+   fecha quando a tarefa conclui;
+4. ``GET /v1/tarefas/<id>`` mostra estado, progresso e linhas por segundo.
+
+A memória fica limitada qualquer que seja o upload: no máximo
+`BLOCOS_EM_ANDAMENTO` blocos por tarefa estão em voo (a leitura do corpo
+espera, e o TCP segura o cliente), e os resultados vão para um arquivo
+temporário que os leitores acompanham.
+"""
+from __future__ import annotations
+
+import asyncio
+import csv
+import json
+import os
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Callable, Dict, FrozenSet, List, Mapping, Optional, Set, Tuple
+
+BLOCO_LINHAS = 500
+BLOCOS_EM_ANDAMENTO = 4
+LEITURA_BYTES = 1 << 16
+LINHA_MAXIMA = 1 << 20  # o mesmo limite de `core.servico.CORPO_MAXIMO` por pedido
+MAX_TAREFAS_GUARDADAS = 16
+
+
+def _valor_csv(texto: str) -> Any:
+    texto = texto.strip()
+    if not texto:
+        return None
+    try:
+        return float(texto.replace(",", "."))
+    except ValueError:
+        return texto
+
+
+class LeitorCsv:
+    """Converte linhas CSV (``,`` ou ``;``, com cabeçalho) em dicionários.
+
+    Com `fora_do_laudo`, só essas colunas ficam no nível de cima; as demais
+    (``P_mg_dm3``, ``CTC_pH7``...) vão para ``"laudo"``, como a rota espera.
+    """
+
+    def __init__(self, fora_do_laudo: Optional[FrozenSet[str]] = None) -> None:
+        self.campos: Optional[List[str]] = None
+        self.delimitador = ","
+        self.fora_do_laudo = fora_do_laudo
+
+    def __call__(self, linha: str) -> Optional[Dict[str, Any]]:
+        if self.campos is None:
+            self.delimitador = ";" if linha.count(";") > linha.count(",") else ","
+            self.campos = [c.strip() for c in next(csv.reader([linha], delimiter=self.delimitador))]
+            return None
+        valores = next(csv.reader([linha], delimiter=self.delimitador))
+        linha_dict = {campo: _valor_csv(valor) for campo, valor in zip(self.campos, valores)}
+        if self.fora_do_laudo is None:
+            return linha_dict
+        corpo: Dict[str, Any] = {"laudo": {}}
+        for campo, valor in linha_dict.items():
+            if campo in self.fora_do_laudo:
+                if valor is not None:
+                    corpo[campo] = valor
+            else:
+                corpo["laudo"][campo] = valor
+        return corpo
+
+
+def _ler_ndjson(linha: str) -> Dict[str, Any]:
+    return json.loads(linha)
+
+
+def tamanho_do_corpo(campos: Dict[str, str]) -> int:
+    """``Content-Length`` do pedido (0 se ausente); ValueError se não for um inteiro >= 0."""
+    valor = campos.get("content-length", "").strip() or "0"
+    if not (valor.isascii() and valor.isdigit()):
+        raise ValueError("Content-Length inválido")
+    return int(valor)
+
+
+async def linhas_do_corpo(leitor: asyncio.StreamReader, campos: Dict[str, str]) -> AsyncIterator[bytes]:
+    """Linhas do corpo HTTP (Content-Length ou ``chunked``), sem juntar o corpo todo.
+
+    Uma linha maior que `LINHA_MAXIMA` não é guardada: sai como ``None`` e o
+    resto dela é descartado até a próxima quebra de linha.
+    """
+
+    async def blocos() -> AsyncIterator[bytes]:
+        if campos.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                linha = (await leitor.readuntil(b"\r\n")).split(b";", 1)[0].strip()
+                try:
+                    tamanho = int(linha, 16)
+                except ValueError:
+                    raise ValueError(f"Tamanho de bloco chunked inválido: {linha[:20]!r}") from None
+                if tamanho < 0:
+                    raise ValueError(f"Tamanho de bloco chunked inválido: {linha[:20]!r}")
+                if tamanho == 0:
+                    while (await leitor.readuntil(b"\r\n")) != b"\r\n":
+                        pass
+                    return
+                while tamanho > 0:
+                    dados = await leitor.readexactly(min(LEITURA_BYTES, tamanho))
+                    tamanho -= len(dados)
+                    yield dados
+                await leitor.readexactly(2)
+        restante = tamanho_do_corpo(campos)
+        while restante > 0:
+            dados = await leitor.read(min(LEITURA_BYTES, restante))
+            if not dados:
+                raise ConnectionError("Conexão encerrada no meio do corpo")
+            restante -= len(dados)
+            yield dados
+
+    resto = b""
+    descartando = False
+    async for dados in blocos():
+        if descartando:
+            quebra = dados.find(b"\n")
+            if quebra < 0:
+                continue
+            dados = dados[quebra + 1:]
+            descartando = False
+        partes = (resto + dados).split(b"\n")
+        resto = partes.pop()
+        for parte in partes:
+            yield parte if len(parte) <= LINHA_MAXIMA else None
+        if len(resto) > LINHA_MAXIMA:
+            yield None
+            resto = b""
+            descartando = True
+    if resto:
+        yield resto
+
+
+class Tarefa:
+    """Estado de uma tarefa e o arquivo de resultados que ela vai gravando."""
+
+    def __init__(self, rota: str, diretorio: Optional[str] = None) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.rota = rota
+        self.estado = "aguardando"
+        self.recebidas = 0
+        self.processadas = 0
+        self.erros = 0
+        self.blocos = 0
+        self.mensagem = ""
+        self.criada = time.time()
+        self.inicio: Optional[float] = None
+        self.fim: Optional[float] = None
+        descritor, self.caminho = tempfile.mkstemp(prefix=f"fertisoja-{self.id}-", suffix=".ndjson", dir=diretorio)
+        self._arquivo = os.fdopen(descritor, "wb")
+        self.bytes_gravados = 0
+        self._novidade = asyncio.Event()
+
+    @property
+    def concluida(self) -> bool:
+        return self.estado in ("concluida", "falhou")
+
+    def gravar(self, dados: bytes) -> None:
+        self._arquivo.write(dados)
+        self._arquivo.flush()
+        self.bytes_gravados += len(dados)
+        self._avisar()
+
+    def encerrar(self, estado: str, mensagem: str = "") -> None:
+        self.estado = estado
+        self.mensagem = mensagem
+        self.fim = time.time()
+        self._arquivo.close()
+        self._avisar()
+
+    def _avisar(self) -> None:
+        self._novidade.set()
+        self._novidade = asyncio.Event()
+
+    def status(self) -> Dict[str, Any]:
+        decorrido = ((self.fim or time.time()) - self.inicio) if self.inicio else 0.0
+        return {
+            "id": self.id,
+            "rota": self.rota,
+            "estado": self.estado,
+            "linhas_recebidas": self.recebidas,
+            "linhas_processadas": self.processadas,
+            "erros": self.erros,
+            "blocos": self.blocos,
+            "segundos": round(decorrido, 3),
+            "linhas_por_s": round(self.processadas / decorrido, 1) if decorrido > 0 else 0.0,
+            "mensagem": self.mensagem,
+        }
+
+    async def acompanhar(self) -> AsyncIterator[bytes]:
+        """Conteúdo do arquivo de resultados à medida que cresce, até concluir.
+
+        Cada pedaço termina numa quebra de linha, então o cliente pode
+        decodificar o NDJSON pedaço a pedaço.
+        """
+        with open(self.caminho, "rb") as arquivo:
+            resto = b""
+            while True:
+                novidade = self._novidade
+                dados = arquivo.read(LEITURA_BYTES)
+                if dados:
+                    dados = resto + dados
+                    corte = dados.rfind(b"\n") + 1
+                    resto = dados[corte:]
+                    if corte:
+                        yield dados[:corte]
+                    continue
+                if self.concluida:
+                    if resto:
+                        yield resto
+                    return
+                await novidade.wait()
+
+    def descartar(self) -> None:
+        if not self._arquivo.closed:
+            self._arquivo.close()
+        try:
+            os.remove(self.caminho)
+        except OSError:
+            pass
+
+
+class GerenciadorTarefas:
+    """Cria, alimenta e guarda as tarefas (as `MAX_TAREFAS_GUARDADAS` mais recentes)."""
+
+    def __init__(
+        self,
+        executor: Optional[Executor],
+        executar_lote: Callable[[List[Tuple[str, Any]]], List[Tuple[int, Any]]],
+        rotas: Dict[str, Any],
+        campos_csv: Optional[Mapping[str, FrozenSet[str]]] = None,
+    ) -> None:
+        self.executor = executor
+        self.executar_lote = executar_lote
+        self.rotas = rotas
+        # Rota -> colunas do CSV que não são do laudo (ver `LeitorCsv`).
+        self.campos_csv = dict(campos_csv or {})
+        self.tarefas: "OrderedDict[str, Tarefa]" = OrderedDict()
+        self._pendentes: Set[asyncio.Task] = set()
+
+    def criar(self, rota: str) -> Tarefa:
+        if rota not in self.rotas:
+            raise KeyError(rota)
+        while len(self.tarefas) >= MAX_TAREFAS_GUARDADAS:
+            antiga = next((t for t in self.tarefas.values() if t.concluida), None)
+            if antiga is None:
+                break
+            del self.tarefas[antiga.id]
+            antiga.descartar()
+        tarefa = Tarefa(rota)
+        self.tarefas[tarefa.id] = tarefa
+        return tarefa
+
+    async def _bloco(
+        self, tarefa: Tarefa, numeros: List[int], itens: List[Tuple[str, Any]], erros: Dict[int, str]
+    ) -> None:
+        validos = [item for i, item in enumerate(itens) if i not in erros]
+        try:
+            if self.executor is None:
+                resultados = self.executar_lote(validos)
+            else:
+                resultados = await asyncio.get_running_loop().run_in_executor(self.executor, self.executar_lote, validos)
+        except Exception as exc:  # pool quebrado: o bloco sai com erro, a tarefa segue
+            resultados = [(500, {"erro": f"{type(exc).__name__}: {exc}"})] * len(validos)
+        saida = iter(resultados)
+        linhas = []
+        for i in range(len(itens)):
+            if i in erros:
+                status, resposta = 400, {"erro": erros[i]}
+            else:
+                status, resposta = next(saida)
+            if status != 200:
+                tarefa.erros += 1
+            linhas.append(json.dumps({"linha": numeros[i], "status": status, "resultado": resposta}, ensure_ascii=False))
+        tarefa.gravar(("\n".join(linhas) + "\n").encode("utf-8"))
+        tarefa.processadas += len(itens)
+        tarefa.blocos += 1
+
+    async def receber(self, tarefa: Tarefa, linhas: AsyncIterator[bytes], csv_: bool) -> None:
+        """Consome o upload em blocos; devolve quando o corpo acabou de ser lido.
+
+        O processamento dos últimos blocos continua em segundo plano e a
+        tarefa é concluída quando todos terminam.
+        """
+        if tarefa.estado != "aguardando":
+            raise ValueError(f"Tarefa já recebeu dados (estado {tarefa.estado})")
+        tarefa.estado = "recebendo"
+        tarefa.inicio = time.time()
+        converter = LeitorCsv(self.campos_csv.get(tarefa.rota)) if csv_ else _ler_ndjson
+        vagas = asyncio.Semaphore(BLOCOS_EM_ANDAMENTO)
+        em_voo: Set[asyncio.Task] = set()
+
+        async def enviar(numeros, itens, erros):
+            await vagas.acquire()
+            tarefa_bloco = asyncio.ensure_future(self._bloco(tarefa, numeros, itens, erros))
+            tarefa_bloco.add_done_callback(lambda _: vagas.release())
+            em_voo.add(tarefa_bloco)
+            tarefa_bloco.add_done_callback(em_voo.discard)
+
+        itens: List[Tuple[str, Any]] = []
+        erros: Dict[int, str] = {}
+        # Número da linha no arquivo enviado (contando linhas em branco e o
+        # cabeçalho do CSV), para o laboratório achar o registro de origem.
+        numeros: List[int] = []
+        numero = 0
+        try:
+            async for bruta in linhas:
+                numero += 1
+                try:
+                    if bruta is None:
+                        raise ValueError(f"maior que {LINHA_MAXIMA} bytes")
+                    texto = bruta.decode("utf-8-sig").strip()
+                    if not texto:
+                        continue
+                    corpo = converter(texto)
+                except ValueError as exc:
+                    erros[len(itens)] = f"Linha inválida: {exc}"
+                    corpo = None
+                else:
+                    if corpo is None:  # cabeçalho do CSV
+                        continue
+                itens.append((tarefa.rota, corpo))
+                numeros.append(numero)
+                tarefa.recebidas += 1
+                if len(itens) >= BLOCO_LINHAS:
+                    await enviar(numeros, itens, erros)
+                    itens, erros, numeros = [], {}, []
+            if itens:
+                await enviar(numeros, itens, erros)
+        except Exception as exc:
+            tarefa.estado = "processando"
+            self._concluir_depois(tarefa, em_voo, f"Upload interrompido: {exc}")
+            raise
+        tarefa.estado = "processando"
+        self._concluir_depois(tarefa, em_voo)
+
+    def _concluir_depois(self, tarefa: Tarefa, em_voo: Set[asyncio.Task], falha: str = "") -> None:
+        async def concluir():
+            await asyncio.gather(*list(em_voo))
+            tarefa.encerrar("falhou" if falha else "concluida", falha)
+
+        pendente = asyncio.ensure_future(concluir())
+        self._pendentes.add(pendente)
+        pendente.add_done_callback(self._pendentes.discard)
+
+    def descartar_todas(self) -> None:
+        for tarefa in self.tarefas.values():
+            tarefa.descartar()
+        self.tarefas.clear()
+
+
+__all__ = [
+    'BLOCO_LINHAS',
+    'GerenciadorTarefas',
+    'Tarefa',
+    'linhas_do_corpo',
+    'tamanho_do_corpo',
+]
@@ -0,0 +1,189 @@
+"""Registro das tabelas de recomendação por edição do manual.
+
+Cada edição é montada uma única vez (`carregar_edicao`) e congelada em
+`TabelasManual`: as colunas da tabela SMP viram vetores ``array('d')``
+indexados pelo passo de 0,1 do índice, e as doses por classe viram tuplas
+na ordem de `CLASSES_P_K`. Várias edições podem ficar carregadas ao mesmo
+tempo; os motores recebem a edição pelo parâmetro ``tabelas`` e usam
+`EDICAO_PADRAO` quando nada é informado.
+"""
+from __future__ import annotations
+
+import math
+from array import array
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Callable, Dict, Mapping, Optional, Tuple
+
+from .registros import DATACLASS_SLOTS
+from .regras_classificacao import REGRA_ARGILA, REGRA_CTC, REGRAS, REGRAS_K, REGRAS_P, VERSAO_REGRAS, RegraFaixas
+
+EDICAO_PADRAO = "CQFS-RS/SC 2016"
+
+PASSO_SMP = 0.1
+
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
+class TabelasManual:
+    """Tabelas de uma edição do manual, prontas para consulta por índice."""
+
+    edicao: str
+    versao_regras: str
+    smp_inicial: float
+    smp_final: float
+    nc_smp: Mapping[float, array]
+    v_alvo: Mapping[float, float]
+    coef_polinomio: Mapping[float, Tuple[float, float, float]]
+    regra_argila: RegraFaixas
+    regra_ctc: RegraFaixas
+    regras_p: Mapping[int, RegraFaixas]
+    regras_k: Mapping[str, RegraFaixas]
+    regras: Mapping[str, RegraFaixas]
+    dose_p_cultivo: Mapping[int, Tuple[float, ...]]
+    dose_k_cultivo: Mapping[int, Tuple[float, ...]]
+    correcao_total: Mapping[str, Tuple[float, float]]
+    produtividade_referencia: float
+    manutencao_base: Tuple[float, float]
+    manutencao_por_t: Tuple[float, float]
+    reposicao_por_t: Tuple[float, float]
+    k2o_linha_max: float
+
+    @property
+    def indices_smp(self) -> Tuple[float, ...]:
+        n = len(next(iter(self.nc_smp.values())))
+        return tuple(round(self.smp_inicial + i * PASSO_SMP, 1) for i in range(n))
+
+    def nc_smp_exato(self, smp: float, desired_pH: float = 6.0) -> Optional[float]:
+        """Dose da linha ``round(smp, 1)``; None fora da tabela ou pH sem coluna."""
+        coluna = self.nc_smp.get(desired_pH)
+        if coluna is None:
+            return None
+        idx = round((round(smp, 1) - self.smp_inicial) / PASSO_SMP)
+        if 0 <= idx < len(coluna):
+            return coluna[idx]
+        return None
+
+    def nc_smp_interpolado(self, smp: float, desired_pH: float = 6.0) -> Optional[float]:
+        """Dose interpolada entre as linhas vizinhas; saturada nos extremos."""
+        coluna = self.nc_smp.get(desired_pH)
+        if coluna is None:
+            return None
+        if smp <= self.smp_inicial:
+            return coluna[0]
+        if smp >= self.smp_final:
+            return coluna[-1]
+        pos = (smp - self.smp_inicial) / PASSO_SMP
+        lo = min(int(math.floor(pos + 1e-9)), len(coluna) - 2)
+        t = max(pos - lo, 0.0)
+        return coluna[lo] + t * (coluna[lo + 1] - coluna[lo])
+
+
+# Manual de Calagem e Adubação RS/SC, 2016 (PRNT 100%, t/ha).
+_SMP_2016: Tuple[Tuple[float, float, float, float], ...] = (
+    # SMP, pH 5.5, pH 6.0, pH 6.5
+    (4.4, 15.0, 21.0, 29.0),
+    (4.5, 12.5, 17.3, 24.0),
+    (4.6, 10.9, 15.1, 20.0),
+    (4.7, 9.6, 13.3, 17.5),
+    (4.8, 8.5, 11.9, 15.7),
+    (4.9, 7.7, 10.7, 14.2),
+    (5.0, 6.6, 9.9, 13.3),
+    (5.1, 6.0, 9.1, 12.3),
+    (5.2, 5.3, 8.3, 11.3),
+    (5.3, 4.8, 7.5, 10.4),
+    (5.4, 4.2, 6.8, 9.5),
+    (5.5, 3.7, 6.1, 8.6),
+    (5.6, 3.2, 5.4, 7.8),
+    (5.7, 2.8, 4.8, 7.0),
+    (5.8, 2.3, 4.2, 6.3),
+    (5.9, 2.0, 3.7, 5.6),
+    (6.0, 1.6, 3.2, 4.9),
+    (6.1, 1.3, 2.7, 4.3),
+    (6.2, 1.0, 2.2, 3.7),
+    (6.3, 0.8, 1.8, 3.1),
+    (6.4, 0.6, 1.4, 2.6),
+    (6.5, 0.4, 1.1, 2.1),
+    (6.6, 0.2, 0.8, 1.6),
+    (6.7, 0.0, 0.5, 1.2),
+    (6.8, 0.0, 0.3, 0.8),
+    (6.9, 0.0, 0.2, 0.5),
+    (7.0, 0.0, 0.0, 0.2),
+    (7.1, 0.0, 0.0, 0.0),
+)
+
+
+def _cqfs_2016() -> TabelasManual:
+    colunas = {ph: array('d', (linha[i] for linha in _SMP_2016)) for i, ph in enumerate((5.5, 6.0, 6.5), start=1)}
+    return TabelasManual(
+        edicao=EDICAO_PADRAO,
+        versao_regras=VERSAO_REGRAS,
+        smp_inicial=_SMP_2016[0][0],
+        smp_final=_SMP_2016[-1][0],
+        nc_smp=MappingProxyType(colunas),
+        v_alvo=MappingProxyType({5.5: 65.0, 6.0: 75.0, 6.5: 85.0}),
+        coef_polinomio=MappingProxyType({
+            5.5: (-0.653, 0.480, 1.937),
+            6.0: (-0.516, 0.805, 2.435),
+            6.5: (-0.122, 1.193, 2.713),
+        }),
+        regra_argila=REGRA_ARGILA,
+        regra_ctc=REGRA_CTC,
+        regras_p=REGRAS_P,
+        regras_k=REGRAS_K,
+        regras=REGRAS,
+        # Doses base por classe (Muito baixo .. Muito alto) e cultivo.
+        dose_p_cultivo=MappingProxyType({1: (155.0, 95.0, 85.0, 45.0, 0.0), 2: (95.0, 75.0, 45.0, 45.0, 30.0)}),
+        dose_k_cultivo=MappingProxyType({1: (155.0, 115.0, 105.0, 75.0, 0.0), 2: (95.0, 75.0, 75.0, 75.0, 50.0)}),
+        correcao_total=MappingProxyType({
+            'muito baixo': (160.0, 120.0),
+            'baixo': (80.0, 60.0),
+            'medio': (40.0, 30.0),
+        }),
+        produtividade_referencia=3.0,
+        manutencao_base=(45.0, 75.0),
+        manutencao_por_t=(15.0, 25.0),
+        reposicao_por_t=(14.0, 20.0),
+        k2o_linha_max=80.0,
+    )
+
+
+_CONSTRUTORES: Dict[str, Callable[[], TabelasManual]] = {
+    EDICAO_PADRAO: _cqfs_2016,
+}
+
+
+_CARREGADAS: Dict[str, TabelasManual] = {}
+
+
+def carregar_edicao(nome: str = EDICAO_PADRAO) -> TabelasManual:
+    """Edição `nome`, montada na primeira chamada e reutilizada depois."""
+    tabelas = _CARREGADAS.get(nome)
+    if tabelas is None:
+        construtor = _CONSTRUTORES.get(nome)
+        if construtor is None:
+            raise KeyError(f"Edição do manual desconhecida: {nome!r}")
+        tabelas = _CARREGADAS[nome] = construtor()
+    return tabelas
+
+
+def registrar_edicao(nome: str, construtor: Callable[[], TabelasManual]) -> None:
+    _CONSTRUTORES[nome] = construtor
+    _CARREGADAS.pop(nome, None)
+
+
+def edicoes_disponiveis() -> Tuple[str, ...]:
+    return tuple(_CONSTRUTORES)
+
+
+def tabelas_ou_padrao(tabelas: Optional[TabelasManual]) -> TabelasManual:
+    return tabelas if tabelas is not None else carregar_edicao(EDICAO_PADRAO)
+
+
+__all__ = [
+    'EDICAO_PADRAO',
+    'TabelasManual',
+    'carregar_edicao',
+    'edicoes_disponiveis',
+    'registrar_edicao',
+    'tabelas_ou_padrao',
+]
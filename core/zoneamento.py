@@ -0,0 +1,414 @@
+"""Zonas de manejo por k-means sobre os atributos do solo.
+
+Agrupa amostras (ou células interpoladas de `RasterPrescricao`) em N zonas
+pelos atributos padronizados (média 0, desvio 1) e calcula uma única
+recomendação de adubação e calagem por zona, a partir das médias da zona.
+Com NumPy instalado o k-means roda vetorizado sobre as colunas; sem ele,
+os centros são ajustados em Python puro sobre uma amostra aleatória dos
+pontos e cada ponto recebe o centro mais próximo numa única passada (até
+`MAX_PONTOS_PYTHON` pontos).
+"""
+from __future__ import annotations
+
+import math
+import random
+from array import array
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from .adubacao_dados import EntradaSoja, ResultadoAdubacao, recomendar_adubacao_soja
+from .diagnostico import classificar_k, classificar_p
+from .prescricao import CAMADAS_DOSE, AmostraGrade, RasterPrescricao
+from .registros import DATACLASS_SLOTS
+from .tabelas_manual import TabelasManual, tabelas_ou_padrao
+
+try:
+    import numpy as np
+    NUMPY_OK = True
+except Exception:
+    np = None
+    NUMPY_OK = False
+
+ATRIBUTOS_ZONA = ('P', 'K', 'argila', 'CTC', 'MO', 'pH')
+ATRIBUTOS_MEDIA = ('P', 'K', 'argila', 'CTC', 'MO', 'pH', 'SMP', 'V')
+MAX_ITERACOES = 100
+# Sem NumPy: os centros são ajustados numa amostra aleatória de até
+# `AMOSTRA_AJUSTE_PYTHON` pontos e depois cada ponto é rotulado uma vez.
+AMOSTRA_AJUSTE_PYTHON = 10_000
+MAX_PONTOS_PYTHON = 1_000_000
+
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
+class ZonaManejo:
+    indice: int
+    pontos: int
+    area_ha: Optional[float]
+    medias: Mapping[str, float]
+    adubacao: Optional[ResultadoAdubacao]
+    calcario_t_ha: Optional[float]
+
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
+class Zoneamento:
+    """Rótulo da zona de cada ponto (-1 sem dados) e a recomendação por zona."""
+
+    rotulos: array
+    zonas: Tuple[ZonaManejo, ...]
+    atributos: Tuple[str, ...]
+    inercia: float
+    iteracoes: int
+
+
+def colunas_de_amostras(amostras: Sequence[AmostraGrade]) -> Dict[str, array]:
+    """Colunas por atributo, com NaN onde a amostra não traz o valor."""
+    nan = math.nan
+    nomes = {nome for amostra in amostras for nome in amostra.valores}
+    return {nome: array('d', (a.valores.get(nome, nan) for a in amostras)) for nome in sorted(nomes)}
+
+
+def colunas_de_raster(raster: RasterPrescricao) -> Dict[str, array]:
+    return {nome: valores for nome, valores in raster.camadas.items() if nome in ATRIBUTOS_MEDIA}
+
+
+def _kmeans_numpy(dados, k: int, semente: int, max_iteracoes: int):
+    rng = np.random.default_rng(semente)
+    n = dados.shape[0]
+    centros = np.empty((k, dados.shape[1]))
+    centros[0] = dados[rng.integers(n)]
+    d2 = ((dados - centros[0]) ** 2).sum(axis=1)
+    for j in range(1, k):
+        total = d2.sum()
+        if total <= 0:
+            # Todos os pontos coincidem com algum centro: menos pontos
+            # distintos que zonas, então k diminui.
+            centros = centros[:j]
+            k = j
+            break
+        centros[j] = dados[rng.choice(n, p=d2 / total)]
+        np.minimum(d2, ((dados - centros[j]) ** 2).sum(axis=1), out=d2)
+
+    normas = (dados ** 2).sum(axis=1)
+    rotulos = np.full(n, -1, dtype=np.intp)
+    iteracoes = 0
+    for iteracoes in range(1, max_iteracoes + 1):
+        dist = normas[:, None] - 2.0 * (dados @ centros.T) + (centros ** 2).sum(axis=1)[None, :]
+        novos = dist.argmin(axis=1)
+        if np.array_equal(novos, rotulos):
+            break
+        rotulos = novos
+        contagem = np.bincount(rotulos, minlength=k)
+        vazias = np.flatnonzero(contagem == 0)
+        if vazias.size:
+            # Zona vazia: recomeça no ponto mais distante do próprio centro,
+            # um ponto diferente para cada zona e sem esvaziar outra.
+            erro = dist[np.arange(n), rotulos]
+            for j in vazias:
+                erro[contagem[rotulos] <= 1] = -np.inf
+                longe = erro.argmax()
+                erro[longe] = -np.inf
+                contagem[rotulos[longe]] -= 1
+                rotulos[longe] = j
+                contagem[j] = 1
+        for eixo in range(dados.shape[1]):
+            centros[:, eixo] = np.bincount(rotulos, weights=dados[:, eixo], minlength=k) / contagem
+    inercia = float(((dados - centros[rotulos]) ** 2).sum())
+    return rotulos, centros, inercia, iteracoes
+
+
+def _atribuir(pontos: Iterable[Tuple[float, ...]], centros: Sequence[Tuple[float, ...]]) -> Tuple[array, array]:
+    """Rótulo do centro mais próximo e a distância² de cada ponto, numa passada."""
+    rotulos = array('i')
+    erros = array('d')
+    dist = math.dist
+    for p in pontos:
+        ds = [dist(p, c) for c in centros]
+        menor = min(ds)
+        rotulos.append(ds.index(menor))
+        erros.append(menor * menor)
+    return rotulos, erros
+
+
+def _kmeans_python(dados: List[Tuple[float, ...]], k: int, semente: int, max_iteracoes: int):
+    rnd = random.Random(semente)
+    n = len(dados)
+    dim = len(dados[0])
+
+    centros = [dados[rnd.randrange(n)]]
+    d2 = [math.dist(p, centros[0]) ** 2 for p in dados]
+    for _ in range(1, k):
+        total = math.fsum(d2)
+        if total <= 0:
+            break  # menos pontos distintos que zonas
+        alvo = rnd.random() * total
+        acumulado = 0.0
+        escolha = n - 1
+        for i, d in enumerate(d2):
+            acumulado += d
+            if acumulado >= alvo:
+                escolha = i
+                break
+        centros.append(dados[escolha])
+        d2 = [min(d, math.dist(p, centros[-1]) ** 2) for d, p in zip(d2, dados)]
+    k = len(centros)
+
+    rotulos = array('i')
+    erros = array('d')
+    iteracoes = 0
+    for iteracoes in range(1, max_iteracoes + 1):
+        novos, erros = _atribuir(dados, centros)
+        if novos == rotulos:
+            break
+        rotulos = novos
+        contagem = [0] * k
+        for r in rotulos:
+            contagem[r] += 1
+        vazias = [j for j in range(k) if contagem[j] == 0]
+        if vazias:
+            # Mesmo critério da versão NumPy: pontos distintos, sem esvaziar outra zona.
+            for i in sorted(range(n), key=erros.__getitem__, reverse=True):
+                if not vazias:
+                    break
+                if contagem[rotulos[i]] > 1:
+                    contagem[rotulos[i]] -= 1
+                    rotulos[i] = vazias.pop()
+                    contagem[rotulos[i]] = 1
+        somas = [[0.0] * dim for _ in range(k)]
+        for p, r in zip(dados, rotulos):
+            soma = somas[r]
+            for eixo in range(dim):
+                soma[eixo] += p[eixo]
+        centros = [tuple(v / contagem[j] for v in somas[j]) for j in range(k)]
+    inercia = math.fsum(erros)
+    return rotulos, centros, inercia, iteracoes
+
+
+def _medias_zona(colunas: Mapping[str, array], validos: Sequence[int], rotulos: Sequence[int], k: int) -> List[Dict[str, float]]:
+    medias: List[Dict[str, float]] = [{} for _ in range(k)]
+    for nome in ATRIBUTOS_MEDIA:
+        valores = colunas.get(nome)
+        if valores is None:
+            continue
+        somas = [0.0] * k
+        contagem = [0] * k
+        for i, r in zip(validos, rotulos):
+            v = valores[i]
+            if v == v:
+                somas[r] += v
+                contagem[r] += 1
+        for j in range(k):
+            if contagem[j]:
+                medias[j][nome] = somas[j] / contagem[j]
+    return medias
+
+
+def _medias_zona_numpy(colunas: Mapping[str, array], validos, rotulos, k: int) -> List[Dict[str, float]]:
+    medias: List[Dict[str, float]] = [{} for _ in range(k)]
+    for nome in ATRIBUTOS_MEDIA:
+        valores = colunas.get(nome)
+        if valores is None:
+            continue
+        v = np.asarray(valores, dtype=float)[validos]
+        ok = ~np.isnan(v)
+        somas = np.bincount(rotulos[ok], weights=v[ok], minlength=k)
+        contagem = np.bincount(rotulos[ok], minlength=k)
+        for j in np.flatnonzero(contagem):
+            medias[j][nome] = float(somas[j] / contagem[j])
+    return medias
+
+
+def recomendar_zona(
+    medias: Mapping[str, float],
+    produtividade: float,
+    cultivo: int = 1,
+    desired_pH: float = 6.0,
+    prnt_percent: float = 100.0,
+    constantes: Optional[Mapping[str, float]] = None,
+    tabelas: Optional[TabelasManual] = None,
+) -> Tuple[Optional[ResultadoAdubacao], Optional[float]]:
+    """(adubação, calcário t/ha) para as médias de uma zona; None onde faltam dados."""
+    tabelas = tabelas_ou_padrao(tabelas)
+    valores = dict(constantes or {})
+    valores.update(medias)
+    adubacao = None
+    if all(nome in valores for nome in ('P', 'K', 'argila', 'CTC')):
+        entrada = EntradaSoja(
+            p_class=classificar_p(valores['P'], valores['argila'], tabelas)[0],
+            k_class=classificar_k(valores['K'], valores['CTC'], tabelas)[0],
+            produtividade=produtividade,
+            cultivo=cultivo,
+            argila_pct=valores['argila'],
+            ctc=valores['CTC'],
+            teor_s_mg_dm3=valores.get('S'),
+            ph_agua=valores.get('pH'),
+        )
+        adubacao = recomendar_adubacao_soja(entrada, tabelas)
+    nc = None
+    if 'SMP' in valores:
+        nc = tabelas.nc_smp_interpolado(valores['SMP'], desired_pH)
+    elif 'V' in valores and 'CTC' in valores and desired_pH in tabelas.v_alvo:
+        nc = max(0.0, (tabelas.v_alvo[desired_pH] - valores['V']) / 100.0 * valores['CTC'])
+    if nc is not None and prnt_percent > 0:
+        nc *= 100.0 / prnt_percent
+    return adubacao, nc
+
+
+def zonear(
+    colunas: Mapping[str, Sequence[float]],
+    n_zonas: int,
+    produtividade: float,
+    cultivo: int = 1,
+    atributos: Sequence[str] = ATRIBUTOS_ZONA,
+    area_ponto_ha: Optional[float] = None,
+    desired_pH: float = 6.0,
+    prnt_percent: float = 100.0,
+    constantes: Optional[Mapping[str, float]] = None,
+    semente: int = 0,
+    max_iteracoes: int = MAX_ITERACOES,
+    tabelas: Optional[TabelasManual] = None,
+) -> Zoneamento:
+    """Agrupa os pontos em `n_zonas` e recomenda uma dose por zona.
+
+    Entram no agrupamento os `atributos` presentes em `colunas`; pontos com
+    algum deles ausente (NaN) ficam com rótulo -1. As zonas saem ordenadas
+    pela média dos atributos padronizados do centro (zona 0 = a de menores
+    teores). Com menos pontos distintos que `n_zonas`, saem menos zonas.
+    """
+    usados = tuple(nome for nome in atributos if nome in colunas)
+    if not usados:
+        raise ValueError("Nenhum atributo de solo disponível para o zoneamento")
+    if n_zonas < 1:
+        raise ValueError("Número de zonas deve ser positivo")
+    n = len(colunas[usados[0]])
+
+    if NUMPY_OK:
+        matriz = np.column_stack([np.asarray(colunas[nome], dtype=float) for nome in usados])
+        validos = np.flatnonzero(~np.isnan(matriz).any(axis=1))
+        if validos.size == 0:
+            raise ValueError("Nenhum ponto com todos os atributos")
+        dados = matriz[validos]
+        desvio = dados.std(axis=0)
+        desvio[desvio == 0] = 1.0
+        dados = (dados - dados.mean(axis=0)) / desvio
+        k = min(n_zonas, validos.size)
+        rot, centros, inercia, iteracoes = _kmeans_numpy(dados, k, semente, max_iteracoes)
+        k = len(centros)
+        ordem = np.argsort(centros.mean(axis=1), kind='stable')
+        nova = np.empty(k, dtype=np.intp)
+        nova[ordem] = np.arange(k)
+        rot = nova[rot]
+        medias = _medias_zona_numpy(colunas, validos, rot, k)
+        contagem = np.bincount(rot, minlength=k).tolist()
+        completo = np.full(n, -1, dtype=np.int32)
+        completo[validos] = rot
+        rotulos = array('i', completo.tobytes())
+    else:
+        cols = [colunas[nome] for nome in usados]
+        validos = array('i', (i for i, linha in enumerate(zip(*cols)) if all(v == v for v in linha)))
+        if not validos:
+            raise ValueError("Nenhum ponto com todos os atributos")
+        m = len(validos)
+        if m > MAX_PONTOS_PYTHON:
+            raise ValueError(
+                f"{m} pontos para o zoneamento sem NumPy (limite {MAX_PONTOS_PYTHON}); "
+                "instale o NumPy ou use uma resolução maior"
+            )
+        escalas = []
+        for col in cols:
+            media = math.fsum(col[i] for i in validos) / m
+            desvio = math.sqrt(math.fsum((col[i] - media) ** 2 for i in validos) / m) or 1.0
+            escalas.append((media, desvio))
+
+        def padronizados(indices):
+            for i in indices:
+                yield tuple((col[i] - media) / desvio for col, (media, desvio) in zip(cols, escalas))
+
+        rnd = random.Random(semente)
+        ajuste = validos if m <= AMOSTRA_AJUSTE_PYTHON else sorted(rnd.sample(validos, AMOSTRA_AJUSTE_PYTHON))
+        dados = list(padronizados(ajuste))
+        k = min(n_zonas, m)
+        rot, centros, inercia, iteracoes = _kmeans_python(dados, k, semente, max_iteracoes)
+        if len(ajuste) < m:
+            rot, erros = _atribuir(padronizados(validos), centros)
+            inercia = math.fsum(erros)
+        k = len(centros)
+        ordem = sorted(range(k), key=lambda j: math.fsum(centros[j]) / len(centros[j]))
+        nova = [0] * k
+        for posicao, j in enumerate(ordem):
+            nova[j] = posicao
+        rot = array('i', (nova[r] for r in rot))
+        medias = _medias_zona(colunas, validos, rot, k)
+        contagem = [0] * k
+        for r in rot:
+            contagem[r] += 1
+        rotulos = array('i', [-1]) * n
+        for i, r in zip(validos, rot):
+            rotulos[i] = r
+
+    zonas = []
+    for j in range(k):
+        adubacao, calcario = recomendar_zona(
+            medias[j], produtividade, cultivo, desired_pH, prnt_percent, constantes, tabelas
+        )
+        zonas.append(ZonaManejo(
+            indice=j,
+            pontos=contagem[j],
+            area_ha=None if area_ponto_ha is None else contagem[j] * area_ponto_ha,
+            medias=MappingProxyType(medias[j]),
+            adubacao=adubacao,
+            calcario_t_ha=calcario,
+        ))
+    return Zoneamento(
+        rotulos=rotulos,
+        zonas=tuple(zonas),
+        atributos=usados,
+        inercia=float(inercia),
+        iteracoes=iteracoes,
+    )
+
+
+def zonear_raster(raster: RasterPrescricao, n_zonas: int, produtividade: float, **opcoes) -> Zoneamento:
+    """Zoneamento das células do talhão; a área de cada zona sai em hectares."""
+    area_celula = raster.resolucao_m * raster.resolucao_m / 10_000.0
+    return zonear(colunas_de_raster(raster), n_zonas, produtividade, area_ponto_ha=area_celula, **opcoes)
+
+
+def zonear_amostras(amostras: Sequence[AmostraGrade], n_zonas: int, produtividade: float, **opcoes) -> Zoneamento:
+    return zonear(colunas_de_amostras(amostras), n_zonas, produtividade, **opcoes)
+
+
+def camadas_de_zonas(zoneamento: Zoneamento) -> Dict[str, array]:
+    """Doses da zona de cada ponto, nas camadas de `CAMADAS_DOSE` (NaN sem zona).
+
+    Com um zoneamento de raster, o resultado serve de ``camadas`` para a
+    exportação em `core.exportacao_prescricao` (taxa única por zona).
+    """
+    nan = math.nan
+    por_zona = []
+    for zona in zoneamento.zonas:
+        totais = zona.adubacao.totais if zona.adubacao is not None else None
+        por_zona.append((
+            nan if zona.calcario_t_ha is None else zona.calcario_t_ha,
+            nan if totais is None else totais.P2O5_total,
+            nan if totais is None else totais.K2O_total,
+        ))
+    vazio = (nan, nan, nan)
+    doses = [por_zona[r] if r >= 0 else vazio for r in zoneamento.rotulos]
+    saida = {nome: array('d', (d[i] for d in doses)) for i, nome in enumerate(CAMADAS_DOSE)}
+    saida['zona'] = array('d', (float(r) if r >= 0 else nan for r in zoneamento.rotulos))
+    return saida
+
+
+__all__ = [
+    'ATRIBUTOS_ZONA',
+    'NUMPY_OK',
+    'ZonaManejo',
+    'Zoneamento',
+    'camadas_de_zonas',
+    'colunas_de_amostras',
+    'colunas_de_raster',
+    'recomendar_zona',
+    'zonear',
+    'zonear_amostras',
+    'zonear_raster',
+]
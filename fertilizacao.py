@@ -1,26 +1,22 @@
 ﻿"""Rotinas de cálculo para a aba de fertilização."""
 from __future__ import annotations
 
-import unicodedata
+import bisect
+import math
+import os
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
-
-
-@dataclass(frozen=True)
-class Fertilizante:
-    codigo: str
-    nome: str
-    p2o5: float = 0.0
-    k2o: float = 0.0
-    s: float = 0.0
-    mo: float = 0.0
-    n: float = 0.0
-
-
-def _normalize_name(texto: str | None) -> str:
-    if not texto:
-        return ""
-    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode().lower().strip()
+from types import MappingProxyType
+from typing import Dict, Hashable, List, Mapping, Optional, Sequence, Tuple
+
+from catalogo_fertilizantes import (
+    CatalogoFertilizantes,
+    Fertilizante,
+    caminho_catalogo_usuario,
+    composicao,
+    normalizar_nome as _normalize_name,
+)
+from core.registros import DATACLASS_SLOTS
 
 
 _FOSFATADOS_SEQ: Tuple[Fertilizante, ...] = (
@@ -30,8 +26,6 @@ _FOSFATADOS_SEQ: Tuple[Fertilizante, ...] = (
     Fertilizante('DAP', 'DAP', p2o5=0.46, n=0.18),
 )
 FOSFATADOS: Dict[str, Fertilizante] = {item.codigo: item for item in _FOSFATADOS_SEQ}
-_FOSFATADO_POR_NOME = {item.nome: item for item in _FOSFATADOS_SEQ}
-_FOSFATADO_POR_NORMALIZED = {_normalize_name(item.nome): item for item in _FOSFATADOS_SEQ}
 FOSFATADOS_CHOICES: Tuple[str, ...] = tuple(item.nome for item in _FOSFATADOS_SEQ)
 
 _POTASSICOS_SEQ: Tuple[Fertilizante, ...] = (
@@ -39,8 +33,6 @@ _POTASSICOS_SEQ: Tuple[Fertilizante, ...] = (
     Fertilizante('K2SO4', 'Sulfato de Potássio (K2SO4)', k2o=0.50, s=0.18),
 )
 POTASSICOS: Dict[str, Fertilizante] = {item.codigo: item for item in _POTASSICOS_SEQ}
-_POTASSICO_POR_NOME = {item.nome: item for item in _POTASSICOS_SEQ}
-_POTASSICO_POR_NORMALIZED = {_normalize_name(item.nome): item for item in _POTASSICOS_SEQ}
 POTASSICOS_CHOICES: Tuple[str, ...] = tuple(item.nome for item in _POTASSICOS_SEQ)
 
 GESSO_PADRAO = Fertilizante('GESSO', 'Gesso agrícola', s=0.17)
@@ -49,26 +41,108 @@ MOLIBDATO_PADRAO = Fertilizante('MOLIBDATO', 'Molibdato de sódio (Mo)', mo=0.39
 FORMULADO_COMPLEMENTO_P = FOSFATADOS['TSP']
 FORMULADO_COMPLEMENTO_K = POTASSICOS['KCl']
 
+CATALOGO = CatalogoFertilizantes(
+    [(item, 'fosfatado') for item in _FOSFATADOS_SEQ]
+    + [(item, 'potassico') for item in _POTASSICOS_SEQ]
+    + [(GESSO_PADRAO, 'suplemento'), (MOLIBDATO_PADRAO, 'suplemento')]
+)
+
+
+def carregar_catalogo(caminho: str | os.PathLike | None = None) -> int:
+    """Acrescenta ao catálogo os produtos de um CSV/JSON (padrão: ``FERTISOJA_CATALOGO``)."""
+    destino = caminho or caminho_catalogo_usuario()
+    if destino is None:
+        return 0
+    quantidade = CATALOGO.carregar(destino)
+    CACHE_CALCULOS.limpar()
+    return quantidade
 
-@dataclass
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class FertilizacaoResultado:
-    produtos: List[Tuple[str, float]]
-    alertas: List[str]
-    faltantes: Dict[str, float]
+    """Resultado imutável: pode ser compartilhado pelo cache dos cálculos."""
+
+    produtos: Tuple[Tuple[str, float], ...]
+    alertas: Tuple[str, ...]
+    faltantes: Mapping[str, float]
+    custo: float | None = None
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, 'produtos', tuple((nome, float(qtd)) for nome, qtd in self.produtos))
+        object.__setattr__(self, 'alertas', tuple(self.alertas))
+        object.__setattr__(self, 'faltantes', MappingProxyType(dict(self.faltantes)))
 
 
 def obter_fosfatado_por_nome(nome: str | None) -> Fertilizante | None:
-    if not nome:
-        return None
-    chave = _normalize_name(nome)
-    return _FOSFATADO_POR_NOME.get(nome) or _FOSFATADO_POR_NORMALIZED.get(chave)
+    return CATALOGO.por_nome(nome, 'fosfatado')
 
 
 def obter_potassico_por_nome(nome: str | None) -> Fertilizante | None:
-    if not nome:
-        return None
-    chave = _normalize_name(nome)
-    return _POTASSICO_POR_NOME.get(nome) or _POTASSICO_POR_NORMALIZED.get(chave)
+    return CATALOGO.por_nome(nome, 'potassico')
+
+
+def obter_formulado_por_nome(nome: str | None) -> Fertilizante | None:
+    return CATALOGO.por_nome(nome, 'formulado')
+
+
+@dataclass(frozen=True)
+class SugestaoFormulado:
+    """Formulado do catálogo avaliado para uma demanda (kg/ha)."""
+
+    fertilizante: Fertilizante
+    kg_ha: float
+    deficit: Mapping[str, float]
+    excesso: Mapping[str, float]
+
+    @property
+    def desequilibrio(self) -> float:
+        return sum(self.deficit.values()) + sum(self.excesso.values())
+
+    @property
+    def grade(self) -> Dict[str, float]:
+        fert = self.fertilizante
+        return {'N': fert.n * 100.0, 'P2O5': fert.p2o5 * 100.0, 'K2O': fert.k2o * 100.0, 'S': fert.s * 100.0}
+
+
+def _avaliar_formulado(fert: Fertilizante, requisitos: Mapping[str, float]) -> SugestaoFormulado:
+    # Mesma dose de calcular_formulado: a menor massa que atende P2O5 ou K2O.
+    doses = [requisitos[nutriente] / teor for nutriente, teor in (('P2O5', fert.p2o5), ('K2O', fert.k2o))
+             if requisitos[nutriente] > 0 and teor > 0]
+    kg = min(doses) if doses else 0.0
+    deficit: Dict[str, float] = {}
+    excesso: Dict[str, float] = {}
+    for nutriente, teor in (('P2O5', fert.p2o5), ('K2O', fert.k2o), ('S', fert.s)):
+        diferenca = kg * teor - requisitos[nutriente]
+        if diferenca > 1e-9:
+            excesso[nutriente] = diferenca
+        elif diferenca < -1e-9:
+            deficit[nutriente] = -diferenca
+    return SugestaoFormulado(fert, kg, MappingProxyType(deficit), MappingProxyType(excesso))
+
+
+def buscar_formulados(
+    demanda: Mapping[str, float],
+    limite: int = 5,
+    catalogo: CatalogoFertilizantes | None = None,
+    candidatos: int | None = None,
+) -> List[SugestaoFormulado]:
+    """Formulados do catálogo ordenados por déficit + excesso e, depois, massa.
+
+    Os ``candidatos`` (padrão: ``max(8 * limite, 32)``) mais próximos da
+    composição P:K:S da demanda saem do índice espacial do catálogo; só esses
+    são avaliados em detalhe.
+    """
+    catalogo = catalogo or CATALOGO
+    requisitos = {nutriente: max(float(demanda.get(nutriente, 0.0) or 0.0), 0.0) for nutriente in ('P2O5', 'K2O', 'S')}
+    alvo = composicao(requisitos['P2O5'], requisitos['K2O'], requisitos['S'])
+    if alvo is None or limite <= 0:
+        return []
+    quantidade = candidatos if candidatos is not None else max(8 * limite, 32)
+    vizinhos = catalogo.indice_grades('formulado').vizinhos(alvo, quantidade)
+    sugestoes = [_avaliar_formulado(fert, requisitos) for fert in vizinhos]
+    sugestoes = [sugestao for sugestao in sugestoes if sugestao.kg_ha > 0]
+    sugestoes.sort(key=lambda sugestao: (round(sugestao.desequilibrio, 6), sugestao.kg_ha, sugestao.fertilizante.n))
+    return sugestoes[:limite]
 
 
 def _adicionar_produto(destino: List[Tuple[str, float]], nome: str, quantidade: float, minimo: float = 1e-6) -> None:
@@ -77,6 +151,19 @@ def _adicionar_produto(destino: List[Tuple[str, float]], nome: str, quantidade:
     destino.append((nome, quantidade))
 
 
+def _padrao(fert: Fertilizante, categoria: str, nutriente: str) -> Fertilizante:
+    """Fosfatado/potássico padrão como está no :data:`CATALOGO`.
+
+    O arquivo de ``FERTISOJA_CATALOGO`` pode substituir um produto embutido
+    pelo código; sem ele (ou se a versão do arquivo não traz o nutriente),
+    vale a definição embutida `fert`.
+    """
+    atual = CATALOGO.por_codigo(fert.codigo, categoria)
+    if atual is None or getattr(atual, nutriente) <= 0:
+        return fert
+    return atual
+
+
 def _complementar_enxofre(restante_s: float, produtos: List[Tuple[str, float]]) -> float:
     if restante_s <= 0:
         return 0.0
@@ -140,11 +227,11 @@ def calcular_formulado(
     k_restante = max(k_req - k_suprido, 0.0)
 
     if p_restante > 0:
-        kg_tsp = p_restante / FORMULADO_COMPLEMENTO_P.p2o5
-        _adicionar_produto(produtos, FORMULADO_COMPLEMENTO_P.nome, kg_tsp)
+        complemento_p = _padrao(FORMULADO_COMPLEMENTO_P, 'fosfatado', 'p2o5')
+        _adicionar_produto(produtos, complemento_p.nome, p_restante / complemento_p.p2o5)
     if k_restante > 0:
-        kg_kcl = k_restante / FORMULADO_COMPLEMENTO_K.k2o
-        _adicionar_produto(produtos, FORMULADO_COMPLEMENTO_K.nome, kg_kcl)
+        complemento_k = _padrao(FORMULADO_COMPLEMENTO_K, 'potassico', 'k2o')
+        _adicionar_produto(produtos, complemento_k.nome, k_restante / complemento_k.k2o)
 
     _complementar_enxofre(s_req, produtos)
     _complementar_molibdenio(mo_req, produtos)
@@ -160,12 +247,30 @@ def calcular_misto(
     modo_individual: str,
     fosfatado_codigo: str | None = None,
     potassico_codigo: str | None = None,
+) -> FertilizacaoResultado:
+    sacos = max(sacos_50kg, 0.0)
+    if sacos.is_integer():
+        sacos_desc = str(int(sacos))
+    else:
+        sacos_desc = f"{sacos:.2f}".rstrip('0').rstrip('.')
+    nome_com_sacos = f"{nome_formulado} (sacos definidos: {sacos_desc} x 50 kg)"
+    return _misto_por_massa(
+        demanda, grade, sacos * 50.0, nome_com_sacos, modo_individual, fosfatado_codigo, potassico_codigo
+    )
+
+
+def _misto_por_massa(
+    demanda: Dict[str, float],
+    grade: Dict[str, float],
+    massa_formulado: float,
+    nome_com_sacos: str,
+    modo_individual: str,
+    fosfatado_codigo: str | None = None,
+    potassico_codigo: str | None = None,
 ) -> FertilizacaoResultado:
     produtos: List[Tuple[str, float]] = []
     alertas: List[str] = []
 
-    sacos = max(sacos_50kg, 0.0)
-    massa_formulado = sacos * 50.0
     p_frac = max(grade.get('P2O5', 0.0), 0.0) / 100.0
     k_frac = max(grade.get('K2O', 0.0), 0.0) / 100.0
 
@@ -173,11 +278,6 @@ def calcular_misto(
     k_aplicado = massa_formulado * k_frac
 
     if massa_formulado > 0:
-        if sacos.is_integer():
-            sacos_desc = str(int(sacos))
-        else:
-            sacos_desc = f"{sacos:.2f}".rstrip('0').rstrip('.')
-        nome_com_sacos = f"{nome_formulado} (sacos definidos: {sacos_desc} x 50 kg)"
         _adicionar_produto(produtos, nome_com_sacos, massa_formulado)
 
     demanda_restante = dict(demanda)
@@ -218,7 +318,7 @@ def calcular_individual_usuario(
     s_req = max(demanda.get('S', 0.0), 0.0)
     mo_req = max(demanda.get('Mo', 0.0), 0.0)
 
-    fert_p = FOSFATADOS.get(fosfatado_codigo or '')
+    fert_p = CATALOGO.por_codigo(fosfatado_codigo, 'fosfatado')
     if p_req > 0:
         if fert_p is None or fert_p.p2o5 <= 0:
             faltantes['P2O5'] = p_req
@@ -236,7 +336,7 @@ def calcular_individual_usuario(
     elif fosfatado_codigo:
         alertas.append('Nenhuma necessidade de P2O5 foi identificada.')
 
-    fert_k = POTASSICOS.get(potassico_codigo or '')
+    fert_k = CATALOGO.por_codigo(potassico_codigo, 'potassico')
     if k_req > 0:
         if fert_k is None or fert_k.k2o <= 0:
             faltantes['K2O'] = k_req
@@ -272,14 +372,14 @@ def calcular_individual_software(demanda: Dict[str, float]) -> FertilizacaoResul
     potassico: Fertilizante | None = None
 
     if p_req > 0:
-        fosfatado = FOSFATADOS['TSP']
+        fosfatado = _padrao(FOSFATADOS['TSP'], 'fosfatado', 'p2o5')
         if s_req > 0 and k_req == 0:
-            fosfatado = FOSFATADOS['SSP']
+            fosfatado = _padrao(FOSFATADOS['SSP'], 'fosfatado', 'p2o5')
 
     if k_req > 0:
-        potassico = POTASSICOS['KCl']
+        potassico = _padrao(POTASSICOS['KCl'], 'potassico', 'k2o')
         if s_req > 0:
-            potassico = POTASSICOS['K2SO4']
+            potassico = _padrao(POTASSICOS['K2SO4'], 'potassico', 'k2o')
 
     if fosfatado is not None:
         kg_p = p_req / fosfatado.p2o5
@@ -302,7 +402,563 @@ def calcular_individual_software(demanda: Dict[str, float]) -> FertilizacaoResul
     return FertilizacaoResultado(produtos=produtos, alertas=alertas, faltantes={})
 
 
+PRODUTOS_OTIMIZACAO: Tuple[Fertilizante, ...] = (
+    *_FOSFATADOS_SEQ,
+    *_POTASSICOS_SEQ,
+    GESSO_PADRAO,
+    MOLIBDATO_PADRAO,
+)
+CODIGO_FORMULADO = 'FORMULADO'
+
+_NUTRIENTES_OTIMIZACAO: Tuple[Tuple[str, str], ...] = (
+    ('P2O5', 'p2o5'),
+    ('K2O', 'k2o'),
+    ('S', 's'),
+    ('Mo', 'mo'),
+)
+_EPS = 1e-9
+
+
+def formulado_de_grade(
+    grade: Mapping[str, float],
+    nome: str,
+    codigo: str = CODIGO_FORMULADO,
+) -> Fertilizante:
+    """Converte uma garantia N-P-K (%) em um :class:`Fertilizante`."""
+    return Fertilizante(
+        codigo,
+        nome,
+        p2o5=max(float(grade.get('P2O5', 0.0) or 0.0), 0.0) / 100.0,
+        k2o=max(float(grade.get('K2O', 0.0) or 0.0), 0.0) / 100.0,
+        s=max(float(grade.get('S', 0.0) or 0.0), 0.0) / 100.0,
+        n=max(float(grade.get('N', 0.0) or 0.0), 0.0) / 100.0,
+    )
+
+
+def _simplex_menor_custo(
+    teores: Sequence[Sequence[float]],
+    custos: Sequence[float],
+    demanda: Sequence[float],
+) -> Tuple[List[float], float] | None:
+    """Resolve min c·x sujeito a A·x >= b, x >= 0, com c > 0.
+
+    ``teores[j][i]`` é o teor do nutriente ``i`` no produto ``j``. O problema
+    é resolvido pelo dual (max b·y, Aᵀ·y <= c, y >= 0), cuja origem é viável,
+    dispensando a fase 1. As quantidades primais saem dos custos reduzidos
+    das folgas. Regra de Bland evita ciclagem. Retorna ``None`` se inviável.
+    """
+    n = len(custos)
+    m = len(demanda)
+    largura = m + n + 1
+    tabela: List[List[float]] = []
+    for j in range(n):
+        linha = [float(teores[j][i]) for i in range(m)] + [0.0] * n + [float(custos[j])]
+        linha[m + j] = 1.0
+        tabela.append(linha)
+    objetivo = [-float(b) for b in demanda] + [0.0] * (n + 1)
+    base = [m + j for j in range(n)]
+
+    for _ in range(50 * (n + m) + 50):
+        entra = next((col for col in range(m + n) if objetivo[col] < -_EPS), None)
+        if entra is None:
+            break
+        sai = None
+        melhor = 0.0
+        for lin in range(n):
+            coef = tabela[lin][entra]
+            if coef > _EPS:
+                razao = tabela[lin][-1] / coef
+                if sai is None or razao < melhor - _EPS or (abs(razao - melhor) <= _EPS and base[lin] < base[sai]):
+                    sai = lin
+                    melhor = razao
+        if sai is None:
+            return None
+        pivo_linha = tabela[sai]
+        pivo = pivo_linha[entra]
+        for col in range(largura):
+            pivo_linha[col] /= pivo
+        for lin in range(n):
+            if lin != sai:
+                fator = tabela[lin][entra]
+                if fator:
+                    alvo = tabela[lin]
+                    for col in range(largura):
+                        alvo[col] -= fator * pivo_linha[col]
+        fator = objetivo[entra]
+        for col in range(largura):
+            objetivo[col] -= fator * pivo_linha[col]
+        base[sai] = entra
+    else:
+        return None
+
+    quantidades = [max(objetivo[m + j], 0.0) for j in range(n)]
+    return quantidades, objetivo[-1]
+
+
+def calcular_otimizado(
+    demanda: Dict[str, float],
+    precos: Mapping[str, float],
+    formulados: Sequence[Fertilizante] = (),
+) -> FertilizacaoResultado:
+    """Combinação de menor custo que atende P2O5, K2O, S e Mo.
+
+    ``precos`` traz o preço por tonelada de cada produto do :data:`CATALOGO`
+    (ou de ``formulados``), indexado pelo código (``TSP``, ``KCl``, ``GESSO``,
+    ``FORMULADO``...). Produtos sem preço positivo ficam fora da escolha.
+    """
+    produtos: List[Tuple[str, float]] = []
+    alertas: List[str] = []
+    faltantes: Dict[str, float] = {}
+
+    candidatos: List[Tuple[Fertilizante, float]] = []
+    for fert in (*CATALOGO.produtos(), *formulados):
+        try:
+            preco = float(precos.get(fert.codigo) or 0.0)
+        except (TypeError, ValueError):
+            preco = 0.0
+        if preco > 0:
+            candidatos.append((fert, preco / 1000.0))
+
+    nutrientes: List[Tuple[str, str]] = []
+    requisitos: List[float] = []
+    for nutriente, atributo in _NUTRIENTES_OTIMIZACAO:
+        req = max(float(demanda.get(nutriente, 0.0) or 0.0), 0.0)
+        if req <= 0:
+            continue
+        if not any(getattr(fert, atributo) > 0 for fert, _ in candidatos):
+            faltantes[nutriente] = req
+            alertas.append(f"Informe o preço de um fertilizante que forneça {nutriente}.")
+            continue
+        nutrientes.append((nutriente, atributo))
+        requisitos.append(req)
+
+    custo = 0.0
+    if requisitos:
+        teores = [[getattr(fert, atributo) for _, atributo in nutrientes] for fert, _ in candidatos]
+        solucao = _simplex_menor_custo(teores, [preco for _, preco in candidatos], requisitos)
+        if solucao is None:
+            alertas.append('Não foi possível encontrar uma combinação de menor custo.')
+            for nutriente, req in zip((nome for nome, _ in nutrientes), requisitos):
+                faltantes[nutriente] = req
+        else:
+            quantidades, custo = solucao
+            for (fert, _), kg in zip(candidatos, quantidades):
+                if kg <= 1e-6:
+                    continue
+                _adicionar_produto(produtos, fert.nome, kg)
+                if fert.codigo != CODIGO_FORMULADO:
+                    alerta_n = _alerta_nitrogenio(fert)
+                    if alerta_n:
+                        alertas.append(alerta_n)
+
+    return FertilizacaoResultado(produtos=produtos, alertas=alertas, faltantes=faltantes, custo=custo)
+
+
+TAMANHO_SACO_PADRAO = 50
+
+
+@dataclass(frozen=True)
+class OpcaoSacos:
+    """Uma combinação inteira de sacos do formulado para a área toda."""
+
+    sacos: Mapping[int, int]
+    kg_formulado_ha: float
+    excesso: Mapping[str, float]
+    custo_ha: float | None
+    massa_ha: float
+    resultado: FertilizacaoResultado
+
+    @property
+    def excesso_total(self) -> float:
+        return sum(self.excesso.values())
+
+
+def _descrever_sacos(sacos: Mapping[int, int]) -> str:
+    partes = [f"{quantidade} x {tamanho} kg" for tamanho, quantidade in sorted(sacos.items(), reverse=True) if quantidade]
+    return ' + '.join(partes) or '0 sacos'
+
+
+def _custo_complemento(produtos: Sequence[Tuple[str, float]], precos: Mapping[str, float]) -> float:
+    custo = 0.0
+    for nome, kg in produtos:
+        fert = CATALOGO.por_nome(nome)
+        if fert is not None:
+            custo += kg * max(float(precos.get(fert.codigo) or 0.0), 0.0) / 1000.0
+    return custo
+
+
+def otimizar_sacos(
+    demanda: Dict[str, float],
+    grade: Dict[str, float],
+    nome_formulado: str,
+    modo_individual: str,
+    fosfatado_codigo: str | None = None,
+    potassico_codigo: str | None = None,
+    area_ha: float = 1.0,
+    tamanhos: Mapping[int, float | None] | None = None,
+    precos: Mapping[str, float] | None = None,
+    resolucao_excesso: float = 1.0,
+) -> List[OpcaoSacos]:
+    """Conjunto de Pareto (custo × excesso de P2O5/K2O) com sacos inteiros.
+
+    ``tamanhos`` mapeia o peso do saco em kg (50, 1000...) para o preço por
+    saco; ``None`` usa ``precos['FORMULADO']`` (por tonelada). O restante da
+    demanda é complementado como em :func:`calcular_misto`. Sem preços, a
+    massa do complemento substitui o custo. Opções cujo excesso difere menos
+    que ``resolucao_excesso`` (kg/ha) são agrupadas, ficando a de menor
+    objetivo; a opção sem excesso é sempre mantida.
+
+    A massa total é enumerada em unidades do MDC dos tamanhos, até a dose que
+    atende P2O5 e K2O (além dela só cresce o excesso), com duas podas:
+
+    * numa solução ótima, os sacos que não são o de menor preço por kg somam
+      no máximo ``(maior/MDC) * (melhor/MDC)`` unidades; a mochila só vai até
+      aí e o resto é completado com o melhor saco;
+    * o complemento é afim enquanto o conjunto de produtos complementares não
+      muda (trechos achados por bisseção). Dentro de cada trecho, e de cada
+      faixa de excesso, o objetivo é afim em cada classe de resto módulo o
+      melhor saco, então basta avaliar a primeira e a última massa de cada
+      classe.
+    """
+    precos = precos or {}
+    tamanhos = {int(tamanho): preco for tamanho, preco in (tamanhos or {TAMANHO_SACO_PADRAO: None}).items() if int(tamanho) > 0}
+    area = max(float(area_ha), 1e-9)
+    if not tamanhos:
+        return []
+
+    p_req = max(demanda.get('P2O5', 0.0), 0.0)
+    k_req = max(demanda.get('K2O', 0.0), 0.0)
+    p_frac = max(grade.get('P2O5', 0.0), 0.0) / 100.0
+    k_frac = max(grade.get('K2O', 0.0), 0.0) / 100.0
+    doses = [req / teor for req, teor in ((p_req, p_frac), (k_req, k_frac)) if teor > 0 and req > 0]
+    if not doses:
+        return []
+
+    preco_formulado_t = max(float(precos.get(CODIGO_FORMULADO) or 0.0), 0.0)
+    usa_custo = preco_formulado_t > 0 or any(preco for preco in tamanhos.values())
+    mdc = math.gcd(*tamanhos)
+    unidades = int(math.ceil(max(doses) * area / mdc - 1e-9))
+
+    def massa_ha(u: int) -> float:
+        return u * mdc / area
+
+    def excesso_ha(u: int) -> float:
+        massa = massa_ha(u)
+        return max(massa * p_frac - p_req, 0.0) + max(massa * k_frac - k_req, 0.0)
+
+    # Sacos: custo por saco em unidades de MDC. Sem preços, só conta sacos.
+    custo_saco: Dict[int, float] = {}
+    for tamanho, preco in tamanhos.items():
+        if not usa_custo:
+            custo_saco[tamanho // mdc] = 0.0
+        elif preco is not None and preco > 0:
+            custo_saco[tamanho // mdc] = float(preco)
+        else:
+            custo_saco[tamanho // mdc] = preco_formulado_t * tamanho / 1000.0
+    melhor_saco = min(custo_saco, key=lambda passo: (custo_saco[passo] / passo, -passo))
+    limite = min(unidades, max(custo_saco) * melhor_saco + melhor_saco)
+
+    infinito = (float('inf'), 0)
+    mochila: List[Tuple[float, int]] = [(0.0, 0)] + [infinito] * limite
+    escolha: List[int] = [0] * (limite + 1)
+    for u in range(1, limite + 1):
+        for passo, custo in custo_saco.items():
+            anterior = u - passo
+            if anterior >= 0 and mochila[anterior][0] < float('inf'):
+                candidato = (mochila[anterior][0] + custo, mochila[anterior][1] + 1)
+                if candidato < mochila[u]:
+                    mochila[u] = candidato
+                    escolha[u] = passo
+
+    def base_mochila(u: int) -> int:
+        if u <= limite:
+            return u
+        return u - ((u - limite + melhor_saco - 1) // melhor_saco) * melhor_saco
+
+    def custo_sacos(u: int) -> float:
+        t = base_mochila(u)
+        return mochila[t][0] + (u - t) // melhor_saco * custo_saco[melhor_saco]
+
+    marcador = '\0formulado'
+
+    def complemento(u: int) -> Tuple[frozenset, float]:
+        resultado = _misto_por_massa(
+            demanda, grade, massa_ha(u), marcador, modo_individual, fosfatado_codigo, potassico_codigo
+        )
+        produtos = [(nome, kg) for nome, kg in resultado.produtos if nome != marcador]
+        valor = _custo_complemento(produtos, precos) if usa_custo else sum(kg for _, kg in produtos)
+        return frozenset(nome for nome, _ in produtos), valor
+
+    # Trechos [início, fim] com o mesmo conjunto de complementos nas pontas.
+    trechos: List[Tuple[int, int, float, float]] = []
+    pendentes = [(0, unidades, complemento(0), complemento(unidades))]
+    while pendentes:
+        inicio, fim, (regime_ini, valor_ini), (regime_fim, valor_fim) = pendentes.pop()
+        if regime_ini == regime_fim or fim - inicio <= 1:
+            trechos.append((inicio, fim, valor_ini, valor_fim))
+            continue
+        meio = (inicio + fim) // 2
+        central = complemento(meio)
+        pendentes.append((inicio, meio, (regime_ini, valor_ini), central))
+        pendentes.append((meio, fim, central, (regime_fim, valor_fim)))
+    trechos.sort()
+    inicios = [trecho[0] for trecho in trechos]
+
+    def valor_complemento(u: int) -> float:
+        inicio, fim, valor_ini, valor_fim = trechos[max(bisect.bisect_right(inicios, u) - 1, 0)]
+        if fim == inicio:
+            return valor_ini
+        return valor_ini + (valor_fim - valor_ini) * (u - inicio) / (fim - inicio)
+
+    # Pontos de quebra: trechos, fim da mochila explícita e mudanças de faixa de excesso.
+    resolucao = max(float(resolucao_excesso), 1e-9)
+    quebras = {0, unidades, limite}
+    for inicio, fim, _, _ in trechos:
+        quebras.update((inicio, fim))
+    faixas = int(excesso_ha(unidades) // resolucao) + 1
+    for faixa in range(faixas + 1):
+        alvo = faixa * resolucao + (1e-9 if faixa == 0 else 0.0)
+        esquerda, direita = 0, unidades + 1
+        while esquerda < direita:
+            meio = (esquerda + direita) // 2
+            if excesso_ha(meio) >= alvo:
+                direita = meio
+            else:
+                esquerda = meio + 1
+        if esquerda <= unidades:
+            quebras.update((max(esquerda - 1, 0), esquerda))
+    pontos = sorted(quebras)
+
+    candidatos = set(range(0, limite + 1))
+    for inicio, fim in zip(pontos, pontos[1:]):
+        inicio = max(inicio, limite)
+        if fim <= inicio:
+            continue
+        for resto in range(melhor_saco):
+            primeiro = inicio + (resto - inicio) % melhor_saco
+            if primeiro > fim:
+                continue
+            ultimo = fim - (fim - resto) % melhor_saco
+            candidatos.update((primeiro, ultimo))
+
+    fronteira: List[Tuple[int, float, int]] = []
+    objetivo_min = float('inf')
+    for u in sorted(candidatos):
+        custo_u = custo_sacos(u)
+        if custo_u == float('inf'):
+            continue
+        objetivo = custo_u / area + valor_complemento(u)
+        if objetivo >= objetivo_min - 1e-9:
+            continue
+        objetivo_min = objetivo
+        excesso = excesso_ha(u)
+        faixa = -1 if excesso <= 1e-9 else int(excesso // resolucao)
+        # Mesma faixa de excesso com objetivo menor: a opção anterior fica dominada.
+        if fronteira and fronteira[-1][2] == faixa:
+            fronteira.pop()
+        fronteira.append((u, objetivo, faixa))
+
+    opcoes: List[OpcaoSacos] = []
+    for u, objetivo, _ in fronteira:
+        t = base_mochila(u)
+        sacos: Dict[int, int] = {}
+        if u > t:
+            sacos[melhor_saco * mdc] = (u - t) // melhor_saco
+        while t > 0:
+            passo = escolha[t]
+            sacos[passo * mdc] = sacos.get(passo * mdc, 0) + 1
+            t -= passo
+        massa = massa_ha(u)
+        nome = f"{nome_formulado} (sacos definidos: {_descrever_sacos(sacos)})"
+        resultado = _misto_por_massa(
+            demanda, grade, massa, nome, modo_individual, fosfatado_codigo, potassico_codigo
+        )
+        custo_ha = objetivo if usa_custo else None
+        if usa_custo:
+            resultado = FertilizacaoResultado(resultado.produtos, resultado.alertas, resultado.faltantes, custo=custo_ha)
+        excesso = {}
+        for nutriente, req, teor in (('P2O5', p_req, p_frac), ('K2O', k_req, k_frac)):
+            if massa * teor - req > 1e-9:
+                excesso[nutriente] = massa * teor - req
+        massa_total = sum(kg for _, kg in resultado.produtos)
+        opcoes.append(OpcaoSacos(MappingProxyType(sacos), massa, MappingProxyType(excesso), custo_ha, massa_total, resultado))
+    return opcoes
+
+
+_CASAS_CHAVE = 6
+CACHE_TAMANHO_PADRAO = 128
+
+
+def _num_chave(valor) -> float:
+    try:
+        numero = float(valor or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+    return round(numero, _CASAS_CHAVE) + 0.0
+
+
+def _mapa_chave(valores: Mapping[str, float] | None) -> Tuple[Tuple[str, float], ...]:
+    return tuple(sorted((chave, _num_chave(valor)) for chave, valor in (valores or {}).items()))
+
+
+# Opções de :func:`resolver` (as mesmas da aba de fertilização).
+MODOS: Tuple[str, ...] = ('Fertilizantes formulados', 'Fertilizantes individuais', 'Misto', 'Menor custo')
+SUBMODOS: Tuple[str, ...] = ('Escolha do usuario', 'Escolha do software')
+
+
+def modo_conhecido(modo: str, submodo: str = '') -> bool:
+    """Se `modo` (e `submodo`, quando dado) está entre :data:`MODOS`/:data:`SUBMODOS`.
+
+    Não diferencia maiúsculas nem acentos, como :func:`chave_calculo`.
+    """
+    if _normalize_name(modo) not in {_normalize_name(item) for item in MODOS}:
+        return False
+    return not submodo or _normalize_name(submodo) in {_normalize_name(item) for item in SUBMODOS}
+
+
+def chave_calculo(
+    modo: str,
+    demanda: Mapping[str, float],
+    grade: Mapping[str, float] | None = None,
+    nome_formulado: str = '',
+    sacos_50kg: float = 0.0,
+    submodo: str = '',
+    fosfatado_codigo: str | None = None,
+    potassico_codigo: str | None = None,
+    precos: Mapping[str, float] | None = None,
+) -> Tuple[Hashable, ...]:
+    """Retrato normalizado e hashable das entradas de :func:`resolver`."""
+    modo_norm = _normalize_name(modo)
+    submodo_norm = _normalize_name(submodo)
+    grade_chave = _mapa_chave({k: (grade or {}).get(k, 0.0) for k in ('P2O5', 'K2O')})
+    if modo_norm.startswith('menor custo'):
+        grade_n = _num_chave((grade or {}).get('N', 0.0))
+        return ('otimizado', _mapa_chave(demanda), grade_chave, grade_n, nome_formulado, _mapa_chave(precos))
+    if modo_norm.startswith('fertilizantes form'):
+        return ('formulado', _mapa_chave(demanda), grade_chave, nome_formulado)
+    if modo_norm.startswith('misto'):
+        return (
+            'misto',
+            _mapa_chave(demanda),
+            grade_chave,
+            nome_formulado,
+            _num_chave(max(sacos_50kg, 0.0)),
+            submodo_norm,
+            fosfatado_codigo or None,
+            potassico_codigo or None,
+        )
+    if submodo_norm.startswith('escolha do usuario'):
+        return ('individual_usuario', _mapa_chave(demanda), fosfatado_codigo or None, potassico_codigo or None)
+    return ('individual_software', _mapa_chave(demanda))
+
+
+class CacheCalculos:
+    """Cache LRU limitado para os resultados de :func:`resolver`."""
+
+    def __init__(self, tamanho: int = CACHE_TAMANHO_PADRAO) -> None:
+        self.tamanho = max(int(tamanho), 0)
+        self._itens: OrderedDict[Tuple[Hashable, ...], FertilizacaoResultado] = OrderedDict()
+        self.acertos = 0
+        self.falhas = 0
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def obter(self, chave: Tuple[Hashable, ...]) -> Optional[FertilizacaoResultado]:
+        resultado = self._itens.get(chave)
+        if resultado is None:
+            self.falhas += 1
+            return None
+        self._itens.move_to_end(chave)
+        self.acertos += 1
+        return resultado
+
+    def guardar(self, chave: Tuple[Hashable, ...], resultado: FertilizacaoResultado) -> None:
+        if self.tamanho <= 0:
+            return
+        self._itens[chave] = resultado
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.tamanho:
+            self._itens.popitem(last=False)
+
+    def limpar(self) -> None:
+        self._itens.clear()
+        self.acertos = 0
+        self.falhas = 0
+
+    def taxa_acerto(self) -> float:
+        total = self.acertos + self.falhas
+        return self.acertos / total if total else 0.0
+
+    def estatisticas(self) -> Dict[str, float]:
+        return {
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+            'taxa_acerto': self.taxa_acerto(),
+            'itens': len(self._itens),
+            'tamanho': self.tamanho,
+        }
+
+
+CACHE_CALCULOS = CacheCalculos()
+
+
+def resolver(
+    modo: str,
+    demanda: Mapping[str, float],
+    grade: Mapping[str, float] | None = None,
+    nome_formulado: str = '',
+    sacos_50kg: float = 0.0,
+    submodo: str = '',
+    fosfatado_codigo: str | None = None,
+    potassico_codigo: str | None = None,
+    precos: Mapping[str, float] | None = None,
+    cache: CacheCalculos | None = CACHE_CALCULOS,
+) -> FertilizacaoResultado:
+    """Despacha para o cálculo do modo escolhido, reaproveitando resultados já calculados."""
+    chave = chave_calculo(
+        modo, demanda, grade, nome_formulado, sacos_50kg, submodo, fosfatado_codigo, potassico_codigo, precos
+    )
+    if cache is not None:
+        resultado = cache.obter(chave)
+        if resultado is not None:
+            return resultado
+
+    demanda_dict = dict(demanda)
+    grade_dict = dict(grade or {})
+    tipo = chave[0]
+    if tipo == 'formulado':
+        resultado = calcular_formulado(demanda_dict, grade_dict, nome_formulado)
+    elif tipo == 'misto':
+        resultado = calcular_misto(
+            demanda_dict,
+            grade_dict,
+            float(sacos_50kg or 0.0),
+            nome_formulado,
+            submodo,
+            fosfatado_codigo,
+            potassico_codigo,
+        )
+    elif tipo == 'otimizado':
+        formulados: Tuple[Fertilizante, ...] = ()
+        if grade_dict.get('P2O5', 0.0) > 0 or grade_dict.get('K2O', 0.0) > 0:
+            formulados = (formulado_de_grade(grade_dict, nome_formulado or 'Formulado'),)
+        resultado = calcular_otimizado(demanda_dict, dict(precos or {}), formulados)
+    elif tipo == 'individual_usuario':
+        resultado = calcular_individual_usuario(demanda_dict, fosfatado_codigo, potassico_codigo)
+    else:
+        resultado = calcular_individual_software(demanda_dict)
+
+    if cache is not None:
+        cache.guardar(chave, resultado)
+    return resultado
+
+
 __all__ = [
+    'CACHE_CALCULOS',
+    'CATALOGO',
+    'CODIGO_FORMULADO',
+    'CacheCalculos',
     'Fertilizante',
     'FertilizacaoResultado',
     'FOSFATADOS',
@@ -311,10 +967,24 @@ __all__ = [
     'POTASSICOS_CHOICES',
     'GESSO_PADRAO',
     'MOLIBDATO_PADRAO',
+    'MODOS',
+    'OpcaoSacos',
+    'PRODUTOS_OTIMIZACAO',
+    'SUBMODOS',
+    'SugestaoFormulado',
+    'buscar_formulados',
     'calcular_formulado',
     'calcular_misto',
     'calcular_individual_usuario',
     'calcular_individual_software',
+    'calcular_otimizado',
+    'carregar_catalogo',
+    'chave_calculo',
+    'formulado_de_grade',
+    'modo_conhecido',
+    'obter_formulado_por_nome',
     'obter_fosfatado_por_nome',
     'obter_potassico_por_nome',
+    'otimizar_sacos',
+    'resolver',
 ]
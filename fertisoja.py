@@ -2,10 +2,14 @@
 """Interface principal do Fertisoja."""
 from __future__ import annotations
 
-import customtkinter as ctk
+from core import importtime
 
-from core.context import AppContext, TabHost
-from core.design_constants import (
+importtime.instalar_se_ativo()
+
+import customtkinter as ctk  # noqa: E402
+
+from core.context import AgendadorRecalculo, AppContext, TabHost  # noqa: E402
+from core.design_constants import (  # noqa: E402
     BACKGROUND_DARK,
     BACKGROUND_LIGHT,
     CARD_BORDER_COLOR,
@@ -23,7 +27,7 @@ from core.design_constants import (
     PRIMARY_BLUE,
     PRIMARY_HOVER,
 )
-from core.intro_overlay import IntroOverlay
+from core.intro_overlay import IntroOverlay  # noqa: E402
 
 
 def main() -> None:
@@ -90,7 +94,6 @@ def main() -> None:
         aba_recomendacao_calcario,
         aba_exportacao,
         aba_resultados,
-        aba_mapa_area,
     )
 
     ctx = AppContext(
@@ -101,15 +104,52 @@ def main() -> None:
         labels_resultado={},
         cultivo_var=ctk.StringVar(value="1º Cultivo"),
         calcular=lambda: False,
+        agendador=AgendadorRecalculo(janela.after_idle),
     )
 
+    # Grafo de recálculo: cada etapa roda no máximo uma vez por tique, depois
+    # das etapas das quais lê dados.
+    ctx.agendador.registrar("condicoes", lambda: aba_condicoes.atualizar(ctx))
+    ctx.agendador.registrar("adubacao", lambda: aba_adubacao.atualizar(ctx), entradas=("condicoes",))
+    ctx.agendador.registrar(
+        "fertilizacao",
+        lambda: aba_fertilizacao.atualizar_fertilizacao(ctx),
+        entradas=("adubacao",),
+    )
+    ctx.agendador.registrar("resultados", lambda: aba_resultados.atualizar(ctx), entradas=("fertilizacao",))
+
+    def _construir_condicoes() -> None:
+        aba_condicoes.add_tab(tabhost, ctx)
+        aba_condicoes.atualizar(ctx)
+
+    def _construir_adubacao() -> None:
+        aba_adubacao.add_tab(tabhost, ctx)
+        aba_adubacao.atualizar(ctx)
+
+    # Só a primeira aba é construída agora; as demais ficam reservadas e são
+    # montadas no primeiro clique (com as abas das quais dependem os dados).
     aba_dados.add_tab(tabhost, ctx)
-    aba_condicoes.add_tab(tabhost, ctx)
-    aba_recomendacao_calcario.add_tab(tabhost, ctx)
-    aba_adubacao.add_tab(tabhost, ctx)
-    aba_fertilizacao.add_tab(tabhost, ctx)
-    aba_resultados.add_tab(tabhost, ctx)
-    aba_exportacao.add_tab(tabhost, ctx)
+    tabhost.adiar_tab(aba_condicoes.TITULO, _construir_condicoes)
+    tabhost.adiar_tab(
+        aba_recomendacao_calcario.TITULO,
+        lambda: aba_recomendacao_calcario.add_tab(tabhost, ctx),
+    )
+    tabhost.adiar_tab(aba_adubacao.TITULO, _construir_adubacao)
+    tabhost.adiar_tab(
+        aba_fertilizacao.TITULO,
+        lambda: aba_fertilizacao.add_tab(tabhost, ctx),
+        depende_de=(aba_adubacao.TITULO,),
+    )
+    tabhost.adiar_tab(
+        aba_resultados.TITULO,
+        lambda: aba_resultados.add_tab(tabhost, ctx),
+        depende_de=(aba_recomendacao_calcario.TITULO, aba_fertilizacao.TITULO),
+    )
+    tabhost.adiar_tab(
+        aba_exportacao.TITULO,
+        lambda: aba_exportacao.add_tab(tabhost, ctx),
+        depende_de=(aba_condicoes.TITULO, aba_resultados.TITULO),
+    )
     # aba_mapa_area.add_tab(tabhost, ctx)
 
     tab_segment = tabview._segmented_button  # noqa: SLF001
@@ -136,6 +176,7 @@ def main() -> None:
                 btn.configure(fg_color=inactive_color, hover_color=PLANT_COLOR)
 
     def _on_tab_click(name: str) -> None:
+        tabhost.garantir_tab(name)
         tabview.set(name)
         _sync_buttons(name)
 
@@ -174,17 +215,18 @@ def main() -> None:
     _build_row(bottom_row, 1, center=True)
 
     def _on_tab_change(name: str) -> None:
+        tabhost.garantir_tab(name)
         _sync_buttons(name)
 
     tabview.configure(command=_on_tab_change)
     if tab_names:
         _sync_buttons(tab_names[0])
 
-    aba_condicoes.atualizar(ctx)
-    aba_adubacao.atualizar(ctx)
+    ctx.marcar_recalculo("condicoes")
 
     ctx.intro_overlay = IntroOverlay(tab_container)
 
+    janela.after_idle(importtime.emitir_se_ativo)
     janela.mainloop()
 
 
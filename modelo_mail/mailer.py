@@ -1,6 +1,4 @@
 import os
-import smtplib
-import ssl
 import random
 from email.mime.base import MIMEBase
 from email.mime.multipart import MIMEMultipart
@@ -9,25 +7,57 @@ from email import encoders
 from datetime import datetime
 from typing import List
 
-import pandas as pd
-from dotenv import load_dotenv
-
-load_dotenv()
-
 # =============================
 # Configs do .env
 # =============================
-EMAIL_FROM = os.getenv("EMAIL_FROM", "").strip()
-EMAIL_TO_PRIMARY = os.getenv("EMAIL_TO_PRIMARY", "").strip()
-EMAIL_TO_SECONDARY = os.getenv("EMAIL_TO_SECONDARY", "").strip()
-SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com").strip()
-SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
-SMTP_USER = os.getenv("SMTP_USER", "").strip()
-SMTP_PASS = os.getenv("SMTP_PASS", "").strip()
-SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").strip().lower() == "true"
-EMAIL_SUBJECT_BASE = os.getenv("EMAIL_SUBJECT_BASE", "Acompanhamento Diesel & Petróleo").strip()
-SHEET_PATH = os.getenv("SHEET_PATH", "data/planilha_unica.xlsx").strip()
-EMAIL_DAY = (os.getenv("EMAIL_DAY", "FRI").strip() or "FRI").upper()
+# O .env (python-dotenv) só é lido no primeiro acesso às configurações, para
+# que importar este módulo não carregue dotenv/pandas no caminho de startup.
+_CONFIG_NAMES = (
+    "EMAIL_FROM",
+    "EMAIL_TO_PRIMARY",
+    "EMAIL_TO_SECONDARY",
+    "SMTP_HOST",
+    "SMTP_PORT",
+    "SMTP_USER",
+    "SMTP_PASS",
+    "SMTP_USE_TLS",
+    "EMAIL_SUBJECT_BASE",
+    "SHEET_PATH",
+    "EMAIL_DAY",
+)
+_CONFIG_CACHE: dict | None = None
+
+
+def _config() -> dict:
+    global _CONFIG_CACHE
+    if _CONFIG_CACHE is not None:
+        return _CONFIG_CACHE
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    _CONFIG_CACHE = {
+        "EMAIL_FROM": os.getenv("EMAIL_FROM", "").strip(),
+        "EMAIL_TO_PRIMARY": os.getenv("EMAIL_TO_PRIMARY", "").strip(),
+        "EMAIL_TO_SECONDARY": os.getenv("EMAIL_TO_SECONDARY", "").strip(),
+        "SMTP_HOST": os.getenv("SMTP_HOST", "smtp.gmail.com").strip(),
+        "SMTP_PORT": int(os.getenv("SMTP_PORT", "587")),
+        "SMTP_USER": os.getenv("SMTP_USER", "").strip(),
+        "SMTP_PASS": os.getenv("SMTP_PASS", "").strip(),
+        "SMTP_USE_TLS": os.getenv("SMTP_USE_TLS", "true").strip().lower() == "true",
+        "EMAIL_SUBJECT_BASE": os.getenv("EMAIL_SUBJECT_BASE", "Acompanhamento Diesel & Petróleo").strip(),
+        "SHEET_PATH": os.getenv("SHEET_PATH", "data/planilha_unica.xlsx").strip(),
+        "EMAIL_DAY": (os.getenv("EMAIL_DAY", "FRI").strip() or "FRI").upper(),
+    }
+    return _CONFIG_CACHE
+
+
+def __getattr__(name: str):
+    # Mantém mailer.EMAIL_FROM, mailer.SMTP_HOST etc. acessíveis como antes.
+    if name in _CONFIG_NAMES:
+        return _config()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 _DAY_MAP = {"MON": 0, "TUE": 1, "WED": 2, "THU": 3, "FRI": 4, "SAT": 5, "SUN": 6}
 
@@ -69,11 +99,12 @@ def _recipients(override: List[str] | None = None) -> List[str]:
             raise RuntimeError("Lista de destinatários vazia")
         return recips
 
+    cfg = _config()
     recips = []
-    if EMAIL_TO_PRIMARY:
-        recips.append(EMAIL_TO_PRIMARY)
-    if EMAIL_TO_SECONDARY:
-        recips.append(EMAIL_TO_SECONDARY)
+    if cfg["EMAIL_TO_PRIMARY"]:
+        recips.append(cfg["EMAIL_TO_PRIMARY"])
+    if cfg["EMAIL_TO_SECONDARY"]:
+        recips.append(cfg["EMAIL_TO_SECONDARY"])
     if not recips:
         raise RuntimeError("Nenhum destinatário definido (EMAIL_TO_PRIMARY/EMAIL_TO_SECONDARY)")
     return recips
@@ -95,7 +126,7 @@ def _fmt_pct(x):
 
 def _compose_subject(ref_date: str) -> str:
     # ref_date: YYYY-MM-DD
-    return f"{EMAIL_SUBJECT_BASE} – Semana de {ref_date}"
+    return f"{_config()['EMAIL_SUBJECT_BASE']} – Semana de {ref_date}"
 
 
 def _weekly_seed(date_str: str) -> int:
@@ -103,6 +134,8 @@ def _weekly_seed(date_str: str) -> int:
     Gera uma semente determinística por semana ISO,
     para o sorteio ser reprodutível dentro da mesma semana.
     """
+    import pandas as pd
+
     dt = pd.to_datetime(date_str)
     iso = dt.isocalendar()  # tem .year e .week
     return int(f"{iso.year}{int(iso.week):02d}")
@@ -113,12 +146,51 @@ def _pick_weekly(name_list: List[str], seed: int, salt: int) -> str:
     return rng.choice(name_list) if name_list else "—"
 
 
-def _compose_body(df: pd.DataFrame) -> str:
-    if df.empty:
+def _is_missing(x) -> bool:
+    if x is None:
+        return True
+    if isinstance(x, str):
+        return x.strip() == ""
+    try:
+        return x != x  # NaN
+    except Exception:
+        return False
+
+
+def _read_header_and_last_row(sheet_path: str) -> tuple[List[str], dict | None]:
+    """Lê apenas o cabeçalho e a última linha preenchida da primeira aba.
+
+    A planilha é percorrida em modo read-only (streaming), mantendo em memória
+    somente o cabeçalho e a linha corrente; o custo não depende do histórico.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(sheet_path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+        header_row = next(rows, None)
+        if header_row is None:
+            return [], None
+        header = [str(h).strip() if h is not None else "" for h in header_row]
+        last = None
+        for row in rows:
+            if row and any(not _is_missing(v) for v in row):
+                last = row
+    finally:
+        wb.close()
+
+    if last is None:
+        return header, None
+    values = dict(zip(header, last))
+    return header, {k: v for k, v in values.items() if k}
+
+
+def _compose_body(last: dict | None) -> str:
+    if not last:
         return "Planilha vazia."
 
     # Última linha como referência
-    last = df.iloc[-1]
     data = str(last.get("Data", "-"))
     brent = _fmt_money(last.get("Petróleo Barril (USD)", "-"))
     diesel = _fmt_money(last.get("Diesel Barril (USD)", "-"))
@@ -127,8 +199,8 @@ def _compose_body(df: pd.DataFrame) -> str:
     spread_abs = last.get("Spread Absoluto Semanal (USD)", None)
     spread_pct = last.get("Diferença Relativa Semanal (%)", None)
 
-    spread_abs_s = _fmt_money(spread_abs) if pd.notna(spread_abs) else "-"
-    spread_pct_s = _fmt_pct(spread_pct) if pd.notna(spread_pct) else "-"
+    spread_abs_s = _fmt_money(spread_abs) if not _is_missing(spread_abs) else "-"
+    spread_pct_s = _fmt_pct(spread_pct) if not _is_missing(spread_pct) else "-"
 
     # Sorteio semanal reprodutível
     seed = _weekly_seed(data)
@@ -170,41 +242,45 @@ def _attach_file(msg: MIMEMultipart, file_path: str, attach_name: str | None = N
 
 
 def send_weekly_email(sheet_path: str | None = None, recipients: List[str] | None = None) -> None:
-    sheet = sheet_path or SHEET_PATH
+    cfg = _config()
+    sheet = sheet_path or cfg["SHEET_PATH"]
     if not os.path.exists(sheet):
         raise FileNotFoundError(f"Planilha não encontrada: {sheet}")
 
-    # Carrega planilha
-    df = pd.read_excel(sheet)
+    # Carrega só o cabeçalho e a última linha da planilha
+    _, last = _read_header_and_last_row(sheet)
 
     # Data para o assunto: última linha
-    ref_date = str(df.iloc[-1]["Data"]) if not df.empty else datetime.today().strftime("%Y-%m-%d")
+    ref_date = str(last.get("Data", "-")) if last else datetime.today().strftime("%Y-%m-%d")
 
     # Monta e-mail
     msg = MIMEMultipart()
-    msg["From"] = EMAIL_FROM
+    msg["From"] = cfg["EMAIL_FROM"]
     resolved_recipients = _recipients(recipients)
     msg["To"] = ", ".join(resolved_recipients)
     msg["Subject"] = _compose_subject(ref_date)
-    msg.attach(MIMEText(_compose_body(df), "plain"))
+    msg.attach(MIMEText(_compose_body(last), "plain"))
 
     # Anexo
     _attach_file(msg, sheet)
 
+    import smtplib
+    import ssl
+
     # Envio SMTP (TLS por padrão)
-    if SMTP_USE_TLS and SMTP_PORT != 465:
+    if cfg["SMTP_USE_TLS"] and cfg["SMTP_PORT"] != 465:
         context = ssl.create_default_context()
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
+        with smtplib.SMTP(cfg["SMTP_HOST"], cfg["SMTP_PORT"]) as server:
             server.ehlo()
             server.starttls(context=context)
-            server.login(SMTP_USER, SMTP_PASS)
-            server.sendmail(EMAIL_FROM, resolved_recipients, msg.as_string())
+            server.login(cfg["SMTP_USER"], cfg["SMTP_PASS"])
+            server.sendmail(cfg["EMAIL_FROM"], resolved_recipients, msg.as_string())
     else:
         # SSL direto (porta 465)
         context = ssl.create_default_context()
-        with smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, context=context) as server:
-            server.login(SMTP_USER, SMTP_PASS)
-            server.sendmail(EMAIL_FROM, resolved_recipients, msg.as_string())
+        with smtplib.SMTP_SSL(cfg["SMTP_HOST"], cfg["SMTP_PORT"], context=context) as server:
+            server.login(cfg["SMTP_USER"], cfg["SMTP_PASS"])
+            server.sendmail(cfg["EMAIL_FROM"], resolved_recipients, msg.as_string())
 
     print("✅ E-mail enviado com sucesso para:", ", ".join(resolved_recipients))
 
@@ -0,0 +1,171 @@
+import io
+import json
+import random
+import struct
+import zipfile
+
+import pytest
+
+from core import contornos
+from core.contornos import _features_geojson, ler_contorno
+
+# Trechos que confundem uma varredura ingênua: estrutura dentro de strings,
+# escapes (inclusive no fim de um bloco) e a própria palavra "features".
+_TRECHOS = ['{', '}', '[', ']', '"', '\\', ':', ',', ' ', '\n', 'é', ' ', '😀', 'features', '"features"', 'a']
+
+
+def _texto(rnd):
+    return ''.join(rnd.choice(_TRECHOS) for _ in range(rnd.randint(0, 8)))
+
+
+def _valor(rnd, profundidade=0):
+    tipo = rnd.randint(0, 6 if profundidade < 3 else 3)
+    if tipo == 0:
+        return _texto(rnd)
+    if tipo == 1:
+        return rnd.choice([0, -1, 2.5e-7, 1e300, 123456789])
+    if tipo == 2:
+        return rnd.choice([True, False, None])
+    if tipo == 3:
+        return 'features'
+    if tipo == 4:
+        return [_valor(rnd, profundidade + 1) for _ in range(rnd.randint(0, 3))]
+    chaves = ['features', 'type', _texto(rnd), _texto(rnd)]
+    return {rnd.choice(chaves): _valor(rnd, profundidade + 1) for _ in range(rnd.randint(0, 3))}
+
+
+def _feature(rnd):
+    anel = [[rnd.uniform(-180, 180), rnd.uniform(-90, 90)] for _ in range(rnd.randint(3, 6))]
+    return {
+        'type': 'Feature',
+        'properties': {_texto(rnd): _valor(rnd) for _ in range(rnd.randint(0, 4))},
+        'geometry': {'type': 'Polygon', 'coordinates': [anel + anel[:1]]},
+    }
+
+
+def _documento(rnd):
+    if rnd.random() < 0.1:
+        return _feature(rnd)
+    topo = {_texto(rnd) or 'x': _valor(rnd) for _ in range(rnd.randint(0, 3))}
+    topo.pop('features', None)
+    if rnd.random() < 0.3:
+        topo['crs'] = {'properties': {'features': [_valor(rnd)], 'name': 'features'}}
+    itens = list(topo.items()) + [('features', [_feature(rnd) for _ in range(rnd.randint(0, 5))])]
+    rnd.shuffle(itens)
+    return dict([('type', 'FeatureCollection')] + itens)
+
+
+def _serializar(rnd, doc):
+    return json.dumps(
+        doc,
+        ensure_ascii=rnd.random() < 0.5,
+        indent=rnd.choice([None, 0, 2, '\t']),
+        separators=rnd.choice([None, (',', ':'), (' ,  ', ' :\n')]),
+    )
+
+
+def _esperado(doc):
+    if isinstance(doc.get('features'), list):
+        return doc['features']
+    return [doc]
+
+
+@pytest.mark.parametrize('bloco', [1, 2, 3, 7, 64])
+def test_features_geojson_igual_ao_json_load(monkeypatch, bloco):
+    monkeypatch.setattr(contornos, 'BLOCO_LEITURA', bloco)
+    rnd = random.Random(bloco)
+    for _ in range(300):
+        doc = _documento(rnd)
+        texto = _serializar(rnd, doc)
+        assert list(_features_geojson(io.StringIO(texto))) == _esperado(json.loads(texto)), texto
+
+
+def test_geojson_truncado_falha(monkeypatch):
+    monkeypatch.setattr(contornos, 'BLOCO_LEITURA', 4)
+    rnd = random.Random(7)
+    texto = json.dumps({'type': 'FeatureCollection', 'crs': _valor(rnd), 'features': [_feature(rnd), _feature(rnd)]})
+    # A leitura para no ']' de "features"; qualquer corte antes dele é erro.
+    for corte in range(texto.rindex(']') + 1):
+        with pytest.raises(ValueError):
+            list(_features_geojson(io.StringIO(texto[:corte])))
+
+
+def test_ler_geojson_com_furo_e_multipoligono(tmp_path):
+    quadrado = [[0.0, 0.0], [0.01, 0.0], [0.01, 0.01], [0.0, 0.01], [0.0, 0.0]]
+    furo = [[0.004, 0.004], [0.006, 0.004], [0.006, 0.006], [0.004, 0.006], [0.004, 0.004]]
+    deslocado = [[x + 1.0, y] for x, y in quadrado]
+    caminho = tmp_path / 'talhoes.geojson'
+    caminho.write_text(json.dumps({
+        'type': 'FeatureCollection',
+        'features': [
+            {'type': 'Feature', 'properties': {}, 'geometry': {'type': 'Polygon', 'coordinates': [quadrado, furo]}},
+            {'type': 'Feature', 'properties': {}, 'geometry': {'type': 'MultiPolygon', 'coordinates': [[deslocado]]}},
+        ],
+    }), encoding='utf-8')
+    area, polys = ler_contorno(str(caminho))
+    assert [len(p['inner']) for p in polys] == [1, 0]
+    assert len(polys[0]['outer'][0]) == 4  # anel aberto
+    lado = 0.01 * 6_371_000.0 * 3.141592653589793 / 180.0
+    assert area == pytest.approx(lado * lado * (2 - 0.04), rel=1e-3)
+
+
+def _registro_poligono(aneis):
+    pontos = [p for anel in aneis for p in anel]
+    xs, ys = [p[0] for p in pontos], [p[1] for p in pontos]
+    partes, inicio = [], 0
+    for anel in aneis:
+        partes.append(inicio)
+        inicio += len(anel)
+    return (
+        struct.pack('<i4d2i', 5, min(xs), min(ys), max(xs), max(ys), len(aneis), len(pontos))
+        + struct.pack(f'<{len(partes)}i', *partes)
+        + struct.pack(f'<{2 * len(pontos)}d', *(c for p in pontos for c in p))
+    )
+
+
+def _cabecalho(comprimento_bytes):
+    return struct.pack('>7i', 9994, 0, 0, 0, 0, 0, comprimento_bytes // 2) + struct.pack('<2i8d', 1000, 5, *[0.0] * 8)
+
+
+def _gravar_shp(base, registros):
+    conteudos = [_registro_poligono(aneis) for aneis in registros]
+    shp = b''.join(struct.pack('>2i', i, len(c) // 2) + c for i, c in enumerate(conteudos, start=1))
+    offsets, pos = [], 100
+    for c in conteudos:
+        offsets.append(struct.pack('>2i', pos // 2, len(c) // 2))
+        pos += 8 + len(c)
+    base.with_suffix('.shp').write_bytes(_cabecalho(100 + len(shp)) + shp)
+    base.with_suffix('.shx').write_bytes(_cabecalho(100 + 8 * len(offsets)) + b''.join(offsets))
+
+
+# Externo em sentido horário e furo anti-horário, como manda a especificação.
+_EXTERNO = [(0.0, 0.0), (0.0, 0.01), (0.01, 0.01), (0.01, 0.0), (0.0, 0.0)]
+_FURO = [(0.004, 0.004), (0.006, 0.004), (0.006, 0.006), (0.004, 0.006), (0.004, 0.004)]
+_OUTRO = [(1.0, 0.0), (1.0, 0.01), (1.01, 0.01), (1.01, 0.0), (1.0, 0.0)]
+
+
+@pytest.mark.parametrize('forma', ['com_shx', 'sem_shx', 'zip'])
+def test_ler_shapefile(tmp_path, forma):
+    base = tmp_path / 'talhoes'
+    _gravar_shp(base, [[_EXTERNO, _FURO], [_OUTRO]])
+    caminho = base.with_suffix('.shp')
+    if forma == 'sem_shx':
+        base.with_suffix('.shx').unlink()
+    elif forma == 'zip':
+        caminho = tmp_path / 'talhoes.zip'
+        with zipfile.ZipFile(caminho, 'w') as zf:
+            for ext in ('.shp', '.shx'):
+                zf.write(base.with_suffix(ext), 'pasta/talhoes' + ext)
+    area, polys = ler_contorno(str(caminho))
+    assert [(len(p['outer']), len(p['inner'])) for p in polys] == [(1, 1), (1, 0)]
+    assert polys[1]['outer'][0] == _OUTRO[:-1]
+    lado = 0.01 * 6_371_000.0 * 3.141592653589793 / 180.0
+    assert area == pytest.approx(lado * lado * (2 - 0.04), rel=1e-3)
+
+
+def test_shapefile_projetado_rejeitado(tmp_path):
+    base = tmp_path / 'utm'
+    _gravar_shp(base, [[_EXTERNO]])
+    base.with_suffix('.prj').write_text('PROJCS["SIRGAS 2000 / UTM zone 22S",GEOGCS[...]]', encoding='latin-1')
+    with pytest.raises(ValueError, match='projetado'):
+        ler_contorno(str(base.with_suffix('.shp')))
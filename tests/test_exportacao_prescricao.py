@@ -0,0 +1,143 @@
+import json
+import math
+import struct
+import xml.etree.ElementTree as ET
+from array import array
+
+import pytest
+
+from core.contornos import ler_contorno
+from core.exportacao_prescricao import (
+    MG_M2_POR_KG_HA,
+    TAXAS_PADRAO,
+    CamadaTaxa,
+    _bordas,
+    exportar,
+    exportar_isoxml,
+    exportar_shapefile,
+)
+from core.prescricao import R_TERRA, RasterPrescricao
+
+NAN = float('nan')
+LARGURA, ALTURA, RESOLUCAO = 6, 5, 10.0
+
+
+def _raster():
+    """Grade 6x5 perto de Passo Fundo com células fora do talhão e células
+    em que só uma camada tem valor."""
+    lat0 = -28.26
+    x_min = math.radians(-52.41) * math.cos(math.radians(lat0)) * R_TERRA
+    y_max = math.radians(lat0) * R_TERRA
+    camadas = {taxa.camada: array('d') for taxa in TAXAS_PADRAO}
+    for linha in range(ALTURA):
+        for coluna in range(LARGURA):
+            fora = (linha + coluna) % 4 == 0
+            camadas['calcario_t_ha'].append(NAN if fora or coluna == 5 else 1.5 + 0.1 * linha)
+            camadas['P2O5_kg_ha'].append(NAN if fora else 40.0 + coluna)
+            camadas['K2O_kg_ha'].append(NAN if fora or linha == 0 else 60.25 + linha)
+    celulas = sum(1 for v in camadas['P2O5_kg_ha'] if v == v)
+    return RasterPrescricao(RESOLUCAO, LARGURA, ALTURA, x_min, y_max, lat0, celulas, camadas)
+
+
+def _definidas(raster):
+    return [
+        (linha, coluna)
+        for linha in range(raster.altura)
+        for coluna in range(raster.largura)
+        if any(raster.valor(t.camada, linha, coluna) == raster.valor(t.camada, linha, coluna) for t in TAXAS_PADRAO)
+    ]
+
+
+def test_shapefile_relido_pelo_leitor_de_contornos(tmp_path):
+    raster = _raster()
+    caminho = str(tmp_path / 'prescricao.shp')
+    n = exportar_shapefile(raster, caminho)
+    definidas = _definidas(raster)
+    assert n == len(definidas) == raster.celulas
+
+    area, polys = ler_contorno(caminho)
+    assert len(polys) == n
+    assert area == pytest.approx(n * RESOLUCAO * RESOLUCAO, rel=1e-3)
+    lons, lats = _bordas(raster)
+    for (linha, coluna), poly in zip(definidas, polys):
+        assert poly['inner'] == []
+        oeste, norte = poly['outer'][0][0]
+        assert (oeste, norte) == pytest.approx((lons[coluna], lats[linha]))
+
+    shp = (tmp_path / 'prescricao.shp').read_bytes()
+    shx = (tmp_path / 'prescricao.shx').read_bytes()
+    assert struct.unpack('>i', shp[24:28])[0] * 2 == len(shp)
+    assert struct.unpack('>i', shx[24:28])[0] * 2 == len(shx) == 100 + 8 * n
+    oeste, sul, leste, norte = struct.unpack('<4d', shp[36:68])
+    assert (oeste, sul, leste, norte) == pytest.approx((lons[0], lats[-1], lons[-1], lats[0]))
+    for i in range(n):
+        deslocamento, palavras = struct.unpack('>2i', shx[100 + 8 * i:108 + 8 * i])
+        numero, conteudo = struct.unpack('>2i', shp[2 * deslocamento:2 * deslocamento + 8])
+        assert (numero, conteudo) == (i + 1, palavras)
+    assert (tmp_path / 'prescricao.prj').read_text(encoding='ascii').startswith('GEOGCS["GCS_WGS_1984"')
+
+
+def test_dbf_com_as_taxas_das_celulas(tmp_path):
+    raster = _raster()
+    n = exportar_shapefile(raster, str(tmp_path / 'prescricao'))
+    dbf = (tmp_path / 'prescricao.dbf').read_bytes()
+    registros, cabecalho, tamanho = struct.unpack('<IHH', dbf[4:12])
+    assert (registros, cabecalho, tamanho) == (n, 32 + 32 * 3 + 1, 1 + 3 * 12)
+    campos = [dbf[32 + 32 * i:43 + 32 * i].rstrip(b'\x00').decode('ascii') for i in range(3)]
+    assert campos == ['CALCARIO', 'P2O5', 'K2O']
+    assert dbf[cabecalho - 1:cabecalho] == b'\r'
+    assert len(dbf) == cabecalho + n * tamanho + 1 and dbf[-1:] == b'\x1a'
+    for i, (linha, coluna) in enumerate(_definidas(raster)):
+        registro = dbf[cabecalho + i * tamanho:cabecalho + (i + 1) * tamanho]
+        valores = [float(registro[1 + 12 * j:13 + 12 * j]) for j in range(3)]
+        esperados = []
+        for taxa in TAXAS_PADRAO:
+            v = raster.valor(taxa.camada, linha, coluna)
+            esperados.append(0.0 if v != v else round(v * taxa.fator, 3))
+        assert valores == pytest.approx(esperados)
+
+
+def test_geojson_e_camadas_escolhidas(tmp_path):
+    raster = _raster()
+    caminho = tmp_path / 'prescricao.geojson'
+    n = exportar(raster, str(caminho))
+    with open(caminho, encoding='utf-8') as arquivo:
+        features = json.load(arquivo)['features']
+    assert len(features) == n == raster.celulas
+    assert set(features[0]['properties']) == {'CALCARIO', 'P2O5', 'K2O'}
+
+    so_p = exportar(raster, str(tmp_path / 'p.geojson'), camadas={'P2O5_kg_ha': raster.camadas['P2O5_kg_ha']})
+    with open(tmp_path / 'p.geojson', encoding='utf-8') as arquivo:
+        assert [set(f['properties']) for f in json.load(arquivo)['features']] == [{'P2O5'}] * so_p
+    with pytest.raises(ValueError):
+        exportar(raster, str(tmp_path / 'vazio.geojson'), camadas={})
+
+
+def test_isoxml_grade_e_atributos(tmp_path):
+    raster = _raster()
+    taxas = TAXAS_PADRAO[:2] + (CamadaTaxa.de_teor('K2O_kg_ha', 'KCl', 'KCL', 60.0),)
+    n = exportar_isoxml(raster, str(tmp_path), taxas)
+    assert n == len(_definidas(raster))
+
+    grade = (tmp_path / 'GRD00001.BIN').read_bytes()
+    assert len(grade) == LARGURA * ALTURA * 4 * len(taxas)
+    valores = struct.unpack(f'<{LARGURA * ALTURA * len(taxas)}i', grade)
+    for i, linha in enumerate(range(ALTURA - 1, -1, -1)):  # do sul para o norte
+        for coluna in range(LARGURA):
+            for j, taxa in enumerate(taxas):
+                v = raster.valor(taxa.camada, linha, coluna)
+                esperado = 0 if v != v else round(v * taxa.fator * MG_M2_POR_KG_HA)
+                assert valores[(i * LARGURA + coluna) * len(taxas) + j] == esperado
+
+    raiz = ET.parse(tmp_path / 'TASKDATA.XML').getroot()
+    assert [p.get('B') for p in raiz.findall('PDT')] == ['Calcario', 'P2O5', 'KCl']
+    assert [p.get('C') for p in raiz.findall('TSK/TZN/PDV')] == ['PDT1', 'PDT2', 'PDT3']
+    grd = raiz.find('TSK/GRD').attrib
+    assert (grd['E'], grd['F'], grd['G'], grd['H'], grd['I']) == (
+        str(LARGURA), str(ALTURA), 'GRD00001', str(len(grade)), '2'
+    )
+    lons, lats = _bordas(raster)
+    assert float(grd['A']) == pytest.approx(lats[-1], abs=1e-9)
+    assert float(grd['B']) == pytest.approx(lons[0], abs=1e-9)
+    assert float(grd['C']) * ALTURA == pytest.approx(lats[0] - lats[-1], abs=1e-7)
+    assert float(grd['D']) * LARGURA == pytest.approx(lons[-1] - lons[0], abs=1e-7)
@@ -0,0 +1,103 @@
+import dataclasses
+
+import pytest
+
+from core import tabelas_manual
+from core.historico import Historico, RegistroLaudo
+from core.tabelas_manual import carregar_edicao
+
+# P "Muito alto" e K "Medio" pelas tabelas padrão (argila 45%, CTC 12).
+LAUDO = {"P_mg_dm3": 40, "K_mg_dm3": 80, "argila_percent": 45, "CTC_pH7": 12}
+POBRE = {"P_mg_dm3": 2, "K_mg_dm3": 20, "argila_percent": 45, "CTC_pH7": 12}
+
+
+@pytest.fixture
+def historico():
+    with Historico(":memory:") as h:
+        yield h
+
+
+@pytest.fixture
+def edicao_arenosa(monkeypatch):
+    """Edição de teste que interpreta o P de qualquer solo pela faixa da classe 4 de argila."""
+    padrao = carregar_edicao()
+    nome = "Teste arenoso"
+
+    def construir():
+        regras_p = {classe: padrao.regras_p[4] for classe in padrao.regras_p}
+        return dataclasses.replace(padrao, edicao=nome, regras_p=regras_p)
+
+    monkeypatch.setitem(tabelas_manual._CONSTRUTORES, nome, construir)
+    monkeypatch.delitem(tabelas_manual._CARREGADAS, nome, raising=False)
+    return nome
+
+
+def test_lote_e_consultas(historico):
+    boa_vista = historico.fazenda("Boa Vista", "Passo Fundo/RS", "Ana")
+    assert historico.fazenda("Boa Vista", "Passo Fundo/RS") == boa_vista
+    assert historico.conexao.execute("SELECT produtor FROM fazendas").fetchone() == ("Ana",)
+    t7 = historico.talhao(boa_vista, "T7", 42.0)
+    t8 = historico.talhao(boa_vista, "T8")
+    assert historico.talhao(boa_vista, "T7") == t7
+
+    adubacao = {"totais": {"P2O5_total": 120.0, "K2O_total": 90.0}}
+    ids = historico.registrar_lote([
+        RegistroLaudo(t7, "2024/25", POBRE, recomendacoes={"adubacao": adubacao}, data="2024-08-01"),
+        RegistroLaudo(t7, "2024/25", POBRE),
+        RegistroLaudo(t8, "2024/25", LAUDO),
+        RegistroLaudo(t8, "2023/24", POBRE),
+    ])
+    assert ids == [1, 2, 3, 4]
+    assert historico.registrar(RegistroLaudo(t8, "2024/25", LAUDO)) == 5
+
+    assert historico.talhoes_com_classe("P", "Muito baixo", "2024/25") == [{
+        "talhao_id": t7, "talhao": "T7", "fazenda": "Boa Vista", "municipio": "Passo Fundo/RS",
+        "area_ha": 42.0, "laudos": 2,
+    }]
+    assert [t["talhao"] for t in historico.talhoes_com_classe("P", "Muito baixo", "2023/24")] == ["T8"]
+    assert [t["laudos"] for t in historico.talhoes_com_classe("P", "Muito alto", "2024/25")] == [2]
+    assert historico.safras() == ["2023/24", "2024/25"]
+
+    laudos = historico.laudos_do_talhao(t7)
+    assert [laudo["id"] for laudo in laudos] == [1, 2]
+    assert laudos[0]["laudo"] == POBRE and laudos[0]["data"] == "2024-08-01"
+    assert laudos[0]["classes"]["P"] == "Muito baixo"
+    assert laudos[0]["recomendacoes"] == {"adubacao": adubacao}
+    assert [laudo["safra"] for laudo in historico.laudos_do_talhao(t8, "2023/24")] == ["2023/24"]
+    assert historico.conexao.execute(
+        "SELECT p2o5_kg_ha, k2o_kg_ha, calcario_t_ha FROM recomendacoes"
+    ).fetchall() == [(120.0, 90.0, None)]
+
+
+def test_consulta_por_classe_usa_o_indice_de_cobertura(historico):
+    plano = historico.conexao.execute(
+        "EXPLAIN QUERY PLAN SELECT talhao_id, COUNT(*) FROM diagnosticos "
+        "WHERE safra = ? AND nutriente = ? AND classe = ? GROUP BY talhao_id",
+        ("2024/25", "P", "Muito baixo"),
+    ).fetchall()
+    assert any("COVERING INDEX ix_diagnosticos_classe" in linha[-1] for linha in plano), plano
+
+
+def test_classes_pela_edicao_do_registro(historico, edicao_arenosa):
+    talhao = historico.talhao(historico.fazenda("Boa Vista"), "T1")
+    historico.registrar_lote([
+        RegistroLaudo(talhao, "2024/25", LAUDO),
+        RegistroLaudo(talhao, "2024/25", LAUDO, edicao=edicao_arenosa),
+        RegistroLaudo(talhao, "2024/25", LAUDO, edicao=edicao_arenosa),
+    ])
+    laudos = historico.laudos_do_talhao(talhao)
+    assert [(laudo["edicao"], laudo["classes"]["P"]) for laudo in laudos] == [
+        (None, "Muito alto"), (edicao_arenosa, "Alto"), (edicao_arenosa, "Alto"),
+    ]
+
+
+def test_edicao_desconhecida_desfaz_o_lote(historico):
+    talhao = historico.talhao(historico.fazenda("Boa Vista"), "T1")
+    with pytest.raises(KeyError, match="Edição do manual desconhecida"):
+        historico.registrar_lote([
+            RegistroLaudo(talhao, "2024/25", LAUDO),
+            RegistroLaudo(talhao, "2024/25", LAUDO, edicao="CQFS-RS/SC 1900"),
+        ])
+    assert historico.laudos_do_talhao(talhao) == []
+    assert historico.conexao.execute("SELECT COUNT(*) FROM diagnosticos").fetchone() == (0,)
+    assert historico.registrar(RegistroLaudo(talhao, "2024/25", LAUDO)) == 1
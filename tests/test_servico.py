@@ -0,0 +1,128 @@
+import asyncio
+import json
+
+import pytest
+
+from core.servico import CORPO_MAXIMO, ServicoRecomendacao, executar_lote
+
+LAUDO = {"P_mg_dm3": 6, "K_mg_dm3": 80, "argila_percent": 45, "CTC_pH7": 12}
+ADUBACAO = {"laudo": LAUDO, "produtividade": 4}
+FERTILIZACAO = {
+    "modo": "Fertilizantes individuais",
+    "submodo": "Escolha do software",
+    "demanda": {"N": 0, "P2O5": 80, "K2O": 60},
+}
+
+
+def test_executar_lote_isola_os_erros():
+    itens = [
+        ("/v1/adubacao", ADUBACAO),
+        ("/v1/diagnostico", {"laudo": "abc"}),
+        ("/v1/fertilizacao", dict(FERTILIZACAO, modo="individual")),
+        ("/v1/fertilizacao", dict(FERTILIZACAO, submodo="Escolha de ninguem")),
+        ("/v1/fertilizacao", dict(FERTILIZACAO, cache=None)),
+        ("/v1/fertilizacao", FERTILIZACAO),
+        ("/v1/adubacao", dict(ADUBACAO, edicao="inexistente")),
+        ("/v1/calagem", []),
+    ]
+    resultados = executar_lote(itens)
+    assert [status for status, _ in resultados] == [200, 400, 400, 400, 400, 200, 400, 400]
+    assert "laudo" in resultados[1][1]["erro"]
+    assert "modo/submodo desconhecido" in resultados[2][1]["erro"]
+    assert "cache" in resultados[4][1]["erro"]
+    assert [nome for nome, _ in resultados[5][1]["produtos"]] == ["Superfosfato Triplo (TSP)", "Cloreto de Potássio (KCl)"]
+
+
+def _pedido(metodo, alvo, corpo=b"", cabecalhos=()):
+    linhas = [f"{metodo} {alvo} HTTP/1.1", "Host: teste", *cabecalhos]
+    if corpo and not any(c.lower().startswith("content-length") for c in cabecalhos):
+        linhas.append(f"Content-Length: {len(corpo)}")
+    return ("\r\n".join(linhas) + "\r\n\r\n").encode("latin-1") + corpo
+
+
+async def _resposta(leitor):
+    cabecalho = await leitor.readuntil(b"\r\n\r\n")
+    linhas = cabecalho.decode("latin-1").split("\r\n")
+    campos = {}
+    for linha in linhas[1:]:
+        nome, sep, valor = linha.partition(":")
+        if sep:
+            campos[nome.strip().lower()] = valor.strip()
+    corpo = await leitor.readexactly(int(campos["content-length"]))
+    return int(linhas[0].split(" ")[1]), campos, json.loads(corpo)
+
+
+def _com_servico(teste):
+    async def rodar():
+        servico = ServicoRecomendacao("127.0.0.1", 0, 0)
+        await servico.iniciar()
+        try:
+            leitor, escritor = await asyncio.open_connection("127.0.0.1", servico.porta)
+            try:
+                return await teste(leitor, escritor)
+            finally:
+                escritor.close()
+        finally:
+            await servico.encerrar()
+
+    return asyncio.run(rodar())
+
+
+@pytest.fixture(autouse=True)
+def _sem_catalogo(monkeypatch):
+    monkeypatch.delenv("FERTISOJA_CATALOGO", raising=False)
+
+
+def test_conexao_mantida_entre_pedidos():
+    async def teste(leitor, escritor):
+        escritor.write(_pedido("POST", "/v1/adubacao", json.dumps(ADUBACAO).encode()))
+        primeira = await _resposta(leitor)
+        lote = [FERTILIZACAO, dict(FERTILIZACAO, modo="nenhum")]
+        escritor.write(_pedido("POST", "/v1/fertilizacao", json.dumps(lote).encode()))
+        segunda = await _resposta(leitor)
+        escritor.write(_pedido("GET", "/v1/metricas", cabecalhos=["Connection: close"]))
+        terceira = await _resposta(leitor)
+        return primeira, segunda, terceira, await leitor.read()
+
+    primeira, segunda, terceira, resto = _com_servico(teste)
+    assert primeira[0] == 200 and primeira[1]["connection"] == "keep-alive"
+    assert segunda[0] == 200 and [item["status"] for item in segunda[2]] == [200, 400]
+    assert terceira[0] == 200 and terceira[1]["connection"] == "close"
+    assert set(terceira[2]["rotas"]) == {"/v1/adubacao", "/v1/fertilizacao"}
+    assert resto == b""
+
+
+@pytest.mark.parametrize("valor", ["abc", "-5", "1e3", "12 34", "+7", "²"])
+def test_content_length_invalido_responde_400_e_fecha(valor):
+    async def teste(leitor, escritor):
+        escritor.write(_pedido("POST", "/v1/adubacao", b"{}", [f"Content-Length: {valor}"]))
+        return await _resposta(leitor), await leitor.read()
+
+    (status, campos, resposta), resto = _com_servico(teste)
+    assert status == 400 and campos["connection"] == "close"
+    assert resposta == {"erro": "Content-Length inválido"}
+    assert resto == b""
+
+
+@pytest.mark.parametrize(
+    "metodo, alvo, corpo, cabecalhos, esperado",
+    [
+        ("POST", "/v1/fertilizacao", json.dumps(dict(FERTILIZACAO, modo=3)).encode(), [], 400),
+        ("POST", "/v1/diagnostico", b"{nao e json", [], 400),
+        ("GET", "/v1/adubacao", b"", [], 405),
+        ("POST", "/v1/inexistente", b"{}", [], 404),
+        ("POST", "/v1/adubacao", b"", [f"Content-Length: {CORPO_MAXIMO + 1}"], 413),
+        ("GET", "/v1/saude", b"", [], 200),
+    ],
+)
+def test_status_das_rotas(metodo, alvo, corpo, cabecalhos, esperado):
+    async def teste(leitor, escritor):
+        escritor.write(_pedido(metodo, alvo, corpo, ["Connection: close", *cabecalhos]))
+        return await _resposta(leitor)
+
+    status, _, resposta = _com_servico(teste)
+    assert status == esperado
+    if esperado == 200:
+        assert resposta == {"status": "ok", "processos": 0}
+    else:
+        assert resposta["erro"]
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import random
+
+import pytest
+
+from core import servico_tarefas
+from core.servico import CAMPOS_CSV, ROTAS, ServicoRecomendacao, executar_lote
+from core.servico_tarefas import GerenciadorTarefas, LeitorCsv, linhas_do_corpo
+
+CHUNKED = {"transfer-encoding": "chunked"}
+
+
+def _chunked(corpo, rnd, maximo=40):
+    saida, i = [], 0
+    while i < len(corpo):
+        pedaco = corpo[i:i + rnd.randint(1, maximo)]
+        extensao = b";ext=1" if rnd.random() < 0.2 else b""
+        saida.append(b"%x%s\r\n%s\r\n" % (len(pedaco), extensao, pedaco))
+        i += len(pedaco)
+    return b"".join(saida) + b"0\r\n\r\n"
+
+
+def _linhas(dados, campos):
+    async def rodar():
+        leitor = asyncio.StreamReader()
+        leitor.feed_data(dados)
+        leitor.feed_eof()
+        return [linha async for linha in linhas_do_corpo(leitor, campos)]
+
+    return asyncio.run(rodar())
+
+
+def test_linhas_do_corpo_chunked_igual_ao_content_length():
+    rnd = random.Random(3)
+    for _ in range(50):
+        linhas = [bytes(rnd.choice(b'ab{}"\r ') for _ in range(rnd.randint(0, 30))) for _ in range(rnd.randint(0, 20))]
+        corpo = b"\n".join(linhas) + rnd.choice([b"", b"\n"])
+        esperado = corpo.split(b"\n")
+        if esperado[-1] == b"":
+            esperado.pop()
+        assert _linhas(corpo, {"content-length": str(len(corpo))}) == esperado
+        assert _linhas(_chunked(corpo, rnd), CHUNKED) == esperado
+
+
+@pytest.mark.parametrize("bloco", [b"zz\r\n", b"-5\r\nabc\r\n", b"\r\n"])
+def test_tamanho_de_bloco_invalido(bloco):
+    with pytest.raises(ValueError, match="chunked"):
+        _linhas(b"3\r\nab\n\r\n" + bloco, CHUNKED)
+
+
+def test_linha_maior_que_o_limite_sai_como_none(monkeypatch):
+    monkeypatch.setattr(servico_tarefas, "LINHA_MAXIMA", 8)
+    corpo = b"curta\n" + b"x" * 30 + b"\n12345678\n" + b"y" * 9 + b"\nfim"
+    esperado = [b"curta", None, b"12345678", None, b"fim"]
+    assert _linhas(corpo, {"content-length": str(len(corpo))}) == esperado
+    assert _linhas(_chunked(corpo, random.Random(1), 4), CHUNKED) == esperado
+
+
+def test_leitor_csv_separa_o_laudo():
+    leitor = LeitorCsv(CAMPOS_CSV["/v1/adubacao"])
+    assert leitor("P_mg_dm3;K_mg_dm3;produtividade;cultivo;edicao") is None
+    assert leitor("6,5;80;4;;CQFS-RS/SC 2016") == {
+        "laudo": {"P_mg_dm3": 6.5, "K_mg_dm3": 80.0},
+        "produtividade": 4.0,
+        "edicao": "CQFS-RS/SC 2016",
+    }
+
+
+def test_csv_numera_as_linhas_do_arquivo():
+    texto = (
+        "P_mg_dm3,K_mg_dm3,argila_percent,CTC_pH7,produtividade\n"
+        "6,80,45,12,4\n"
+        "\n"
+        "9,abc,45,12,4\n"
+        "12,120,30,9,3.5\n"
+    )
+
+    async def rodar():
+        gerenciador = GerenciadorTarefas(None, executar_lote, ROTAS, CAMPOS_CSV)
+        tarefa = gerenciador.criar("/v1/adubacao")
+
+        async def linhas():
+            for linha in texto.encode().split(b"\n"):
+                yield linha
+
+        try:
+            await gerenciador.receber(tarefa, linhas(), True)
+            with pytest.raises(ValueError):
+                await gerenciador.receber(tarefa, linhas(), True)
+            resultados = b"".join([dados async for dados in tarefa.acompanhar()])
+            return tarefa.status(), [json.loads(linha) for linha in resultados.splitlines()]
+        finally:
+            gerenciador.descartar_todas()
+
+    status, resultados = asyncio.run(rodar())
+    assert [(r["linha"], r["status"]) for r in resultados] == [(2, 200), (4, 400), (5, 200)]
+    laudo = {"P_mg_dm3": 6, "K_mg_dm3": 80, "argila_percent": 45, "CTC_pH7": 12}
+    assert resultados[0]["resultado"] == executar_lote([("/v1/adubacao", {"laudo": laudo, "produtividade": 4})])[0][1]
+    assert status["estado"] == "concluida"
+    assert (status["linhas_recebidas"], status["linhas_processadas"], status["erros"]) == (3, 3, 1)
+
+
+async def _resposta(leitor):
+    cabecalho = await leitor.readuntil(b"\r\n\r\n")
+    linhas = cabecalho.decode("latin-1").split("\r\n")
+    campos = {}
+    for linha in linhas[1:]:
+        nome, sep, valor = linha.partition(":")
+        if sep:
+            campos[nome.strip().lower()] = valor.strip()
+    corpo = [linha async for linha in linhas_do_corpo(leitor, campos)]
+    return int(linhas[0].split(" ")[1]), [json.loads(linha) for linha in corpo if linha]
+
+
+def _com_servico(teste):
+    async def rodar():
+        servico = ServicoRecomendacao("127.0.0.1", 0, 0)
+        await servico.iniciar()
+        try:
+            leitor, escritor = await asyncio.open_connection("127.0.0.1", servico.porta)
+            try:
+                return await teste(leitor, escritor)
+            finally:
+                escritor.close()
+        finally:
+            await servico.encerrar()
+
+    return asyncio.run(rodar())
+
+
+def test_upload_chunked_isola_a_linha_malformada(monkeypatch):
+    monkeypatch.delenv("FERTISOJA_CATALOGO", raising=False)
+    laudo = {"laudo": {"P_mg_dm3": 6, "K_mg_dm3": 80, "argila_percent": 45, "CTC_pH7": 12}, "produtividade": 4}
+    linhas = [json.dumps(laudo)] * 5000
+    linhas[1233] = '{"laudo": {"P_mg_dm3": 6,'
+    linhas[2999] = ""
+    corpo = ("\n".join(linhas) + "\n").encode()
+
+    async def teste(leitor, escritor):
+        escritor.write(b"POST /v1/tarefas?rota=adubacao HTTP/1.1\r\nHost: teste\r\n\r\n")
+        status, (criada,) = await _resposta(leitor)
+        assert status == 202
+        escritor.write(
+            f"POST /v1/tarefas/{criada['id']}/dados HTTP/1.1\r\nHost: teste\r\n"
+            "Transfer-Encoding: chunked\r\n\r\n".encode() + _chunked(corpo, random.Random(5), 5000)
+        )
+        status, (recebida,) = await _resposta(leitor)
+        assert status == 202
+        escritor.write(
+            f"GET /v1/tarefas/{criada['id']}/resultados HTTP/1.1\r\nHost: teste\r\nConnection: close\r\n\r\n".encode()
+        )
+        return recebida, await _resposta(leitor)
+
+    recebida, (status, resultados) = _com_servico(teste)
+    assert status == 200 and recebida["linhas_recebidas"] == 4999
+    resultados.sort(key=lambda r: r["linha"])
+    assert [r["linha"] for r in resultados] == [n for n in range(1, 5001) if n != 3000]
+    assert [r["linha"] for r in resultados if r["status"] != 200] == [1234]
+    assert resultados[1233]["resultado"]["erro"].startswith("Linha inválida")
+
+
+def test_upload_com_bloco_invalido_responde_400():
+    async def teste(leitor, escritor):
+        escritor.write(
+            b"POST /v1/tarefas?rota=diagnostico HTTP/1.1\r\nHost: teste\r\n"
+            b"Transfer-Encoding: chunked\r\n\r\n2\r\n{}\r\nzz\r\n"
+        )
+        cabecalho = await leitor.readuntil(b"\r\n\r\n")
+        return cabecalho, await leitor.read()
+
+    cabecalho, corpo = _com_servico(teste)
+    assert cabecalho.startswith(b"HTTP/1.1 400 ") and b"Connection: close" in cabecalho
+    assert "Tamanho de bloco chunked inválido" in json.loads(corpo)["erro"]
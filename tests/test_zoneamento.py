@@ -0,0 +1,29 @@
+import pytest
+
+from core import zoneamento
+from core.zoneamento import zonear
+
+
+def _colunas(valores_p, valores_k):
+    n = len(valores_p)
+    return {'P': list(valores_p), 'K': list(valores_k), 'argila': [30.0] * n, 'CTC': [10.0] * n}
+
+
+@pytest.fixture(params=[True, False], ids=['numpy', 'python'])
+def caminho(request, monkeypatch):
+    if request.param and not zoneamento.NUMPY_OK:
+        pytest.skip("NumPy ausente")
+    monkeypatch.setattr(zoneamento, 'NUMPY_OK', request.param)
+
+
+def test_amostras_identicas_formam_uma_zona(caminho):
+    z = zonear(_colunas([10.0] * 10, [10.0] * 10), 3, 3.0)
+    assert len(z.zonas) == 1
+    assert list(z.rotulos) == [0] * 10
+    assert z.zonas[0].medias['P'] == 10.0
+
+
+def test_zonas_limitadas_aos_pontos_distintos(caminho):
+    z = zonear(_colunas([1, 1, 1, 5, 5, 5, 9, 9], [1, 1, 1, 5, 5, 5, 9, 9]), 5, 3.0)
+    assert [zona.pontos for zona in z.zonas] == [3, 3, 2]
+    assert list(z.rotulos) == [0, 0, 0, 1, 1, 1, 2, 2]